@@ -0,0 +1,90 @@
+'''
+Note: This script batches the newest frame of every registered camera into a single YOLO predict call.
+'''
+
+import time
+
+class BatchInference:
+    """
+    Collects the latest frame of each camera from a FrameMailbox, runs one batched predict and routes results back per camera.
+    """
+
+    def __init__(self, model, mailbox, cameras, batch_size=4, max_wait=0.01, conf=0.5, on_drop=None, latency=None):
+        """
+        :param model: YOLO model
+        :param mailbox: FrameMailbox the cameras publish to
+        :param cameras: Names of the cameras to analyse
+        :param batch_size: Max number of frames per predict call
+        :param max_wait: Max time in seconds to wait for the other cameras once the first frame arrived
+        :param conf: Detection confidence threshold
+        :param on_drop: Called with (name, frame) when a frame is superseded while the batch fills
+        :param latency: Optional LatencyRecorder for the queue_wait and inference stages
+        """
+        self.model = model
+        self.mailbox = mailbox
+        self.cameras = list(cameras)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.conf = conf
+        self.on_drop = on_drop
+        self.latency = latency
+        self.batches = 0
+        self.frames = 0
+        self.inference_time = 0.0
+        self.last_inference_time = 0.0
+
+    def collect(self, timeout=None):
+        """
+        Wait for a first frame, then give the other cameras up to max_wait to deliver theirs.
+        :param timeout: Max time in seconds to wait for the first frame (None waits forever)
+        :return: Dict of camera name -> Frame; empty on timeout
+        """
+        pending = self.mailbox.get(self.cameras, timeout)
+        deadline = time.perf_counter() + self.max_wait
+        while pending and len(pending) < min(len(self.cameras), self.batch_size):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            for name, frame in self.mailbox.get(self.cameras, remaining).items():
+                if name in pending and self.on_drop:
+                    self.on_drop(name, pending[name])
+                pending[name] = frame
+        return pending
+
+    def next_batch(self, timeout=None, detect=None):
+        """
+        Collect frames and run detection on them.
+        :param timeout: Max time in seconds to wait for the first frame (None waits forever)
+        :param detect: Optional callable (name, frame) -> bool; frames it rejects skip the detector
+        :return: Dict of camera name -> (Frame, Results), with Results None for skipped frames
+        """
+        pending = self.collect(timeout)
+        if self.latency is not None:
+            collected = time.perf_counter()
+            for frame in pending.values():
+                self.latency.record("queue_wait", collected - frame.queued)
+        outputs = {name: (frame, None) for name, frame in pending.items() if detect and not detect(name, frame)}
+        names = [name for name in pending if name not in outputs]
+        for start in range(0, len(names), self.batch_size):
+            chunk = names[start:start + self.batch_size]
+            started = time.perf_counter()
+            results = self.model.predict([pending[name].data for name in chunk], conf=self.conf)
+            self.last_inference_time = time.perf_counter() - started
+            self.inference_time += self.last_inference_time
+            if self.latency is not None:
+                self.latency.record("inference", self.last_inference_time, started)
+            self.batches += 1
+            self.frames += len(chunk)
+            for name, result in zip(chunk, results):
+                outputs[name] = (pending[name], result)
+        return outputs
+
+    def summary(self):
+        """
+        Format batching statistics.
+        :return: One-line report
+        """
+        per_batch = self.inference_time / self.batches if self.batches else 0.0
+        per_frame = self.inference_time / self.frames if self.frames else 0.0
+        return (f"Batched inference: batches={self.batches} frames={self.frames} "
+                f"mean_batch={per_batch * 1000:.1f}ms mean_frame={per_frame * 1000:.1f}ms")
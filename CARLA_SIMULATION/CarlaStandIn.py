@@ -0,0 +1,829 @@
+'''
+Note: This script is an in-process stand-in for the subset of the carla package our scripts use, for headless benchmarking and testing.
+
+Traffic drives kinematically around a multi-lane ring road: autopilot vehicles follow their lane with the intelligent driver model,
+the others integrate VehicleControl with a bicycle model. Cameras render flat boxes for the vehicles in view, radars return a few
+detections per vehicle in their field of view. Select it with FCW_SIMULATOR=standin (see Simulator.py).
+Coordinates follow CARLA: x forward, y right, z up, yaw in degrees.
+'''
+
+import fnmatch
+import math
+import os
+import threading
+import time
+import types
+import numpy as np
+
+# Constants
+RING_RADIUS = 300.0  # Radius of the innermost lane (m)
+LANE_WIDTH = 3.5  # Distance between lane centres (m)
+LANES = 4  # Number of lanes
+SPAWN_POINTS_PER_LANE = 100  # Evenly spaced spawn points on every lane
+FIXED_DELTA = 0.05  # Simulation step (s) when no fixed_delta_seconds is set
+VEHICLE_LENGTH = 4.5  # Bounding box of every vehicle (m)
+VEHICLE_WIDTH = 1.8
+VEHICLE_HEIGHT = 1.5
+SPAWN_CLEARANCE = 2.0  # Spawning closer than this to another vehicle fails with a collision (m)
+DESIRED_SPEED = (8.0, 14.0)  # Range of autopilot cruising speeds (m/s)
+IDM_ACCELERATION = 1.5  # Intelligent driver model parameters (m/s^2, m/s^2, m, s)
+IDM_DECELERATION = 3.0
+IDM_MIN_GAP = 2.0
+IDM_HEADWAY = 1.5
+MAX_ACCELERATION = 4.0  # Full-throttle acceleration of manually driven vehicles (m/s^2)
+MAX_BRAKING = 8.0  # Full-brake deceleration (m/s^2)
+MAX_STEER_ANGLE = math.radians(35)  # Wheel angle at steer=1
+WHEELBASE = 2.8  # (m)
+RADAR_POINTS_PER_VEHICLE = 4  # Radar detections spread across the width of every vehicle in view
+SPEED = float(os.environ.get("FCW_STANDIN_SPEED", "1.0"))  # Asynchronous mode: simulated seconds per wall second (0 runs unthrottled)
+
+class Vector3D:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return type(self)(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return type(self)(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, scale):
+        return type(self)(self.x * scale, self.y * scale, self.z * scale)
+
+    def length(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def distance(self, other):
+        return (self - other).length()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(x={self.x:.2f}, y={self.y:.2f}, z={self.z:.2f})"
+
+class Location(Vector3D):
+    pass
+
+class Rotation:
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = float(pitch), float(yaw), float(roll)
+
+    def get_forward_vector(self):
+        pitch, yaw = math.radians(self.pitch), math.radians(self.yaw)
+        return Vector3D(math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw), math.sin(pitch))
+
+    def get_right_vector(self):
+        yaw = math.radians(self.yaw)
+        return Vector3D(-math.sin(yaw), math.cos(yaw), 0.0)
+
+class Transform:
+    def __init__(self, location=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def get_forward_vector(self):
+        return self.rotation.get_forward_vector()
+
+    def get_right_vector(self):
+        return self.rotation.get_right_vector()
+
+    def transform(self, point):
+        """
+        Move a point from this transform's local frame into the world (yaw only, like our attachments need).
+        """
+        yaw = math.radians(self.rotation.yaw)
+        return Location(self.location.x + point.x * math.cos(yaw) - point.y * math.sin(yaw),
+                        self.location.y + point.x * math.sin(yaw) + point.y * math.cos(yaw),
+                        self.location.z + point.z)
+
+class WeatherParameters:
+    def __init__(self, cloudiness=0.0, precipitation=0.0, precipitation_deposits=0.0, wind_intensity=0.0,
+                 sun_azimuth_angle=0.0, sun_altitude_angle=45.0, fog_density=0.0, fog_distance=0.0, wetness=0.0, **kwargs):
+        self.cloudiness = cloudiness
+        self.precipitation = precipitation
+        self.precipitation_deposits = precipitation_deposits
+        self.wind_intensity = wind_intensity
+        self.sun_azimuth_angle = sun_azimuth_angle
+        self.sun_altitude_angle = sun_altitude_angle
+        self.fog_density = fog_density
+        self.fog_distance = fog_distance
+        self.wetness = wetness
+        self.__dict__.update(kwargs)
+
+WeatherParameters.ClearNoon = WeatherParameters()
+
+class VehicleControl:
+    def __init__(self, throttle=0.0, steer=0.0, brake=0.0, hand_brake=False, reverse=False):
+        self.throttle, self.steer, self.brake = throttle, steer, brake
+        self.hand_brake, self.reverse = hand_brake, reverse
+
+class WorldSettings:
+    def __init__(self, synchronous_mode=False, no_rendering_mode=False, fixed_delta_seconds=None):
+        self.synchronous_mode = synchronous_mode
+        self.no_rendering_mode = no_rendering_mode
+        self.fixed_delta_seconds = fixed_delta_seconds
+
+class ActorBlueprint:
+    def __init__(self, blueprint_id, attributes=None):
+        self.id = blueprint_id
+        self.tags = blueprint_id.split(".")
+        self.attributes = dict(attributes or {})
+
+    def has_attribute(self, name):
+        return name in self.attributes
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = str(value)
+
+    def get_attribute(self, name):
+        return self.attributes[name]
+
+class BlueprintLibrary:
+    def __init__(self, blueprints):
+        self.blueprints = blueprints
+
+    def filter(self, pattern):
+        return BlueprintLibrary([bp for bp in self.blueprints if fnmatch.fnmatch(bp.id, pattern)
+                                 or fnmatch.fnmatch(bp.id, f"*{pattern}*") or pattern in bp.tags])
+
+    def find(self, blueprint_id):
+        for bp in self.blueprints:
+            if bp.id == blueprint_id:
+                return ActorBlueprint(bp.id, bp.attributes)  # Callers customise their own copy
+        raise IndexError(f"Blueprint '{blueprint_id}' not found")
+
+    def __getitem__(self, index):
+        bp = self.blueprints[index]
+        return ActorBlueprint(bp.id, bp.attributes)
+
+    def __iter__(self):
+        return iter(self.blueprints)
+
+    def __len__(self):
+        return len(self.blueprints)
+
+BLUEPRINTS = [
+    ActorBlueprint("vehicle.tesla.model3", {"number_of_wheels": "4", "role_name": "autopilot"}),
+    ActorBlueprint("vehicle.audi.a2", {"number_of_wheels": "4", "role_name": "autopilot"}),
+    ActorBlueprint("vehicle.lincoln.mkz_2017", {"number_of_wheels": "4", "role_name": "autopilot"}),
+    ActorBlueprint("vehicle.carlamotors.carlacola", {"number_of_wheels": "4", "role_name": "autopilot"}),
+    ActorBlueprint("vehicle.yamaha.yzf", {"number_of_wheels": "2", "role_name": "autopilot"}),
+    ActorBlueprint("sensor.camera.rgb", {"image_size_x": "800", "image_size_y": "600", "fov": "90", "sensor_tick": "0.0"}),
+    ActorBlueprint("sensor.other.radar", {"horizontal_fov": "30", "vertical_fov": "30", "range": "100", "sensor_tick": "0.0"}),
+    ActorBlueprint("sensor.other.collision", {}),
+]
+
+class Map:
+    name = "StandIn/Ring"
+
+    def __init__(self):
+        angles = np.arange(SPAWN_POINTS_PER_LANE) * 2 * math.pi / SPAWN_POINTS_PER_LANE
+        self.spawn_points = [Transform(Location(radius * math.cos(angle), radius * math.sin(angle), 0.3),
+                                       Rotation(yaw=math.degrees(angle) + 90))
+                             for angle in angles for radius in RING_RADIUS + LANE_WIDTH * np.arange(LANES)]
+
+    def get_spawn_points(self):
+        return list(self.spawn_points)
+
+    def get_waypoint(self, location, project_to_road=True):
+        radius = math.hypot(location.x, location.y)
+        lane = int(np.clip(round((radius - RING_RADIUS) / LANE_WIDTH), 0, LANES - 1))
+        return Waypoint(lane, math.atan2(location.y, location.x))
+
+    def generate_waypoints(self, distance):
+        waypoints = []
+        for lane in range(LANES):
+            radius = RING_RADIUS + LANE_WIDTH * lane
+            count = int(2 * math.pi * radius // distance)
+            waypoints += [Waypoint(lane, index * 2 * math.pi / count) for index in range(count)]
+        return waypoints
+
+    def get_topology(self):
+        return [(Waypoint(lane, 0.0), Waypoint(lane, 2 * math.pi - 1e-3)) for lane in range(LANES)]
+
+class Waypoint:
+    """
+    A point on a lane of the ring road; lanes run counter-clockwise in x/y.
+    """
+
+    def __init__(self, lane, theta):
+        self.lane = lane
+        self.theta = theta % (2 * math.pi)
+        self.radius = RING_RADIUS + LANE_WIDTH * lane
+        self.road_id, self.section_id, self.lane_id = 0, 0, -(lane + 1)
+        self.s = self.theta * self.radius
+        self.lane_width = LANE_WIDTH
+        self.is_junction = False
+        self.id = hash((lane, round(self.s, 2)))
+        self.transform = Transform(Location(self.radius * math.cos(self.theta), self.radius * math.sin(self.theta), 0.0),
+                                   Rotation(yaw=math.degrees(self.theta) + 90))
+
+    def next(self, distance):
+        return [Waypoint(self.lane, self.theta + distance / self.radius)]
+
+    def previous(self, distance):
+        return [Waypoint(self.lane, self.theta - distance / self.radius)]
+
+class ActorSnapshot:
+    def __init__(self, actor_id, transform, velocity):
+        self.id = actor_id
+        self.transform = transform
+        self.velocity = velocity
+
+    def get_transform(self):
+        return self.transform
+
+    def get_velocity(self):
+        return self.velocity
+
+class WorldSnapshot:
+    def __init__(self, frame, timestamp, actors):
+        self.frame = frame
+        self.timestamp = types.SimpleNamespace(elapsed_seconds=timestamp, frame=frame)
+        self.actors = actors
+
+    def find(self, actor_id):
+        return self.actors.get(actor_id)
+
+    def has_actor(self, actor_id):
+        return actor_id in self.actors
+
+    def __iter__(self):
+        return iter(self.actors.values())
+
+    def __len__(self):
+        return len(self.actors)
+
+class ActorList:
+    def __init__(self, actors):
+        self.actors = actors
+
+    def filter(self, pattern):
+        return ActorList([actor for actor in self.actors if fnmatch.fnmatch(actor.type_id, pattern)])
+
+    def find(self, actor_id):
+        return next((actor for actor in self.actors if actor.id == actor_id), None)
+
+    def __iter__(self):
+        return iter(self.actors)
+
+    def __len__(self):
+        return len(self.actors)
+
+    def __getitem__(self, index):
+        return self.actors[index]
+
+class Actor:
+    def __init__(self, world, actor_id, blueprint, parent=None):
+        self.world = world
+        self.id = actor_id
+        self.type_id = blueprint.id
+        self.attributes = dict(blueprint.attributes)
+        self.parent = parent
+        self.is_alive = True
+
+    def destroy(self):
+        return self.world.destroy_actor(self)
+
+class Vehicle(Actor):
+    """
+    A vehicle; its state lives in the world's arrays at index slot.
+    """
+
+    def __init__(self, world, actor_id, blueprint, slot):
+        super().__init__(world, actor_id, blueprint)
+        self.slot = slot
+        self.bounding_box = types.SimpleNamespace(extent=Vector3D(VEHICLE_LENGTH / 2, VEHICLE_WIDTH / 2, VEHICLE_HEIGHT / 2))
+
+    def get_transform(self):
+        return self.world.vehicle_transform(self.slot)
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def get_velocity(self):
+        return self.world.vehicle_velocity(self.slot)
+
+    def set_autopilot(self, enabled=True, tm_port=8000):
+        self.world.set_autopilot(self.slot, enabled)
+
+    def apply_control(self, control):
+        self.world.apply_control(self.slot, control)
+
+class Sensor(Actor):
+    """
+    A camera, radar or collision sensor attached to a vehicle; produces data on world ticks while listening.
+    """
+
+    def __init__(self, world, actor_id, blueprint, transform, parent):
+        super().__init__(world, actor_id, blueprint, parent)
+        self.relative_transform = transform
+        self.callback = None
+        self.sensor_tick = float(self.attributes.get("sensor_tick", 0.0))
+        self.last_measurement = -math.inf
+        self.background = None  # Cached camera background and the weather it was drawn for
+        self.background_weather = None
+
+    def listen(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+    def is_listening(self):
+        return self.callback is not None
+
+    def get_transform(self):
+        parent = self.parent.get_transform()
+        return Transform(parent.transform(self.relative_transform.location),
+                         Rotation(parent.rotation.pitch + self.relative_transform.rotation.pitch,
+                                  parent.rotation.yaw + self.relative_transform.rotation.yaw, 0.0))
+
+class Image:
+    def __init__(self, frame, timestamp, width, height, fov, raw_data, transform):
+        self.frame, self.timestamp = frame, timestamp
+        self.width, self.height, self.fov = width, height, fov
+        self.raw_data = raw_data
+        self.transform = transform
+
+class RadarDetection:
+    def __init__(self, velocity, azimuth, altitude, depth):
+        self.velocity, self.azimuth, self.altitude, self.depth = velocity, azimuth, altitude, depth
+
+class RadarMeasurement:
+    def __init__(self, frame, timestamp, raw_data, transform):
+        self.frame, self.timestamp = frame, timestamp
+        self.raw_data = raw_data
+        self.transform = transform
+
+    def get_detection_count(self):
+        return len(self.raw_data) // 16
+
+    def __len__(self):
+        return self.get_detection_count()
+
+    def __iter__(self):
+        points = np.frombuffer(self.raw_data, dtype=np.float32).reshape(-1, 4)
+        return (RadarDetection(*map(float, point)) for point in points)
+
+class CollisionEvent:
+    def __init__(self, frame, timestamp, transform, actor, other_actor, normal_impulse):
+        self.frame, self.timestamp, self.transform = frame, timestamp, transform
+        self.actor, self.other_actor, self.normal_impulse = actor, other_actor, normal_impulse
+
+class Response:
+    def __init__(self, actor_id=0, error=""):
+        self.actor_id = actor_id
+        self.error = error
+
+    def has_error(self):
+        return bool(self.error)
+
+class SpawnActor:
+    def __init__(self, blueprint, transform, parent_id=None):
+        self.blueprint, self.transform, self.parent_id = blueprint, transform, parent_id
+        self.followups = []
+
+    def then(self, command):
+        self.followups.append(command)
+        return self
+
+class SetAutopilot:
+    def __init__(self, actor_id, enabled=True, tm_port=8000):
+        self.actor_id, self.enabled = actor_id, enabled
+
+class DestroyActor:
+    def __init__(self, actor_id):
+        self.actor_id = actor_id
+
+FutureActor = 0  # Placeholder id replaced by the actor spawned by the enclosing SpawnActor
+command = types.SimpleNamespace(SpawnActor=SpawnActor, SetAutopilot=SetAutopilot, DestroyActor=DestroyActor,
+                                FutureActor=FutureActor, Response=Response)
+
+class World:
+    """
+    The simulated world. Vehicle state is kept in preallocated arrays and stepped in one vectorized update.
+    """
+
+    def __init__(self, seed=0, capacity=64):
+        self.lock = threading.RLock()
+        self.ticked = threading.Condition(self.lock)
+        self.rng = np.random.default_rng(seed)
+        self.map = Map()
+        self.library = BlueprintLibrary(BLUEPRINTS)
+        self.settings = WorldSettings()
+        self.weather = WeatherParameters()
+        self.frame = 0
+        self.elapsed = 0.0
+        self.next_id = 1
+        self.actors = {}
+        self.vehicles = []  # Vehicle actor per slot (None once destroyed)
+        self.sensors = []
+        self.allocate(capacity)
+        self.running = True
+        threading.Thread(target=self.run_asynchronous, daemon=True).start()
+
+    def allocate(self, capacity):
+        """
+        Grow the state arrays to capacity slots, keeping the existing vehicles.
+        """
+        old = getattr(self, "alive", np.zeros(0, dtype=bool))
+        count = len(old)
+
+        def grow(name, dtype, fill=0):
+            array = np.full(capacity, fill, dtype=dtype)
+            if count:
+                array[:count] = getattr(self, name)
+            setattr(self, name, array)
+
+        for name in ("x", "y", "z", "yaw", "speed", "theta", "desired_speed", "throttle", "steer", "brake"):
+            grow(name, np.float64)
+        for name in ("alive", "autopilot", "reverse"):
+            grow(name, bool)
+        grow("lane", np.int64)
+
+    def get_blueprint_library(self):
+        return self.library
+
+    def get_map(self):
+        return self.map
+
+    def get_settings(self):
+        return WorldSettings(self.settings.synchronous_mode, self.settings.no_rendering_mode, self.settings.fixed_delta_seconds)
+
+    def apply_settings(self, settings):
+        with self.lock:
+            self.settings = WorldSettings(settings.synchronous_mode, settings.no_rendering_mode, settings.fixed_delta_seconds)
+            return self.frame
+
+    def get_weather(self):
+        return self.weather
+
+    def set_weather(self, weather):
+        self.weather = weather
+
+    def get_actors(self, actor_ids=None):
+        with self.lock:
+            actors = list(self.actors.values())
+        if actor_ids is not None:
+            actors = [actor for actor in actors if actor.id in set(actor_ids)]
+        return ActorList(actors)
+
+    def get_actor(self, actor_id):
+        return self.actors.get(actor_id)
+
+    def spawn_actor(self, blueprint, transform, attach_to=None):
+        actor = self.try_spawn_actor(blueprint, transform, attach_to)
+        if actor is None:
+            raise RuntimeError("Spawn failed because of collision at spawn position")
+        return actor
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None):
+        with self.lock:
+            actor_id = self.next_id
+            if blueprint.id.startswith("sensor."):
+                actor = Sensor(self, actor_id, blueprint, transform, attach_to)
+                self.sensors.append(actor)
+            else:
+                location = transform.location
+                alive = self.alive[:len(self.vehicles)]
+                distances = np.hypot(self.x[:len(self.vehicles)] - location.x, self.y[:len(self.vehicles)] - location.y)
+                if np.any(alive & (distances < SPAWN_CLEARANCE)):
+                    return None
+                slot = len(self.vehicles)
+                if slot == len(self.alive):
+                    self.allocate(2 * len(self.alive))
+                self.x[slot], self.y[slot], self.z[slot] = location.x, location.y, 0.0
+                self.yaw[slot] = transform.rotation.yaw
+                self.speed[slot] = 0.0
+                self.desired_speed[slot] = self.rng.uniform(*DESIRED_SPEED)
+                self.alive[slot] = True
+                self.autopilot[slot] = False
+                actor = Vehicle(self, actor_id, blueprint, slot)
+                self.vehicles.append(actor)
+            self.actors[actor_id] = actor
+            self.next_id += 1
+            return actor
+
+    def destroy_actor(self, actor):
+        with self.lock:
+            if not actor.is_alive:
+                return False
+            actor.is_alive = False
+            del self.actors[actor.id]
+            if isinstance(actor, Vehicle):
+                self.alive[actor.slot] = False
+                self.vehicles[actor.slot] = None
+            else:
+                self.sensors.remove(actor)
+            return True
+
+    def vehicle_transform(self, slot):
+        return Transform(Location(self.x[slot], self.y[slot], self.z[slot]), Rotation(yaw=self.yaw[slot]))
+
+    def vehicle_velocity(self, slot):
+        yaw = math.radians(self.yaw[slot])
+        return Vector3D(self.speed[slot] * math.cos(yaw), self.speed[slot] * math.sin(yaw), 0.0)
+
+    def set_autopilot(self, slot, enabled):
+        with self.lock:
+            self.autopilot[slot] = enabled
+            if enabled:  # Snap onto the nearest lane
+                radius = math.hypot(self.x[slot], self.y[slot])
+                self.lane[slot] = int(np.clip(round((radius - RING_RADIUS) / LANE_WIDTH), 0, LANES - 1))
+                self.theta[slot] = math.atan2(self.y[slot], self.x[slot]) % (2 * math.pi)
+
+    def apply_control(self, slot, control):
+        with self.lock:
+            self.throttle[slot], self.steer[slot], self.brake[slot] = control.throttle, control.steer, control.brake
+            self.reverse[slot] = control.reverse
+
+    def step_vehicles(self, dt):
+        """
+        Advance every vehicle by dt seconds.
+        """
+        count = len(self.vehicles)
+        alive = self.alive[:count]
+
+        # Autopilot: intelligent driver model behind the next vehicle in the same lane
+        auto = np.flatnonzero(alive & self.autopilot[:count])
+        if len(auto):
+            lanes, theta, speed = self.lane[auto], self.theta[auto], self.speed[auto]
+            order = np.lexsort((theta, lanes))
+            sorted_lanes = lanes[order]
+            leader = np.roll(order, -1)
+            lane_end = np.r_[sorted_lanes[1:] != sorted_lanes[:-1], True]
+            lane_start = np.flatnonzero(np.r_[True, sorted_lanes[1:] != sorted_lanes[:-1]])
+            leader[lane_end] = order[lane_start]  # The last vehicle of a lane follows the first one around the ring
+            leader_of = np.empty_like(order)
+            leader_of[order] = leader
+            radius = RING_RADIUS + LANE_WIDTH * lanes
+            gap = ((theta[leader_of] - theta) % (2 * math.pi)) * radius - VEHICLE_LENGTH
+            gap[leader_of == np.arange(len(auto))] = np.inf  # Alone in the lane
+            gap = np.maximum(gap, 0.1)
+            closing = speed - speed[leader_of]
+            desired_gap = IDM_MIN_GAP + speed * IDM_HEADWAY + speed * closing / (2 * math.sqrt(IDM_ACCELERATION * IDM_DECELERATION))
+            acceleration = IDM_ACCELERATION * (1 - (speed / self.desired_speed[auto]) ** 4 - (np.maximum(desired_gap, 0) / gap) ** 2)
+            speed = np.maximum(speed + acceleration * dt, 0.0)
+            theta = (theta + speed * dt / radius) % (2 * math.pi)
+            self.speed[auto], self.theta[auto] = speed, theta
+            self.x[auto], self.y[auto] = radius * np.cos(theta), radius * np.sin(theta)
+            self.yaw[auto] = np.degrees(theta) + 90
+
+        # Manual control: kinematic bicycle model
+        manual = np.flatnonzero(alive & ~self.autopilot[:count])
+        if len(manual):
+            direction = np.where(self.reverse[manual], -1.0, 1.0)
+            speed = self.speed[manual] * direction  # Signed speed
+            acceleration = direction * self.throttle[manual] * MAX_ACCELERATION - np.sign(speed) * self.brake[manual] * MAX_BRAKING
+            new_speed = speed + acceleration * dt
+            new_speed[(np.sign(new_speed) != np.sign(speed)) & (speed != 0)] = 0.0  # Braking stops, it does not reverse
+            yaw = np.radians(self.yaw[manual]) + new_speed * np.tan(self.steer[manual] * MAX_STEER_ANGLE) / WHEELBASE * dt
+            self.x[manual] += new_speed * np.cos(yaw) * dt
+            self.y[manual] += new_speed * np.sin(yaw) * dt
+            self.yaw[manual] = np.degrees(yaw)
+            self.speed[manual] = np.abs(new_speed)
+
+    def vehicle_arrays(self, exclude_slot):
+        """
+        Positions, velocities and headings of the live vehicles except one.
+        :return: Tuple of ((N, 3) positions, (N, 3) velocities)
+        """
+        count = len(self.vehicles)
+        mask = self.alive[:count].copy()
+        if exclude_slot is not None:
+            mask[exclude_slot] = False
+        yaw = np.radians(self.yaw[:count][mask])
+        positions = np.stack([self.x[:count][mask], self.y[:count][mask], self.z[:count][mask]], axis=1)
+        velocities = np.stack([self.speed[:count][mask] * np.cos(yaw), self.speed[:count][mask] * np.sin(yaw), np.zeros_like(yaw)], axis=1)
+        return positions, velocities
+
+    def sensor_frame(self, sensor):
+        """
+        Express the other vehicles in a sensor's frame.
+        :return: Tuple of (forward, right, up) distances and (N, 3) velocities relative to the sensor
+        """
+        transform = sensor.get_transform()
+        parent_slot = sensor.parent.slot if isinstance(sensor.parent, Vehicle) else None
+        positions, velocities = self.vehicle_arrays(parent_slot)
+        yaw = math.radians(transform.rotation.yaw)
+        offsets = positions + [0.0, 0.0, VEHICLE_HEIGHT / 2] - [transform.location.x, transform.location.y, transform.location.z]
+        forward = offsets[:, 0] * math.cos(yaw) + offsets[:, 1] * math.sin(yaw)
+        right = -offsets[:, 0] * math.sin(yaw) + offsets[:, 1] * math.cos(yaw)
+        if parent_slot is not None:
+            velocities = velocities - [self.vehicle_velocity(parent_slot).x, self.vehicle_velocity(parent_slot).y, 0.0]
+        return forward, right, offsets[:, 2], offsets, velocities, transform
+
+    def render_camera(self, sensor):
+        """
+        Draw the vehicles in a camera's view as flat boxes over a sky/road background.
+        :return: Image
+        """
+        width, height = int(sensor.attributes["image_size_x"]), int(sensor.attributes["image_size_y"])
+        fov = float(sensor.attributes["fov"])
+        focal = width / (2 * math.tan(math.radians(fov) / 2))
+        fog = min(self.weather.fog_density / 100.0, 1.0)
+        if sensor.background is None or sensor.background_weather is not self.weather:  # Rebuilt only when the weather changes
+            light = float(np.clip(0.3 + self.weather.sun_altitude_angle / 90.0, 0.1, 1.0))
+            sensor.background = np.empty((height, width, 4), dtype=np.uint8)
+            sensor.background[:height // 2] = np.array([235, 206, 135, 255]) * light * (1 - fog) + 160 * fog  # Sky (BGRA)
+            sensor.background[height // 2:] = np.array([90, 90, 90, 255]) * light * (1 - fog) + 140 * fog  # Road
+            sensor.background[..., 3] = 255
+            sensor.background_weather = self.weather
+        image = sensor.background.copy()
+        if not self.settings.no_rendering_mode:
+            forward, right, up, _, _, transform = self.sensor_frame(sensor)
+            depth = np.maximum(forward, 1e-6)
+            u, v = width / 2 + focal * right / depth, height / 2 - focal * up / depth
+            half_w, half_h = focal * VEHICLE_WIDTH / depth / 2, focal * VEHICLE_HEIGHT / depth / 2
+            x1, x2 = np.maximum(u - half_w, 0).astype(int), np.minimum(u + half_w, width).astype(int)
+            y1, y2 = np.maximum(v - half_h, 0).astype(int), np.minimum(v + half_h, height).astype(int)
+            visible = np.flatnonzero((forward > 1.0) & (x1 < x2) & (y1 < y2))
+            shades = 1 - fog * np.minimum(depth / 50.0, 1.0)
+            colors = (np.array([40, 40, 200]) * shades[:, None] + 150 * (1 - shades[:, None])).astype(np.uint8)
+            for index in visible[np.argsort(-forward[visible])]:  # Far to near, so near vehicles are drawn on top
+                image[y1[index]:y2[index], x1[index]:x2[index], :3] = colors[index]
+        else:
+            transform = sensor.get_transform()
+        return Image(self.frame, self.elapsed, width, height, fov, image.reshape(-1).data, transform)
+
+    def measure_radar(self, sensor):
+        """
+        Return a few detections across every vehicle inside the radar's field of view and range.
+        :return: RadarMeasurement
+        """
+        horizontal_fov = math.radians(float(sensor.attributes["horizontal_fov"])) / 2
+        vertical_fov = math.radians(float(sensor.attributes["vertical_fov"])) / 2
+        max_range = float(sensor.attributes["range"])
+        forward, right, up, offsets, velocities, transform = self.sensor_frame(sensor)
+        spread = np.linspace(-VEHICLE_WIDTH / 2, VEHICLE_WIDTH / 2, RADAR_POINTS_PER_VEHICLE)
+        forward = np.repeat(forward - VEHICLE_LENGTH / 2, len(spread))  # Returns come from the near face
+        right = (right[:, None] + spread).ravel()
+        up = np.repeat(up, len(spread)) + self.rng.normal(0, 0.1, len(right))
+        depth = np.sqrt(forward ** 2 + right ** 2 + up ** 2)
+        azimuth = np.arctan2(right, forward)
+        altitude = np.arcsin(np.clip(up / np.maximum(depth, 1e-6), -1, 1))
+        units = offsets / np.maximum(np.linalg.norm(offsets, axis=1, keepdims=True), 1e-6)
+        velocity = np.repeat(np.sum(velocities * units, axis=1), len(spread))
+        seen = (forward > 0) & (depth < max_range) & (np.abs(azimuth) < horizontal_fov) & (np.abs(altitude) < vertical_fov)
+        points = np.stack([velocity, azimuth, altitude, depth], axis=1)[seen].astype(np.float32)
+        return RadarMeasurement(self.frame, self.elapsed, points.tobytes(), transform)
+
+    def detect_collision(self, sensor):
+        """
+        Report the first vehicle whose bounding box overlaps the one of the sensor's parent.
+        :return: CollisionEvent, or None without contact
+        """
+        slot = sensor.parent.slot
+        count = len(self.vehicles)
+        yaw = math.radians(self.yaw[slot])
+        dx, dy = self.x[:count] - self.x[slot], self.y[:count] - self.y[slot]
+        forward = dx * math.cos(yaw) + dy * math.sin(yaw)
+        right = -dx * math.sin(yaw) + dy * math.cos(yaw)
+        contact = self.alive[:count] & (np.abs(forward) < VEHICLE_LENGTH) & (np.abs(right) < VEHICLE_WIDTH)
+        contact[slot] = False
+        if not contact.any():
+            return None
+        other = self.vehicles[int(np.flatnonzero(contact)[0])]
+        impulse = self.vehicle_velocity(slot) - other.get_velocity()
+        return CollisionEvent(self.frame, self.elapsed, sensor.get_transform(), sensor.parent, other, impulse)
+
+    def tick(self, seconds=10.0):
+        """
+        Advance the simulation by one step and deliver sensor data.
+        :return: New frame number
+        """
+        with self.lock:
+            dt = self.settings.fixed_delta_seconds or FIXED_DELTA
+            self.step_vehicles(dt)
+            self.frame += 1
+            self.elapsed += dt
+            measurements = []
+            for sensor in self.sensors:
+                if sensor.callback is None or self.elapsed - sensor.last_measurement < sensor.sensor_tick:
+                    continue
+                sensor.last_measurement = self.elapsed
+                if sensor.type_id.startswith("sensor.camera"):
+                    data = self.render_camera(sensor)
+                elif sensor.type_id == "sensor.other.collision":
+                    data = self.detect_collision(sensor)
+                    if data is None:
+                        continue
+                else:
+                    data = self.measure_radar(sensor)
+                measurements.append((sensor.callback, data))
+            self.ticked.notify_all()
+            frame = self.frame
+        for callback, data in measurements:  # Callbacks run outside the lock, like CARLA's sensor threads
+            callback(data)
+        return frame
+
+    def wait_for_tick(self, seconds=10.0):
+        with self.lock:
+            frame = self.frame
+            self.ticked.wait_for(lambda: self.frame > frame, seconds)
+            return self.get_snapshot()
+
+    def get_snapshot(self):
+        with self.lock:
+            actors = {vehicle.id: ActorSnapshot(vehicle.id, self.vehicle_transform(vehicle.slot), self.vehicle_velocity(vehicle.slot))
+                      for vehicle in self.vehicles if vehicle is not None}
+            return WorldSnapshot(self.frame, self.elapsed, actors)
+
+    def run_asynchronous(self):
+        """
+        Tick on our own while not in synchronous mode, paced at SPEED simulated seconds per wall second.
+        """
+        started, simulated = time.perf_counter(), 0.0
+        while self.running:
+            if self.settings.synchronous_mode:
+                time.sleep(0.01)
+                started, simulated = time.perf_counter(), 0.0
+                continue
+            self.tick()
+            simulated += self.settings.fixed_delta_seconds or FIXED_DELTA
+            if SPEED > 0:
+                delay = simulated / SPEED - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+class TrafficManager:
+    def __init__(self, port, world):
+        self.port = port
+        self.world = world
+
+    def get_port(self):
+        return self.port
+
+    def set_synchronous_mode(self, enabled):
+        pass
+
+    def set_global_distance_to_leading_vehicle(self, distance):
+        pass
+
+    def global_percentage_speed_difference(self, percentage):
+        pass
+
+    def set_random_device_seed(self, seed):
+        self.world.rng = np.random.default_rng(seed)  # Cruising speeds of vehicles spawned afterwards
+
+worlds = {}  # Port -> World, so every client of a port sees the same simulation
+
+class Client:
+    def __init__(self, host="localhost", port=2000, worker_threads=0):
+        self.host, self.port = host, port
+
+    def set_timeout(self, seconds):
+        self.timeout = seconds
+
+    def get_world(self):
+        if self.port not in worlds:
+            worlds[self.port] = World(seed=self.port)
+        return worlds[self.port]
+
+    def load_world(self, map_name=None):
+        if self.port in worlds:
+            worlds[self.port].running = False
+        worlds[self.port] = World(seed=self.port)
+        return worlds[self.port]
+
+    def get_trafficmanager(self, port=8000):
+        return TrafficManager(port, self.get_world())
+
+    def apply_batch(self, commands):
+        self.apply_batch_sync(commands)
+
+    def apply_batch_sync(self, commands, do_tick=False):
+        """
+        Run commands in order; failures are reported per command instead of raising.
+        :return: List of Response
+        """
+        world = self.get_world()
+        responses = []
+        for batch_command in commands:
+            responses.append(self.run_command(world, batch_command))
+        if do_tick:
+            world.tick()
+        return responses
+
+    def run_command(self, world, batch_command, future_id=None):
+        if isinstance(batch_command, SpawnActor):
+            parent = world.get_actor(batch_command.parent_id) if batch_command.parent_id is not None else None
+            actor = world.try_spawn_actor(batch_command.blueprint, batch_command.transform, parent)
+            if actor is None:
+                return Response(error="Spawn failed because of collision at spawn position")
+            for followup in batch_command.followups:
+                response = self.run_command(world, followup, actor.id)
+                if response.error:
+                    return Response(actor.id, response.error)
+            return Response(actor.id)
+        actor_id = future_id if batch_command.actor_id == FutureActor and future_id is not None else batch_command.actor_id
+        actor = world.get_actor(actor_id)
+        if actor is None:
+            return Response(actor_id, f"Actor {actor_id} not found")
+        if isinstance(batch_command, SetAutopilot):
+            actor.set_autopilot(batch_command.enabled)
+        elif isinstance(batch_command, DestroyActor):
+            actor.destroy()
+        return Response(actor_id)
@@ -1,19 +1,30 @@
-import carla
-import pygame
 import numpy as np
 import cv2
-from ultralytics import YOLO
 import threading
-from queue import Queue
-
-# Initialize pygame for speed display
-pygame.init()
+import time
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # Shared modules in CARLA_SIMULATION
+from Simulator import carla
+from FrameMailbox import FrameMailbox
+from ModelCache import load_model
+from FramePool import FramePool
+from Traffic import TRAFFIC_COUNT, TrafficSpawner
+from Proximity import DETECTION_RADIUS, ProximityMonitor
+from BatchInference import BatchInference
+from Display import Display
+
+# Pygame speed display and camera windows (none with FCW_HEADLESS=1)
 WIDTH, HEIGHT = 1920, 1080  # Default width and height
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-clock = pygame.time.Clock()
+display = Display(WIDTH, HEIGHT)
+LATENCY_BUDGET = 0.1  # Frames older than this (seconds) are not worth running detection on
+BATCH_SIZE = 4  # Max camera frames per YOLO predict call
+BATCH_MAX_WAIT = 0.01  # Max time (seconds) to wait for the other cameras before running a batch
+CAMERA_WINDOWS = {"front": "Front Camera", "third_person": "Third-Person Camera"}  # Analysed cameras and their windows
 
 # Load YOLOv8 model
-model = YOLO("E:/CARLA/WindowsNoEditor/PythonAPI/examples/yolov8n.pt")  # Adjust path if necessary
+model = load_model()  # Set FCW_MODEL_PATH to use a different model file; reused if a WorkerPool parent loaded it
 
 # Connect to CARLA server
 client = carla.Client("localhost", 2000)
@@ -30,35 +41,24 @@ def spawn_vehicle():
     return player_vehicle
 
 # Function to spawn other vehicles in random locations
-def spawn_other_vehicles():
-    blueprint_library = world.get_blueprint_library()
-    vehicle_bp = blueprint_library.filter("vehicle.*")[0]  # Random vehicle model
-    spawn_points = world.get_map().get_spawn_points()
-    for spawn_point in spawn_points[1:20]:  # Limit to 5 vehicles for this example
-        vehicle = world.spawn_actor(vehicle_bp, spawn_point)
-        vehicle.set_autopilot(True)  # Set autopilot for random movement
+def spawn_other_vehicles(count=TRAFFIC_COUNT):
+    traffic = TrafficSpawner(client, world)  # Blueprint mix from FCW_TRAFFIC_MIX
+    traffic.spawn(count)  # One batch of spawns with autopilot; blocked spawn points are retried elsewhere
+    print(traffic.summary())
+    return traffic
 
 # Function to check if any vehicle is within a certain distance in front of the player
-def check_proximity(player_vehicle):
-    detection_radius = 15.0  # Detection radius in meters
-    warning_message = ""
-    vehicles = world.get_actors().filter("vehicle.*")
-    player_transform = player_vehicle.get_transform()
-    player_location = player_transform.location
-    player_forward = player_transform.get_forward_vector()
-
-    for vehicle in vehicles:
-        if vehicle.id != player_vehicle.id:
-            other_location = vehicle.get_transform().location
-            distance = player_location.distance(other_location)
-            if distance < detection_radius:
-                direction = other_location - player_location
-                forward_dot = player_forward.x * direction.x + player_forward.y * direction.y + player_forward.z * direction.z
-                if forward_dot > 0:  # Check if the vehicle is in front
-                    warning_message = "WARNING: Vehicle Ahead!"
-                    break
-
-    return warning_message
+def check_proximity(proximity, detection_radius=DETECTION_RADIUS):
+    """
+    Build the proximity warning from the vehicles ahead of the player.
+    :param proximity: ProximityMonitor of the player vehicle
+    :param detection_radius: Detection radius in meters
+    :return: Warning message, empty if no vehicle is ahead
+    """
+    vehicle_ids, distances = proximity.vehicles_ahead(detection_radius)
+    if len(vehicle_ids) == 0:
+        return ""
+    return f"WARNING: Vehicle Ahead! ({len(vehicle_ids)} within {detection_radius:.0f}m, nearest {distances[0]:.1f}m)"
 
 #! Clear Weather
 def set_weather(client, weather_params):
@@ -74,9 +74,9 @@ def set_weather(client, weather_params):
 
 # Main function
 def main():
-    global WIDTH, HEIGHT, screen  # Declare screen as global
     player_vehicle = spawn_vehicle()
-    spawn_other_vehicles()  # Spawn other vehicles
+    traffic = spawn_other_vehicles()  # Spawn other vehicles
+    proximity = ProximityMonitor(world, player_vehicle)  # Vehicles around the player, from one snapshot per tick
     
     # Create WeatherParameters object for clear night weather
     clear_night_weather = carla.WeatherParameters(
@@ -113,53 +113,54 @@ def main():
         attach_to=player_vehicle
     )
 
-    # Queues to hold camera frames for processing
-    front_frame_queue = Queue(maxsize=10)
-    third_person_frame_queue = Queue(maxsize=10)
+    # Recycled frame buffers, one pool per camera
+    frame_pools = {"front": FramePool("front"), "third_person": FramePool("third_person")}
+
+    # Mailbox holding only the newest frame of each camera; dropped frames go back to their pool
+    frame_mailbox = FrameMailbox(latency_budget=LATENCY_BUDGET,
+                                 on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to handle front camera images
     def front_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not front_frame_queue.full():
-            front_frame_queue.put(frame)
+        frame = frame_pools["front"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["front"].record_ingest(time.perf_counter() - capture_time)
+        frame_mailbox.put("front", frame, image.frame, capture_time)
 
     # Function to handle third-person camera images
     def third_person_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not third_person_frame_queue.full():
-            third_person_frame_queue.put(frame)
+        frame = frame_pools["third_person"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["third_person"].record_ingest(time.perf_counter() - capture_time)
+        frame_mailbox.put("third_person", frame, image.frame, capture_time)
+
+    # Batched detection over the newest frame of every camera
+    detector = BatchInference(model, frame_mailbox, CAMERA_WINDOWS, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT,
+                              conf=0.5, on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to process frames for front and third-person views
     def process_frames():
         while True:
-            # Process front camera
-            if not front_frame_queue.empty():
-                front_frame = front_frame_queue.get()
+            # Block until a camera delivers a new frame (the timeout keeps the OpenCV windows responsive)
+            batch = detector.next_batch(timeout=0.1)
 
-                # Object detection using YOLO
-                results = model.predict(front_frame, conf=0.5)
-                detected_objects = results[0].boxes
+            for name, (frame, results) in batch.items():
+                camera_frame = frame.data
 
-                # Draw bounding boxes on the front camera frame
-                for obj in detected_objects:
-                    x1, y1, x2, y2 = map(int, obj.xyxy[0])
-                    label = obj.cls
-                    confidence = obj.conf[0]
-                    cv2.rectangle(front_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(front_frame, f"{label} {confidence:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+                # Draw bounding boxes on the camera frame (skipped when headless)
+                detections = results.boxes.data.cpu().numpy()  # x1, y1, x2, y2, conf, cls
+                display.draw_detections(camera_frame, detections, [model.names[int(label)] for label in detections[:, 5]], detections[:, 4])
 
-                cv2.imshow("Front Camera", front_frame)
+                display.show(CAMERA_WINDOWS[name], camera_frame)
+                frame_pools[name].release(camera_frame)
 
-            # Process third-person camera
-            if not third_person_frame_queue.empty():
-                third_person_frame = third_person_frame_queue.get()
-                cv2.imshow("Third-Person Camera", third_person_frame)
-
-            cv2.waitKey(1)
+            display.wait_key()
 
     # Start the frame processing thread
     frame_processing_thread = threading.Thread(target=process_frames, daemon=True)
@@ -172,39 +173,36 @@ def main():
     try:
         while True:
             # Handle quitting the game and resizing
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return
-                if event.type == pygame.VIDEORESIZE:
-                    WIDTH, HEIGHT = event.w, event.h
-                    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-                    
-
+            if not display.poll():
+                return
 
             # Display vehicle speed in Pygame
-            screen.fill((0, 0, 0))  # Clear screen
+            display.clear()
             velocity = player_vehicle.get_velocity()
             speed = (3.6 * (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5)  # Convert to km/h
-            font = pygame.font.Font(None, 36)
-            speed_text = font.render(f"Speed: {speed:.2f} km/h", True, (255, 255, 255))
-            screen.blit(speed_text, (10, 10))  # Display speed on top-left of the window
+            display.text(f"Speed: {speed:.2f} km/h", (10, 10), (255, 255, 255))  # Display speed on top-left of the window
 
             # Check for proximity and display warning if necessary
-            warning_message = check_proximity(player_vehicle)
+            warning_message = check_proximity(proximity)
             if warning_message:
-                warning_text = font.render(warning_message, True, (255, 0, 0))
-                screen.blit(warning_text, (10, 50))  # Display warning below the speed text
+                display.text(warning_message, (10, 50), (255, 0, 0))  # Display warning below the speed text
 
-            pygame.display.flip()
-            clock.tick(144)
+            display.flip()
+            display.tick()
 
     finally:
-        # Clean up: destroy sensors and Pygame
+        # Clean up: destroy sensors and close the windows
         front_camera.destroy()
         third_person_camera.destroy()
         player_vehicle.destroy()
-        pygame.quit()
-        cv2.destroyAllWindows()
+        traffic.destroy()
+        display.close()
+        print(display.summary())
+        print(frame_mailbox.summary())
+        print(proximity.summary())
+        for pool in frame_pools.values():
+            print(pool.summary())
+        print(detector.summary())
 
 # Run the simulation
 if __name__ == "__main__":
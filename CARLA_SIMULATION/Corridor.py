@@ -0,0 +1,180 @@
+'''
+Note: This script keeps only the actors inside the ego vehicle's lane path, using a waypoint graph cached on disk per map.
+'''
+
+import math
+import os
+import re
+import zipfile
+import numpy as np
+
+# Constants
+WAYPOINT_SPACING = 2.0  # Distance between cached waypoints (m)
+MAX_SUCCESSORS = 4  # Successors stored per waypoint (junction branches)
+CORRIDOR_LENGTH = 50.0  # Length of the ego path ahead (m)
+CORRIDOR_MARGIN = 0.9  # Added to half the lane width: an actor centre this far outside the lane still overlaps it (m)
+CACHE_DIR = os.environ.get("FCW_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "fcw"))
+CACHE_VERSION = 1
+
+class WaypointGraph:
+    """
+    Lane waypoints as arrays, with the successors of every waypoint as indices.
+    """
+
+    def __init__(self, positions, yaws, lane_widths, successors):
+        """
+        :param positions: (N, 3) waypoint positions (m)
+        :param yaws: (N,) lane headings (degrees)
+        :param lane_widths: (N,) lane widths (m)
+        :param successors: (N, MAX_SUCCESSORS) successor indices, -1 padded
+        """
+        self.positions = positions
+        self.yaws = yaws
+        self.lane_widths = lane_widths
+        self.successors = successors
+        self.directions = np.stack([np.cos(np.radians(yaws)), np.sin(np.radians(yaws))], axis=1)
+
+    @classmethod
+    def build(cls, carla_map, spacing=WAYPOINT_SPACING):
+        """
+        Sample the map's lanes and link every waypoint to the waypoints following it.
+        :param carla_map: carla.Map
+        :param spacing: Distance between waypoints (m)
+        :return: WaypointGraph
+        """
+        waypoints = carla_map.generate_waypoints(spacing)
+        positions = np.array([(wp.transform.location.x, wp.transform.location.y, wp.transform.location.z) for wp in waypoints])
+        yaws = np.array([wp.transform.rotation.yaw for wp in waypoints])
+        lane_widths = np.array([wp.lane_width for wp in waypoints])
+        graph = cls(positions, yaws, lane_widths, np.full((len(waypoints), MAX_SUCCESSORS), -1, dtype=np.int64))
+
+        # Successor waypoints are new objects, so they are matched to the sampled ones by position and heading
+        cells = {}
+        for index, key in enumerate(map(tuple, np.floor(positions[:, :2] / spacing).astype(int))):
+            cells.setdefault(key, []).append(index)
+        for index, waypoint in enumerate(waypoints):
+            for slot, successor in enumerate(waypoint.next(spacing)[:MAX_SUCCESSORS]):
+                location = successor.transform.location
+                cell_x, cell_y = int(math.floor(location.x / spacing)), int(math.floor(location.y / spacing))
+                candidates = np.array([i for dx in (-1, 0, 1) for dy in (-1, 0, 1) for i in cells.get((cell_x + dx, cell_y + dy), ()) if i != index],
+                                      dtype=np.int64)
+                if len(candidates) == 0:
+                    continue
+                aligned = candidates[np.cos(np.radians(yaws[candidates] - successor.transform.rotation.yaw)) > 0.7]
+                if len(aligned):
+                    distances = np.hypot(positions[aligned, 0] - location.x, positions[aligned, 1] - location.y)
+                    graph.successors[index, slot] = aligned[np.argmin(distances)]
+        return graph
+
+    @classmethod
+    def load(cls, carla_map, spacing=WAYPOINT_SPACING, cache_dir=CACHE_DIR):
+        """
+        Load the graph of a map from the disk cache, building and caching it on first use.
+        :param carla_map: carla.Map
+        :param spacing: Distance between waypoints (m)
+        :param cache_dir: Cache directory
+        :return: WaypointGraph
+        """
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", carla_map.name)
+        path = os.path.join(cache_dir, f"waypoints_v{CACHE_VERSION}_{name}_{spacing:g}m.npz")
+        if os.path.exists(path):
+            try:
+                with np.load(path) as cached:
+                    return cls(cached["positions"], cached["yaws"], cached["lane_widths"], cached["successors"])
+            except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+                pass  # Unreadable cache file: rebuild it
+        graph = cls.build(carla_map, spacing)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write under a per-process name and rename, so parallel workers never read half a file
+        # (an open file, because np.savez appends .npz to a file name)
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as file:
+            np.savez(file, positions=graph.positions, yaws=graph.yaws, lane_widths=graph.lane_widths, successors=graph.successors)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        return graph
+
+    def nearest(self, position, yaw):
+        """
+        Find the waypoint of the lane a vehicle is driving in.
+        :param position: (2+,) vehicle position (m)
+        :param yaw: Vehicle heading (degrees)
+        :return: Waypoint index
+        """
+        distances = np.sum((self.positions[:, :2] - position[:2]) ** 2, axis=1)
+        heading = np.array([math.cos(math.radians(yaw)), math.sin(math.radians(yaw))])
+        distances[self.directions @ heading < 0] = np.inf  # Lanes in the opposite direction
+        return int(np.argmin(distances))
+
+    def path(self, start, length):
+        """
+        Follow the successors from a waypoint, taking the straightest branch at junctions.
+        :param start: Waypoint index
+        :param length: Path length (m)
+        :return: List of waypoint indices
+        """
+        path, travelled = [start], 0.0
+        while travelled < length:
+            current = path[-1]
+            successors = self.successors[current][self.successors[current] >= 0]
+            if len(successors) == 0:
+                break
+            following = successors[np.argmax(self.directions[successors] @ self.directions[current])]
+            travelled += np.linalg.norm(self.positions[following, :2] - self.positions[current, :2])
+            path.append(int(following))
+        return path
+
+class EgoCorridor:
+    """
+    The lane path ahead of the ego vehicle as a polyline, and a vectorized in-path test against it.
+    """
+
+    def __init__(self, graph, length=CORRIDOR_LENGTH, margin=CORRIDOR_MARGIN):
+        """
+        :param graph: WaypointGraph of the map
+        :param length: Length of the path ahead (m)
+        :param margin: Lateral margin added to half the lane width (m)
+        """
+        self.graph = graph
+        self.length = length
+        self.margin = margin
+        self.points = np.zeros((0, 2))
+        self.half_widths = np.zeros(0)
+
+    def update(self, position, yaw):
+        """
+        Recompute the path ahead from the ego pose.
+        :param position: (2+,) ego position (m)
+        :param yaw: Ego heading (degrees)
+        """
+        path = self.graph.path(self.graph.nearest(position, yaw), self.length)
+        self.points = np.vstack([np.asarray(position[:2], dtype=np.float64), self.graph.positions[path, :2]])
+        widths = self.graph.lane_widths[path]
+        self.half_widths = np.concatenate([widths[:1], widths]) / 2 + self.margin
+
+    def contains(self, positions, velocities=None, ego_velocity=None):
+        """
+        Test actors against the corridor in one pass over all (actor, segment) pairs.
+        :param positions: (M, 2+) actor positions (m)
+        :param velocities: (M, 2+) actor velocities (m/s), for the time-to-collision
+        :param ego_velocity: (2+,) ego velocity (m/s)
+        :return: Tuple of (in-path mask, along-path distances, ttcs) arrays; ttcs are inf when not closing or not given
+        """
+        count = len(positions)
+        if count == 0 or len(self.points) < 2:
+            return np.zeros(count, dtype=bool), np.full(count, np.inf), np.full(count, np.inf)
+        starts, segments = self.points[:-1], np.diff(self.points, axis=0)
+        lengths = np.maximum(np.linalg.norm(segments, axis=1), 1e-6)
+        offsets = positions[:, None, :2] - starts[None]
+        t = np.clip(np.einsum("mkd,kd->mk", offsets, segments) / lengths ** 2, 0.0, 1.0)
+        lateral = np.linalg.norm(offsets - t[..., None] * segments[None], axis=2)
+        segment = np.argmin(lateral, axis=1)
+        rows = np.arange(count)
+        along = np.concatenate([[0.0], np.cumsum(lengths)])[segment] + t[rows, segment] * lengths[segment]
+        inside = (lateral[rows, segment] <= self.half_widths[segment]) & (along > 0) & (along <= self.length)
+
+        ttcs = np.full(count, np.inf)
+        if velocities is not None and ego_velocity is not None:
+            direction = segments[segment] / lengths[segment, None]
+            closing = np.sum((np.asarray(ego_velocity[:2]) - velocities[:, :2]) * direction, axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ttcs = np.where(closing > 0, along / closing, np.inf)
+        return inside, along, ttcs
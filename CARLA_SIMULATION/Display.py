@@ -0,0 +1,227 @@
+'''
+Note: This script is the one place the CARLA scripts open windows: the pygame HUD and the OpenCV camera windows.
+With FCW_HEADLESS=1 no window is opened and pygame is never imported, so batch runs need no display (or GUI build of OpenCV).
+'''
+
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Constants
+HEADLESS = os.environ.get("FCW_HEADLESS") == "1"  # No pygame window and no OpenCV windows
+NO_RENDERING = os.environ.get("FCW_NO_RENDERING") == "1"  # Switch the server to no_rendering_mode; cameras stay idle
+FRAME_RATE = 144  # Main loop rate cap (loops per second)
+FONT_SIZE = 36
+TEXT_CACHE_SIZE = 256  # Rendered HUD lines kept (least recently used are evicted)
+BACKGROUND = (0, 0, 0)
+BOX_COLOR = (0, 0, 255)  # Detection boxes and labels (BGR)
+
+def set_no_rendering_mode(world, enabled=True):
+    """
+    Turn the server's rendering off (or back on). Cameras deliver nothing without rendering; radar and snapshots still work.
+    :param world: carla.World
+    :param enabled: True disables rendering
+    """
+    settings = world.get_settings()
+    settings.no_rendering_mode = enabled
+    world.apply_settings(settings)
+
+class Display:
+    """
+    The HUD window and camera windows, or a headless stand-in that only counts what would have been shown.
+    HUD lines are retained per position: a frame only re-renders and updates the lines whose text changed.
+    """
+
+    def __init__(self, width, height, headless=HEADLESS, frame_rate=FRAME_RATE):
+        """
+        :param width: HUD window width
+        :param height: HUD window height
+        :param headless: Open no windows
+        :param frame_rate: Main loop rate cap in loops per second
+        """
+        self.width, self.height = width, height
+        self.headless = headless
+        self.frame_rate = frame_rate
+        self.loops = 0
+        self.frames = 0
+        self.text_cache = OrderedDict()  # (text, color) -> rendered surface
+        self.glyphs = {}  # (character, color) -> rendered surface, for composing lines missing from the text cache
+        self.pending = {}  # Position -> (text, color) drawn this frame
+        self.drawn = {}  # Position -> ((text, color), screen rect) currently on screen
+        self.full_redraw = True
+        self.renders = 0
+        self.cache_hits = 0
+        self.updates = 0
+        self.updated_pixels = 0
+        self.started = time.perf_counter()
+        self.next_loop = self.started
+        if headless:
+            return
+        import pygame
+        import cv2
+        self.pygame, self.cv2 = pygame, cv2
+        pygame.init()
+        self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.Font(None, FONT_SIZE)
+
+    def poll(self):
+        """
+        Handle quitting and resizing of the HUD window.
+        :return: False once the window was closed
+        """
+        if self.headless:
+            return True
+        for event in self.pygame.event.get():
+            if event.type == self.pygame.QUIT:
+                return False
+            if event.type == self.pygame.VIDEORESIZE:
+                self.width, self.height = event.w, event.h
+                self.screen = self.pygame.display.set_mode((self.width, self.height), self.pygame.RESIZABLE)
+                self.full_redraw = True
+        return True
+
+    def clear(self):
+        """
+        Start a new HUD frame; lines not drawn again before flip() are erased.
+        """
+        self.pending = {}
+
+    def text(self, text, position, color):
+        """
+        Draw a line of HUD text.
+        :param text: Text to draw
+        :param position: (x, y) of the top-left corner
+        :param color: RGB color
+        """
+        if not self.headless:
+            self.pending[position] = (text, color)
+
+    def render(self, text, color):
+        """
+        Get the surface of a line, from the text cache or composed from cached glyphs.
+        :param text: Text to render
+        :param color: RGB color
+        :return: pygame.Surface
+        """
+        key = (text, color)
+        surface = self.text_cache.get(key)
+        if surface is not None:
+            self.text_cache.move_to_end(key)
+            self.cache_hits += 1
+            return surface
+        glyphs = []
+        for character in text:
+            if (character, color) not in self.glyphs:
+                self.glyphs[(character, color)] = self.font.render(character, True, color)
+            glyphs.append(self.glyphs[(character, color)])
+        surface = self.pygame.Surface((sum(glyph.get_width() for glyph in glyphs), self.font.get_height()), self.pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        self.text_cache[key] = surface
+        if len(self.text_cache) > TEXT_CACHE_SIZE:
+            self.text_cache.popitem(last=False)
+        self.renders += 1
+        return surface
+
+    def flip(self):
+        """
+        Redraw the HUD lines that changed and push only their rectangles to the window.
+        Lines are assumed not to overlap (the scripts place them 40 pixels apart).
+        """
+        if self.headless:
+            return
+        dirty = []
+        if self.full_redraw:
+            self.screen.fill(BACKGROUND)
+            self.drawn = {}
+            dirty.append(self.screen.get_rect())
+            self.full_redraw = False
+        for position in set(self.drawn) | set(self.pending):
+            previous, line = self.drawn.get(position), self.pending.get(position)
+            if previous is not None and previous[0] == line:
+                continue
+            if previous is not None:
+                self.screen.fill(BACKGROUND, previous[1])
+                dirty.append(previous[1])
+                del self.drawn[position]
+            if line is not None:
+                rect = self.screen.blit(self.render(*line), position)
+                self.drawn[position] = (line, rect)
+                dirty.append(rect)
+        if dirty:
+            self.pygame.display.update(dirty)
+            self.updates += 1
+            self.updated_pixels += sum(rect.width * rect.height for rect in dirty)
+
+    def tick(self, limit=True):
+        """
+        Count a main loop iteration and cap the loop at the frame rate (headless runs sleep instead of spinning).
+        :param limit: False only counts, for loops paced by something else (synchronous ticks)
+        """
+        self.loops += 1
+        if not limit:
+            return
+        if not self.headless:
+            self.clock.tick(self.frame_rate)
+            return
+        self.next_loop = max(self.next_loop + 1.0 / self.frame_rate, time.perf_counter() - 1.0 / self.frame_rate)
+        delay = self.next_loop - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def draw_detections(self, frame, boxes, labels, confidences):
+        """
+        Overlay detections on a camera frame: every box outline in one polylines call, then the labels.
+        :param frame: BGR image, drawn on in place
+        :param boxes: (N, 4+) array of [x1, y1, x2, y2] boxes
+        :param labels: N class names
+        :param confidences: N confidences
+        """
+        if self.headless or len(boxes) == 0:
+            return
+        corners = np.asarray(boxes)[:, :4].astype(np.int32)
+        outlines = corners[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        self.cv2.polylines(frame, list(outlines), True, BOX_COLOR, 2)
+        for (x1, y1, _, _), label, confidence in zip(corners, labels, confidences):
+            self.cv2.putText(frame, f"{label} {confidence:.2f}", (int(x1), int(y1) - 10), self.cv2.FONT_HERSHEY_SIMPLEX, 0.5, BOX_COLOR, 1)
+
+    def show(self, name, frame):
+        """
+        Show a camera frame in its window.
+        :param name: Window name
+        :param frame: BGR image
+        """
+        self.frames += 1
+        if not self.headless:
+            self.cv2.imshow(name, frame)
+
+    def wait_key(self):
+        """
+        Let OpenCV process its window events.
+        """
+        if not self.headless:
+            self.cv2.waitKey(1)
+
+    def close(self):
+        if not self.headless:
+            self.pygame.quit()
+            self.cv2.destroyAllWindows()
+
+    def summary(self):
+        """
+        Format the loop rate and camera frame throughput, for comparing runs with and without a display.
+        :return: One-line report
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        if self.headless:
+            return (f"Display (headless): loops={self.loops} loop_rate={self.loops / elapsed:.1f}/s "
+                    f"frames={self.frames} throughput={self.frames / elapsed:.1f} fps")
+        area = self.width * self.height * max(self.loops, 1)
+        return (f"Display (windowed): loops={self.loops} loop_rate={self.loops / elapsed:.1f}/s "
+                f"frames={self.frames} throughput={self.frames / elapsed:.1f} fps "
+                f"hud_updates={self.updates} hud_renders={self.renders} hud_cache_hits={self.cache_hits} "
+                f"updated_area={100 * self.updated_pixels / area:.2f}%")
@@ -17,22 +17,26 @@ Features:
 7. Enabled Autopilot for the player vehicle to follow the road and traffic rules.
 '''
 
-import carla
+from Simulator import carla
 import pygame
 import numpy as np
 import cv2
-from ultralytics import YOLO
 import threading
-from queue import Queue
+import time
+from FrameMailbox import FrameMailbox
+from ModelCache import load_model
+from FramePool import FramePool
+from Traffic import TRAFFIC_COUNT, TrafficSpawner
 
 # Initialize pygame for speed display
 pygame.init()
 WIDTH, HEIGHT = 640, 480  # Default width and height
 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
 clock = pygame.time.Clock()
+LATENCY_BUDGET = 0.1  # Frames older than this (seconds) are not worth running detection on
 
 # Load YOLOv8 model
-model = YOLO("./yolov8n.pt")  # Adjust path if necessary
+model = load_model()  # Set FCW_MODEL_PATH to use a different model file; reused if a WorkerPool parent loaded it
 
 # Connect to CARLA server
 client = carla.Client("localhost", 2000)
@@ -49,19 +53,17 @@ def spawn_vehicle():
     return player_vehicle
 
 # Function to spawn other vehicles in random locations
-def spawn_other_vehicles():
-    blueprint_library = world.get_blueprint_library()
-    vehicle_bp = blueprint_library.filter("vehicle.*")[0]  # Random vehicle model
-    spawn_points = world.get_map().get_spawn_points()
-    for spawn_point in spawn_points[1:20]:  # Limit to 5 vehicles for this example
-        vehicle = world.spawn_actor(vehicle_bp, spawn_point)
-        vehicle.set_autopilot(True)  # Set autopilot for random movement
+def spawn_other_vehicles(count=TRAFFIC_COUNT):
+    traffic = TrafficSpawner(client, world)  # Blueprint mix from FCW_TRAFFIC_MIX
+    traffic.spawn(count)  # One batch of spawns with autopilot; blocked spawn points are retried elsewhere
+    print(traffic.summary())
+    return traffic
 
 # Main function
 def main():
     global WIDTH, HEIGHT, screen  # Declare screen as global
     player_vehicle = spawn_vehicle()
-    spawn_other_vehicles()  # Spawn other vehicles
+    traffic = spawn_other_vehicles()  # Spawn other vehicles
     
     # Set up the camera
     camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
@@ -70,25 +72,32 @@ def main():
     camera_bp.set_attribute("fov", "110")
     camera = world.spawn_actor(camera_bp, carla.Transform(carla.Location(x=2.5, z=0.7)), attach_to=player_vehicle)
 
-    # Queue to hold camera frames for processing
-    frame_queue = Queue(maxsize=10)  # Buffer size 10 for the frames
+    # Recycled frame buffers, one pool per camera
+    frame_pools = {"front": FramePool("front")}
+
+    # Mailbox holding only the newest camera frame; dropped frames go back to their pool
+    frame_mailbox = FrameMailbox(latency_budget=LATENCY_BUDGET,
+                                 on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to handle camera images, detect objects, and display in OpenCV window
     def camera_callback(image):
+        capture_time = time.perf_counter()
         # Convert image to numpy array
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))  # Convert to BGRA format
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)  # Properly convert BGRA to BGR
+        frame = frame_pools["front"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert BGRA to BGR straight into the pooled buffer
+        frame_pools["front"].record_ingest(time.perf_counter() - capture_time)
 
-        # Put frame into the queue
-        if not frame_queue.full():
-            frame_queue.put(frame)
+        # Replace any frame that has not been processed yet
+        frame_mailbox.put("front", frame, image.frame, capture_time)
 
-    # Function to process frames from the queue in a separate thread
+    # Function to process frames from the mailbox in a separate thread
     def process_frames():
         while True:
-            if not frame_queue.empty():
-                frame = frame_queue.get()
+            frames = frame_mailbox.get()  # Blocks until a new frame arrives
+            if "front" in frames:
+                frame = frames["front"].data
 
                 # Object detection using YOLO
                 results = model.predict(frame, conf=0.5)
@@ -104,6 +113,7 @@ def main():
 
                 # Display the camera feed in an OpenCV window
                 cv2.imshow("Front Camera", frame)
+                frame_pools["front"].release(frame)
                 cv2.waitKey(1)
 
     # Start the frame processing thread
@@ -137,8 +147,12 @@ def main():
         # Clean up: destroy sensors and Pygame
         camera.destroy()
         player_vehicle.destroy()
+        traffic.destroy()
         pygame.quit()
         cv2.destroyAllWindows()
+        print(frame_mailbox.summary())
+        for pool in frame_pools.values():
+            print(pool.summary())
 
 # Run the simulation
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+'''
+Note: This script provides a latest-frame mailbox that hands consumers only the newest frame of each camera.
+'''
+
+import threading
+import time
+from collections import namedtuple
+
+# A frame together with its capture information and the time it entered the mailbox
+Frame = namedtuple("Frame", ["data", "frame_id", "timestamp", "queued"], defaults=[None])
+
+class FrameMailbox:
+    """
+    One slot per camera, guarded by a condition variable.
+    Producers overwrite the slot (dropping the unread frame), consumers block until something new arrives.
+    """
+
+    def __init__(self, latency_budget=None, on_drop=None):
+        """
+        :param latency_budget: Max frame age in seconds at hand-off; older frames are dropped (None disables)
+        :param on_drop: Called with (name, frame) for every frame dropped without being delivered
+        """
+        self.latency_budget = latency_budget
+        self.on_drop = on_drop
+        self.condition = threading.Condition()
+        self.slots = {}
+        self.stats = {}
+
+    def _stats(self, name):
+        if name not in self.stats:
+            self.stats[name] = {"received": 0, "delivered": 0, "dropped": 0, "stale": 0,
+                                "age_sum": 0.0, "age_max": 0.0}
+        return self.stats[name]
+
+    def put(self, name, data, frame_id=None, timestamp=None):
+        """
+        Publish a new frame, replacing any frame the consumer has not picked up yet.
+        :param name: Camera name
+        :param data: Frame image
+        :param frame_id: Simulator frame id
+        :param timestamp: Capture time from time.perf_counter() (defaults to now)
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self.condition:
+            stats = self._stats(name)
+            stats["received"] += 1
+            replaced = self.slots.get(name)
+            if replaced is not None:
+                stats["dropped"] += 1
+            self.slots[name] = Frame(data, frame_id, timestamp, time.perf_counter())
+            self.condition.notify_all()
+        if replaced is not None and self.on_drop:
+            self.on_drop(name, replaced)
+
+    def get(self, names=None, timeout=None):
+        """
+        Wait for new frames and take them out of the mailbox.
+        :param names: Camera names to wait for (defaults to all)
+        :param timeout: Max time to wait in seconds (None waits forever)
+        :return: Dict of camera name -> Frame for every camera with a new frame; empty on timeout
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        stale = []
+        try:
+            with self.condition:
+                return self._wait(names, deadline, stale)
+        finally:
+            if self.on_drop:
+                for name, frame in stale:
+                    self.on_drop(name, frame)
+
+    def _wait(self, names, deadline, stale):
+        """
+        Collect new frames, waiting on the condition until one is available or the deadline passes.
+        Must be called with the condition held; stale frames are appended to the stale list.
+        """
+        while True:
+            frames = {}
+            now = time.perf_counter()
+            for name, frame in self.slots.items():
+                if frame is None or (names is not None and name not in names):
+                    continue
+                self.slots[name] = None
+                stats = self.stats[name]
+                age = now - frame.timestamp
+                if self.latency_budget is not None and age > self.latency_budget:
+                    stats["stale"] += 1
+                    stale.append((name, frame))
+                    continue
+                stats["delivered"] += 1
+                stats["age_sum"] += age
+                stats["age_max"] = max(stats["age_max"], age)
+                frames[name] = frame
+            if frames or stale:
+                self.condition.notify_all()  # Wake producers waiting in wait_taken
+            if frames:
+                return frames
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                return frames
+            self.condition.wait(remaining)
+
+    def wait_taken(self, name, timeout=None):
+        """
+        Wait until the consumer has taken (or dropped as stale) the pending frame of a camera.
+        Lets a replay producer run in lockstep with the consumer instead of overwriting frames.
+        :param name: Camera name
+        :param timeout: Max time to wait in seconds (None waits forever)
+        :return: True if the slot is empty
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.slots.get(name) is None, timeout)
+
+    def summary(self):
+        """
+        Format the per-camera counters.
+        :return: One line per camera
+        """
+        with self.condition:
+            lines = []
+            for name, stats in self.stats.items():
+                mean_age = stats["age_sum"] / stats["delivered"] if stats["delivered"] else 0.0
+                lines.append(f"{name}: received={stats['received']} delivered={stats['delivered']} "
+                             f"dropped={stats['dropped']} stale={stats['stale']} "
+                             f"age_mean={mean_age * 1000:.1f}ms age_max={stats['age_max'] * 1000:.1f}ms")
+            return "\n".join(lines)
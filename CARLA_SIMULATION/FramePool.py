@@ -0,0 +1,93 @@
+'''
+Note: This script provides a recycled frame buffer pool so camera callbacks do not allocate a new image every frame.
+'''
+
+import sys
+import threading
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of this process.
+    :return: Peak RSS in MB, or None if it cannot be measured on this platform
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB on Linux
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+class FramePool:
+    """
+    Pool of preallocated frame buffers for one sensor, reused across frames.
+    """
+
+    def __init__(self, name, capacity=4, dtype=np.uint8):
+        """
+        :param name: Sensor name used in the report
+        :param capacity: Max number of idle buffers kept per shape
+        :param dtype: Buffer element type
+        """
+        self.name = name
+        self.capacity = capacity
+        self.dtype = dtype
+        self.free = {}  # Shape -> list of idle buffers
+        self.lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+        self.ingest_count = 0
+        self.ingest_total = 0.0
+        self.ingest_max = 0.0
+
+    def acquire(self, shape):
+        """
+        Take a buffer out of the pool, allocating one only if none is idle.
+        :param shape: Buffer shape
+        :return: NumPy array (contents are undefined)
+        """
+        with self.lock:
+            idle = self.free.get(shape)
+            if idle:
+                self.reuses += 1
+                return idle.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=self.dtype)
+
+    def release(self, buffer):
+        """
+        Give a buffer back once every consumer is done with it.
+        :param buffer: Array obtained from acquire()
+        """
+        with self.lock:
+            idle = self.free.setdefault(buffer.shape, [])
+            if len(idle) < self.capacity:
+                idle.append(buffer)
+
+    def record_ingest(self, seconds):
+        """
+        Record the time spent turning one sensor message into a pooled frame.
+        :param seconds: Ingest duration in seconds
+        """
+        with self.lock:
+            self.ingest_count += 1
+            self.ingest_total += seconds
+            self.ingest_max = max(self.ingest_max, seconds)
+
+    def summary(self):
+        """
+        Format allocation and ingest statistics.
+        :return: One-line report
+        """
+        mean = self.ingest_total / self.ingest_count if self.ingest_count else 0.0
+        rss = peak_rss_mb()
+        rss_text = f"{rss:.0f}MB" if rss is not None else "n/a"
+        return (f"{self.name} pool: allocations={self.allocations} reuses={self.reuses} "
+                f"ingest_mean={mean * 1000:.2f}ms ingest_max={self.ingest_max * 1000:.2f}ms peak_rss={rss_text}")
@@ -0,0 +1,165 @@
+'''
+Note: This script runs the detector only on keyframes and propagates tracked boxes in between, so FCW can be evaluated on every frame.
+'''
+
+import math
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FCW"))  # Shared FCW modules
+from Tracker import IoUTracker
+from Camera import calculate_distances, calculate_times_to_collision
+
+# Constants
+MIN_INTERVAL = 1  # Detect at least every this many frames...
+MAX_INTERVAL = 8  # ...and at most this many frames apart
+CONFIDENCE_DECAY = 0.85  # Confidence multiplier per propagated frame
+CONFIDENCE_FLOOR = 0.35  # A keyframe is forced when the mean track confidence falls below this
+EMA_WEIGHT = 0.2  # Smoothing of the measured inference time and camera frame period
+FCW_THRESHOLD_TTC = 3.0  # Time-to-collision warning threshold (seconds)
+
+def focal_length_from_fov(width, fov):
+    """
+    Focal length in pixels of a pinhole camera.
+    :param width: Image width in pixels
+    :param fov: Horizontal field of view in degrees
+    :return: Focal length in pixels
+    """
+    return width / (2 * math.tan(math.radians(fov) / 2))
+
+def scale_change_ttc(boxes, box_velocities, ego_speed, focal_length):
+    """
+    Estimate distance and TTC of every box from its width and rate of growth.
+    The range-rate of an object of constant width is -distance * (dw/dt) / w.
+    :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+    :param box_velocities: (N, 4) array of box corner velocities in pixels/s
+    :param ego_speed: Speed of the ego vehicle in m/s
+    :param focal_length: Focal length of the camera in pixels
+    :return: Tuple of (distances, ttcs) arrays
+    """
+    widths = boxes[:, 2] - boxes[:, 0]
+    growth = box_velocities[:, 2] - box_velocities[:, 0]
+    distances = calculate_distances(widths, focal_length=focal_length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        closing_speeds = np.nan_to_num(distances * growth / widths)
+    _, ttcs = calculate_times_to_collision(ego_speed, ego_speed - closing_speeds, distances)
+    return distances, ttcs
+
+class KeyframeScheduler:
+    """
+    Decides which frames go through the detector and propagates boxes on the others.
+    The keyframe interval adapts to the measured inference time unless a fixed interval is given.
+    """
+
+    def __init__(self, fixed_interval=None, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 confidence_floor=CONFIDENCE_FLOOR, confidence_decay=CONFIDENCE_DECAY):
+        """
+        :param fixed_interval: Detect every this many frames (1 detects every frame); None adapts to latency
+        :param min_interval: Smallest adaptive interval
+        :param max_interval: Largest adaptive interval
+        :param confidence_floor: Mean confidence that forces a keyframe
+        :param confidence_decay: Confidence multiplier per propagated frame
+        """
+        self.fixed_interval = fixed_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.confidence_floor = confidence_floor
+        self.confidence_decay = confidence_decay
+        self.tracker = IoUTracker()
+        self.interval = fixed_interval or min_interval
+        self.inference_time = None
+        self.frame_period = None
+        self.last_frame_time = None
+        self.last_frame_id = None
+        self.frames_since_keyframe = None
+        self.keyframe_time = 0.0
+        self.boxes = np.zeros((0, 4))
+        self.velocities = np.zeros((0, 4))
+        self.confidences = np.zeros(0)
+        self.classes = np.zeros(0, dtype=int)
+        self.keyframes = 0
+        self.propagated = 0
+        self.warning_latency_sum = 0.0
+        self.warning_latency_max = 0.0
+
+    def is_keyframe(self, timestamp, frame_id=None):
+        """
+        Decide whether the frame captured at timestamp must go through the detector.
+        :param timestamp: Capture time in seconds
+        :param frame_id: Simulator frame id, to measure the camera's own period across the frames the mailbox dropped
+        :return: True if the detector should run
+        """
+        if self.last_frame_time is not None:
+            # Frames dropped while the detector ran make the delivered period about the inference time, not the camera's
+            frames = frame_id - self.last_frame_id if frame_id is not None and self.last_frame_id is not None else 1
+            if frames > 0:
+                period = (timestamp - self.last_frame_time) / frames
+                self.frame_period = period if self.frame_period is None else (1 - EMA_WEIGHT) * self.frame_period + EMA_WEIGHT * period
+        self.last_frame_time = timestamp
+        self.last_frame_id = frame_id
+        if self.frames_since_keyframe is None:
+            return True
+        decayed = self.confidences * self.confidence_decay ** (self.frames_since_keyframe + 1)
+        if len(decayed) and decayed.mean() < self.confidence_floor:
+            return True
+        return self.frames_since_keyframe + 1 >= self.interval
+
+    def update(self, boxes, confidences, classes, timestamp, inference_time):
+        """
+        Take the detections of a keyframe.
+        :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+        :param confidences: (N,) array of detection confidences
+        :param classes: (N,) array of class IDs
+        :param timestamp: Capture time in seconds
+        :param inference_time: Time the detector took in seconds
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        _, _, previous_boxes, previous_timestamps = self.tracker.update(boxes, timestamp)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            velocities = (boxes - previous_boxes) / (timestamp - previous_timestamps)[:, None]
+        self.velocities = np.nan_to_num(velocities, nan=0.0, posinf=0.0, neginf=0.0)  # New tracks start at rest
+        self.boxes = boxes
+        self.confidences = np.asarray(confidences, dtype=np.float64)
+        self.classes = np.asarray(classes).astype(int)
+        self.keyframe_time = timestamp
+        self.frames_since_keyframe = 0
+        self.keyframes += 1
+
+        # Adapt the interval so the detector runs about as often as it can keep up with
+        self.inference_time = inference_time if self.inference_time is None else (1 - EMA_WEIGHT) * self.inference_time + EMA_WEIGHT * inference_time
+        if self.fixed_interval is None and self.frame_period:
+            self.interval = int(np.clip(math.ceil(self.inference_time / self.frame_period), self.min_interval, self.max_interval))
+
+    def propagate(self, timestamp):
+        """
+        Move the keyframe boxes forward to a non-keyframe with their constant pixel velocity.
+        :param timestamp: Capture time in seconds
+        :return: Tuple of (boxes, confidences, classes)
+        """
+        self.frames_since_keyframe += 1
+        self.propagated += 1
+        boxes = self.boxes + self.velocities * (timestamp - self.keyframe_time)
+        confidences = self.confidences * self.confidence_decay ** self.frames_since_keyframe
+        return boxes, confidences, self.classes
+
+    def record_warning_latency(self, capture_time):
+        """
+        Record the time from frame capture to the FCW decision.
+        :param capture_time: Capture time from time.perf_counter()
+        """
+        latency = time.perf_counter() - capture_time
+        self.warning_latency_sum += latency
+        self.warning_latency_max = max(self.warning_latency_max, latency)
+
+    def summary(self):
+        """
+        Format keyframe statistics for comparing against detecting every frame.
+        :return: One-line report
+        """
+        frames = self.keyframes + self.propagated
+        mean_latency = self.warning_latency_sum / frames if frames else 0.0
+        mode = f"fixed interval {self.fixed_interval}" if self.fixed_interval else f"adaptive interval {self.interval}"
+        return (f"Keyframes ({mode}): keyframes={self.keyframes} propagated={self.propagated} "
+                f"warning_latency_mean={mean_latency * 1000:.1f}ms warning_latency_max={self.warning_latency_max * 1000:.1f}ms")
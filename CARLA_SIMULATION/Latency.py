@@ -0,0 +1,255 @@
+'''
+Note: This script keeps per-stage latency histograms of the perception pipeline (capture to warning) and exports them
+as JSON or Prometheus text, to a file or over HTTP. Recording a sample is a few integer operations under a lock.
+'''
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Constants
+# Stages in pipeline order. capture is the callback turning the sensor's raw buffer into an array; time before the
+# callback is entered cannot be measured. end_to_end runs from callback entry to the warning shown on the HUD.
+STAGES = ["capture", "convert", "queue_wait", "inference", "postprocess", "fusion", "warning", "render", "end_to_end"]
+SUB_BUCKET_BITS = 7  # Exact up to 128us, then 64 sub-buckets per power of two: values are kept within 1/64 (1.6%)
+MAX_LATENCY = 60.0  # Longest recordable latency in seconds (longer samples are clamped)
+PROMETHEUS_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]  # Exported "le" bounds (seconds)
+QUANTILES = [0.5, 0.9, 0.99, 0.999]
+LATENCY_EXPORT = os.environ.get("FCW_LATENCY_EXPORT")  # File written periodically: *.prom for Prometheus text, else JSON
+LATENCY_PORT = os.environ.get("FCW_LATENCY_PORT")  # Serve /metrics (Prometheus) and /latency.json on this port
+EXPORT_INTERVAL = 5.0  # Seconds between file exports
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of integer microseconds: exact below 128us, then 64 linear sub-buckets per power of two,
+    so the relative error stays constant from microseconds to a minute in about 1400 counters.
+    """
+
+    def __init__(self, max_value=MAX_LATENCY):
+        """
+        :param max_value: Longest recordable latency in seconds
+        """
+        self.sub_buckets = 1 << SUB_BUCKET_BITS
+        self.half = self.sub_buckets >> 1
+        self.max_micros = int(max_value * 1e6)
+        self.counts = [0] * (self.index(self.max_micros) + 1)
+        self.count = 0
+        self.total = 0  # Sum of recorded microseconds
+        self.min = None
+        self.max = 0
+        self.lock = threading.Lock()
+
+    def index(self, micros):
+        """
+        Bucket of a value in microseconds.
+        :param micros: Non-negative integer
+        :return: Bucket index
+        """
+        if micros < self.sub_buckets:
+            return micros
+        shift = micros.bit_length() - SUB_BUCKET_BITS
+        return self.sub_buckets + (shift - 1) * self.half + (micros >> shift) - self.half
+
+    def upper(self, index):
+        """
+        Largest value in microseconds that falls into a bucket.
+        :param index: Bucket index
+        :return: Integer microseconds
+        """
+        if index < self.sub_buckets:
+            return index
+        shift, offset = divmod(index - self.sub_buckets, self.half)
+        shift += 1
+        return ((self.half + offset + 1) << shift) - 1
+
+    def record(self, seconds):
+        """
+        Add a sample.
+        :param seconds: Latency in seconds
+        """
+        micros = min(max(int(seconds * 1e6), 0), self.max_micros)
+        bucket = self.index(micros)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += micros
+            if self.min is None or micros < self.min:
+                self.min = micros
+            if micros > self.max:
+                self.max = micros
+
+    def quantile(self, q):
+        """
+        Value at a quantile, as the upper bound of the bucket holding it.
+        :param q: Quantile in [0, 1]
+        :return: Latency in seconds (0 without samples)
+        """
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = max(int(q * self.count + 0.5), 1)
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(self.upper(index), self.max) / 1e6
+        return self.max / 1e6
+
+    def cumulative(self, bounds):
+        """
+        Count the samples at or below each bound, from one consistent snapshot.
+        :param bounds: Ascending bounds in seconds
+        :return: Tuple of (list of counts, one per bound, total count, sum in seconds)
+        """
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.total
+        cumulative, seen, index = [], 0, 0
+        for bound in bounds:
+            limit = int(bound * 1e6)
+            while index < len(counts) and self.upper(index) <= limit:
+                seen += counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative, count, total / 1e6
+
+    def to_dict(self):
+        """
+        :return: Count, sum, min, mean, max and quantiles in seconds, plus the non-empty buckets as [upper_us, count]
+        """
+        with self.lock:
+            count, total, low, high = self.count, self.total, self.min or 0, self.max
+            buckets = [[self.upper(index), value] for index, value in enumerate(self.counts) if value]
+        return {"count": count, "sum": total / 1e6, "min": low / 1e6, "mean": total / count / 1e6 if count else 0.0,
+                "max": high / 1e6, "quantiles": {str(q): self.quantile(q) for q in QUANTILES}, "buckets_us": buckets}
+
+class LatencyRecorder:
+    """
+    One histogram per pipeline stage, shared by the camera callbacks, the processing thread and the main loop.
+    """
+
+    def __init__(self, stages=STAGES, export_path=LATENCY_EXPORT, export_interval=EXPORT_INTERVAL, tracer=None):
+        """
+        :param stages: Stage names
+        :param export_path: File written by maybe_export() (None disables); *.prom is Prometheus text, else JSON
+        :param export_interval: Seconds between file exports
+        :param tracer: Optional Tracer that also receives every sample with a known start time as a timeline event
+        """
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.last_export = time.perf_counter()
+        self.server = None
+        self.tracer = tracer if tracer is not None and tracer.enabled else None
+
+    def record(self, stage, seconds, started=None, frame_id=None):
+        """
+        Add a sample to a stage.
+        :param stage: Stage name
+        :param seconds: Latency in seconds
+        :param started: Start time from time.perf_counter(), if the stage ran on the calling thread (traced)
+        :param frame_id: Optional simulator frame id for the trace
+        """
+        self.histograms[stage].record(seconds)
+        if self.tracer is not None and started is not None:
+            self.tracer.complete(stage, started, started + seconds, frame_id)
+
+    def since(self, stage, started, frame_id=None):
+        """
+        Record the time elapsed since a time.perf_counter() value and return now, to chain consecutive stages.
+        :param stage: Stage name
+        :param started: Start time from time.perf_counter()
+        :param frame_id: Optional simulator frame id for the trace
+        :return: The current time.perf_counter()
+        """
+        now = time.perf_counter()
+        self.record(stage, now - started, started, frame_id)
+        return now
+
+    def to_json(self):
+        """
+        :return: JSON text with one entry per stage
+        """
+        return json.dumps({"unit": "seconds", "stages": {stage: histogram.to_dict() for stage, histogram in self.histograms.items()}})
+
+    def to_prometheus(self):
+        """
+        :return: Prometheus text exposition of one histogram metric labelled by stage
+        """
+        lines = ["# HELP fcw_stage_latency_seconds Latency of each FCW pipeline stage.",
+                 "# TYPE fcw_stage_latency_seconds histogram"]
+        for stage, histogram in self.histograms.items():
+            cumulative, count, total = histogram.cumulative(PROMETHEUS_BUCKETS)
+            for bound, below in zip(PROMETHEUS_BUCKETS, cumulative):
+                lines.append(f'fcw_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {below}')
+            lines.append(f'fcw_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'fcw_stage_latency_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'fcw_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """
+        Write the histograms to a file, replacing it atomically so a scraper never reads half a file.
+        :param path: Output file; *.prom is written as Prometheus text, anything else as JSON
+        """
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(f"{path}.tmp", "w") as file:
+            file.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def maybe_export(self):
+        """
+        Export to the configured file if the export interval has passed; cheap to call every loop.
+        """
+        if self.export_path and time.perf_counter() - self.last_export >= self.export_interval:
+            self.export(self.export_path)
+            self.last_export = time.perf_counter()
+
+    def serve(self, port):
+        """
+        Serve /metrics (Prometheus text) and /latency.json from a daemon thread.
+        :param port: TCP port
+        """
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = recorder.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/latency.json":
+                    body, content_type = recorder.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        """
+        Stop the HTTP server and write the final export.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+        if self.export_path:
+            self.export(self.export_path)
+
+    def summary(self):
+        """
+        Format the median and tail latency of every stage that has samples.
+        :return: One line per stage
+        """
+        lines = []
+        for stage, histogram in self.histograms.items():
+            if histogram.count:
+                lines.append(f"Latency {stage}: samples={histogram.count} p50={histogram.quantile(0.5) * 1000:.2f}ms "
+                             f"p99={histogram.quantile(0.99) * 1000:.2f}ms max={histogram.max / 1000:.2f}ms")
+        return "\n".join(lines)
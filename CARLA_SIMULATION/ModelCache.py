@@ -0,0 +1,26 @@
+'''
+Note: This script keeps one loaded detector per process, so a parent can load it once and share it with forked workers.
+'''
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FCW"))  # Shared FCW modules
+from Detectors import load_detector
+
+MODEL_PATH = os.environ.get("FCW_MODEL_PATH", "./yolov8n.pt")  # Set FCW_MODEL_PATH to use a different model file
+BACKEND = os.environ.get("FCW_BACKEND", "ultralytics")  # Set FCW_BACKEND to onnxruntime or openvino for the CPU backends
+
+models = {}  # (model path, backend) -> loaded detector
+
+def load_model(path=None, backend=None):
+    """
+    Load a detector, or return it if this process (or the parent it was forked from) already loaded it.
+    :param path: Model file (defaults to MODEL_PATH)
+    :param backend: Detector backend (defaults to BACKEND)
+    :return: Detector with the YOLO predict interface
+    """
+    key = (path or MODEL_PATH, backend or BACKEND)
+    if key not in models:
+        models[key] = load_detector(*key)
+    return models[key]
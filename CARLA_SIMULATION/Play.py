@@ -12,13 +12,18 @@ Features:
 2. Uses YOLOv8 object detection to detect objects in the camera feed.
 '''
 
-import carla
+from Simulator import carla
 import pygame
 import numpy as np
 import cv2
-from ultralytics import YOLO  # Make sure YOLOv8 is installed
-from queue import Queue
 import threading
+import time
+from FrameMailbox import FrameMailbox
+from ModelCache import load_model
+from FramePool import FramePool
+from Traffic import TRAFFIC_COUNT, TrafficSpawner
+from Proximity import DETECTION_RADIUS, ProximityMonitor
+from BatchInference import BatchInference
 
 # Initialize pygame
 pygame.init()
@@ -26,9 +31,13 @@ WIDTH, HEIGHT = 640, 480
 front_view_screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
 third_person_screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
 clock = pygame.time.Clock()
+LATENCY_BUDGET = 0.1  # Frames older than this (seconds) are not worth running detection on
+BATCH_SIZE = 4  # Max camera frames per YOLO predict call
+BATCH_MAX_WAIT = 0.01  # Max time (seconds) to wait for the other cameras before running a batch
+CAMERA_WINDOWS = {"front": "Front Camera", "third_person": "Third-Person Camera"}  # Analysed cameras and their windows
 
 # Load YOLOv8 model
-model = YOLO("./yolov8n.pt")  # Adjust path if necessary
+model = load_model()  # Set FCW_MODEL_PATH to use a different model file; reused if a WorkerPool parent loaded it
 
 # Connect to CARLA server
 client = carla.Client("localhost", 2000)
@@ -45,13 +54,24 @@ def spawn_vehicle():
     return player_vehicle
 
 # Function to spawn other vehicles in random locations
-def spawn_other_vehicles():
-    blueprint_library = world.get_blueprint_library()
-    vehicle_bp = blueprint_library.filter("vehicle.*")[0]  # Random vehicle model
-    spawn_points = world.get_map().get_spawn_points()
-    for spawn_point in spawn_points[1:20]:  # Limit to 5 vehicles for this example
-        vehicle = world.spawn_actor(vehicle_bp, spawn_point)
-        vehicle.set_autopilot(True)  # Set autopilot for random movement
+def spawn_other_vehicles(count=TRAFFIC_COUNT):
+    traffic = TrafficSpawner(client, world)  # Blueprint mix from FCW_TRAFFIC_MIX
+    traffic.spawn(count)  # One batch of spawns with autopilot; blocked spawn points are retried elsewhere
+    print(traffic.summary())
+    return traffic
+
+# Function to check if any vehicle is within a certain distance in front of the player
+def check_proximity(proximity, detection_radius=DETECTION_RADIUS):
+    """
+    Build the proximity warning from the vehicles ahead of the player.
+    :param proximity: ProximityMonitor of the player vehicle
+    :param detection_radius: Detection radius in meters
+    :return: Warning message, empty if no vehicle is ahead
+    """
+    vehicle_ids, distances = proximity.vehicles_ahead(detection_radius)
+    if len(vehicle_ids) == 0:
+        return ""
+    return f"WARNING: Vehicle Ahead! ({len(vehicle_ids)} within {detection_radius:.0f}m, nearest {distances[0]:.1f}m)"
 
 # Draw bounding boxes on Pygame screen
 def draw_bounding_boxes(screen, detections):
@@ -70,7 +90,8 @@ def draw_bounding_boxes(screen, detections):
 def main():
     global WIDTH, HEIGHT, screen  # Declare screen as global
     player_vehicle = spawn_vehicle()
-    spawn_other_vehicles()  # Spawn other vehicles
+    traffic = spawn_other_vehicles()  # Spawn other vehicles
+    proximity = ProximityMonitor(world, player_vehicle)  # Vehicles around the player, from one snapshot per tick
     
     # Set up the front camera
     camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
@@ -90,51 +111,56 @@ def main():
         attach_to=player_vehicle
     )
 
-    # Queues to hold camera frames for processing
-    front_frame_queue = Queue(maxsize=10)
-    third_person_frame_queue = Queue(maxsize=10)
+    # Recycled frame buffers, one pool per camera
+    frame_pools = {"front": FramePool("front"), "third_person": FramePool("third_person")}
+
+    # Mailbox holding only the newest frame of each camera; dropped frames go back to their pool
+    frame_mailbox = FrameMailbox(latency_budget=LATENCY_BUDGET,
+                                 on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to handle front camera images
     def front_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not front_frame_queue.full():
-            front_frame_queue.put(frame)
+        frame = frame_pools["front"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["front"].record_ingest(time.perf_counter() - capture_time)
+        frame_mailbox.put("front", frame, image.frame, capture_time)
 
     # Function to handle third-person camera images
     def third_person_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not third_person_frame_queue.full():
-            third_person_frame_queue.put(frame)
+        frame = frame_pools["third_person"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["third_person"].record_ingest(time.perf_counter() - capture_time)
+        frame_mailbox.put("third_person", frame, image.frame, capture_time)
+
+    # Batched detection over the newest frame of every camera
+    detector = BatchInference(model, frame_mailbox, CAMERA_WINDOWS, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT,
+                              conf=0.5, on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to process frames for front and third-person views
     def process_frames():
         while True:
-            # Process front camera
-            if not front_frame_queue.empty():
-                front_frame = front_frame_queue.get()
+            # Block until a camera delivers a new frame (the timeout keeps the OpenCV windows responsive)
+            batch = detector.next_batch(timeout=0.1)
 
-                # Object detection using YOLO
-                results = model.predict(front_frame, conf=0.5)
-                detected_objects = results[0].boxes
+            for name, (frame, results) in batch.items():
+                camera_frame = frame.data
 
-                # Draw bounding boxes on the front camera frame
-                for obj in detected_objects:
+                # Draw bounding boxes on the camera frame
+                for obj in results.boxes:
                     x1, y1, x2, y2 = map(int, obj.xyxy[0])
                     label = obj.cls
                     confidence = obj.conf[0]
-                    cv2.rectangle(front_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(front_frame, f"{label} {confidence:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-
-                cv2.imshow("Front Camera", front_frame)
+                    cv2.rectangle(camera_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                    cv2.putText(camera_frame, f"{label} {confidence:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
 
-            # Process third-person camera
-            if not third_person_frame_queue.empty():
-                third_person_frame = third_person_frame_queue.get()
-                cv2.imshow("Third-Person Camera", third_person_frame)
+                cv2.imshow(CAMERA_WINDOWS[name], camera_frame)
+                frame_pools[name].release(camera_frame)
 
             cv2.waitKey(1)
 
@@ -183,7 +209,7 @@ def main():
             screen.blit(speed_text, (10, 10))  # Display speed on top-left of the window
 
             # Check for proximity and display warning if necessary
-            warning_message = check_proximity(player_vehicle)
+            warning_message = check_proximity(proximity)
             if warning_message:
                 warning_text = font.render(warning_message, True, (255, 0, 0))
                 screen.blit(warning_text, (10, 50))  # Display warning below the speed text
@@ -196,8 +222,14 @@ def main():
         front_camera.destroy()
         third_person_camera.destroy()
         player_vehicle.destroy()
+        traffic.destroy()
         pygame.quit()
         cv2.destroyAllWindows()
+        print(frame_mailbox.summary())
+        print(proximity.summary())
+        for pool in frame_pools.values():
+            print(pool.summary())
+        print(detector.summary())
 
 # Run the simulation
 if __name__ == "__main__":
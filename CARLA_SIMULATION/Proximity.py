@@ -0,0 +1,191 @@
+'''
+Note: This script answers "which vehicles are in front of the player" from one world snapshot per tick and an incrementally updated grid.
+'''
+
+import math
+import time
+from collections import defaultdict
+import numpy as np
+
+# Constants
+DETECTION_RADIUS = 15.0  # Default proximity radius in meters
+CELL_SIZE = 15.0  # Grid cell size in meters (a query of the default radius touches 3x3 cells)
+REFRESH_INTERVAL = 1.0  # Seconds between refreshes of the vehicle id list (the only actor-list RPC)
+
+class SpatialGrid:
+    """
+    Uniform 2-D grid of slot positions. Only slots that changed cell since the last update are moved.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        """
+        :param cell_size: Cell size in meters
+        """
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)  # (cell_x, cell_y) -> slots
+        self.keys = np.zeros((0, 2), dtype=np.int64)
+        self.present = np.zeros(0, dtype=bool)
+        self.moves = 0
+
+    def update(self, positions, present):
+        """
+        Move the slots whose cell changed.
+        :param positions: (N, 2+) array of slot positions in meters
+        :param present: (N,) mask of slots holding a vehicle
+        """
+        count = len(positions)
+        if count > len(self.keys):
+            self.keys = np.vstack([self.keys, np.zeros((count - len(self.keys), 2), dtype=np.int64)])
+            self.present = np.concatenate([self.present, np.zeros(count - len(self.present), dtype=bool)])
+        keys = np.floor(positions[:, :2] / self.cell_size).astype(np.int64)
+        was_present = self.present[:count].copy()
+        changed = np.flatnonzero((present != was_present) | (present & np.any(keys != self.keys[:count], axis=1)))
+        for slot in changed:
+            if was_present[slot]:
+                cell = tuple(self.keys[slot])
+                self.cells[cell].discard(slot)
+                if not self.cells[cell]:
+                    del self.cells[cell]
+            if present[slot]:
+                self.cells[tuple(keys[slot])].add(slot)
+        self.keys[:count] = keys
+        self.present[:count] = present
+        self.moves += len(changed)
+
+    def query(self, center, radius):
+        """
+        Collect the slots in the cells overlapping a circle (a superset of the slots inside it).
+        :param center: (2+,) query position in meters
+        :param radius: Query radius in meters
+        :return: Array of candidate slots
+        """
+        low = np.floor((np.asarray(center[:2]) - radius) / self.cell_size).astype(int)
+        high = np.floor((np.asarray(center[:2]) + radius) / self.cell_size).astype(int)
+        candidates = [slot for cell_x in range(low[0], high[0] + 1) for cell_y in range(low[1], high[1] + 1)
+                      for slot in self.cells.get((cell_x, cell_y), ())]
+        return np.array(candidates, dtype=np.int64)
+
+class ProximityMonitor:
+    """
+    Tracks the other vehicles around the player from world snapshots instead of one get_transform() RPC per vehicle.
+    """
+
+    def __init__(self, world, player_vehicle, cell_size=CELL_SIZE, refresh_interval=REFRESH_INTERVAL, corridor=None):
+        """
+        :param world: carla.World
+        :param player_vehicle: The player's carla.Vehicle
+        :param cell_size: Grid cell size in meters
+        :param refresh_interval: Seconds between refreshes of the vehicle id list
+        :param corridor: Optional EgoCorridor restricting vehicles_in_path to the player's lane path
+        """
+        self.world = world
+        self.corridor = corridor
+        self.player_id = player_vehicle.id
+        self.refresh_interval = refresh_interval
+        self.grid = SpatialGrid(cell_size)
+        self.slot_ids = np.zeros(0, dtype=np.int64)  # Vehicle id per slot (-1 for free slots)
+        self.slots = {}  # Vehicle id -> slot
+        self.positions = np.zeros((0, 3))
+        self.velocities = np.zeros((0, 3))
+        self.present = np.zeros(0, dtype=bool)
+        self.player_position = np.zeros(3)
+        self.player_forward = np.array([1.0, 0.0, 0.0])
+        self.player_yaw = 0.0
+        self.player_velocity = np.zeros(3)
+        self.frame = None
+        self.last_refresh = -math.inf
+        self.updates = 0
+        self.update_time = 0.0
+
+    def refresh_vehicles(self):
+        """
+        Re-read the vehicle ids (new vehicles get free slots, destroyed ones release theirs).
+        """
+        ids = {vehicle.id for vehicle in self.world.get_actors().filter("vehicle.*") if vehicle.id != self.player_id}
+        for vehicle_id in set(self.slots) - ids:
+            self.slot_ids[self.slots.pop(vehicle_id)] = -1
+        free = list(np.flatnonzero(self.slot_ids < 0))
+        new_ids = sorted(ids - set(self.slots))
+        if len(new_ids) > len(free):
+            extra = len(new_ids) - len(free)
+            free += list(range(len(self.slot_ids), len(self.slot_ids) + extra))
+            self.slot_ids = np.concatenate([self.slot_ids, np.full(extra, -1, dtype=np.int64)])
+            self.positions = np.vstack([self.positions, np.zeros((extra, 3))])
+            self.velocities = np.vstack([self.velocities, np.zeros((extra, 3))])
+            self.present = np.concatenate([self.present, np.zeros(extra, dtype=bool)])
+        for vehicle_id, slot in zip(new_ids, free):
+            self.slots[vehicle_id] = slot
+            self.slot_ids[slot] = vehicle_id
+        self.last_refresh = time.monotonic()
+
+    def update(self):
+        """
+        Read one world snapshot and move the vehicles in the grid; does nothing if the world has not ticked.
+        :return: True if a new snapshot was processed
+        """
+        snapshot = self.world.get_snapshot()
+        if snapshot.frame == self.frame:
+            return False
+        started = time.perf_counter()
+        self.frame = snapshot.frame
+        if time.monotonic() - self.last_refresh >= self.refresh_interval:
+            self.refresh_vehicles()
+        self.present[:] = False
+        for vehicle_id, slot in self.slots.items():
+            state = snapshot.find(vehicle_id)
+            if state is not None:
+                location, velocity = state.get_transform().location, state.get_velocity()
+                self.positions[slot] = (location.x, location.y, location.z)
+                self.velocities[slot] = (velocity.x, velocity.y, velocity.z)
+                self.present[slot] = True
+        player = snapshot.find(self.player_id)
+        if player is not None:
+            transform, velocity = player.get_transform(), player.get_velocity()
+            self.player_position = np.array([transform.location.x, transform.location.y, transform.location.z])
+            self.player_velocity = np.array([velocity.x, velocity.y, velocity.z])
+            self.player_yaw = transform.rotation.yaw
+            pitch, yaw = math.radians(transform.rotation.pitch), math.radians(transform.rotation.yaw)
+            self.player_forward = np.array([math.cos(pitch) * math.cos(yaw), math.cos(pitch) * math.sin(yaw), math.sin(pitch)])
+        self.grid.update(self.positions, self.present)
+        if self.corridor is not None:
+            self.corridor.update(self.player_position, self.player_yaw)
+        self.updates += 1
+        self.update_time += time.perf_counter() - started
+        return True
+
+    def vehicles_ahead(self, radius=DETECTION_RADIUS):
+        """
+        Find every vehicle within a radius in front of the player, nearest first.
+        :param radius: Detection radius in meters
+        :return: Tuple of (vehicle ids, distances) arrays
+        """
+        self.update()
+        slots = self.grid.query(self.player_position, radius)
+        offsets = self.positions[slots] - self.player_position
+        distances = np.linalg.norm(offsets, axis=1)
+        ahead = (distances < radius) & (offsets @ self.player_forward > 0)
+        order = np.argsort(distances[ahead])
+        return self.slot_ids[slots[ahead][order]], distances[ahead][order]
+
+    def vehicles_in_path(self, radius=DETECTION_RADIUS):
+        """
+        Find the vehicles within a radius that are inside the player's lane corridor, nearest first.
+        Vehicles in adjacent lanes and oncoming traffic are left out.
+        :param radius: Search radius in meters
+        :return: Tuple of (vehicle ids, along-path distances, ttcs) arrays
+        """
+        self.update()
+        slots = self.grid.query(self.player_position, radius)
+        slots = slots[np.linalg.norm(self.positions[slots] - self.player_position, axis=1) < radius]
+        inside, along, ttcs = self.corridor.contains(self.positions[slots], self.velocities[slots], self.player_velocity)
+        order = np.argsort(along[inside])
+        return self.slot_ids[slots[inside][order]], along[inside][order], ttcs[inside][order]
+
+    def summary(self):
+        """
+        Format update statistics.
+        :return: One-line report
+        """
+        mean = self.update_time / self.updates if self.updates else 0.0
+        return (f"Proximity: snapshots={self.updates} vehicles={len(self.slots)} mean_update={mean * 1000:.2f}ms "
+                f"grid_moves={self.grid.moves}")
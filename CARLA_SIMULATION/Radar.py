@@ -1,24 +1,40 @@
-import carla
-import pygame
+from Simulator import carla
 import numpy as np
 import cv2
-from ultralytics import YOLO
+import os
 import threading
-from queue import Queue
-
-# Initialize pygame for speed display
-pygame.init()
+import time
+from FrameMailbox import FrameMailbox
+from ModelCache import load_model
+from FramePool import FramePool
+from Traffic import TRAFFIC_COUNT, TrafficSpawner
+from Proximity import DETECTION_RADIUS, ProximityMonitor
+from BatchInference import BatchInference
+from RadarBuffer import RADAR_DTYPE, RadarRingBuffer, RadarSummary, radar_to_array
+from RadarClustering import cluster_radar_points
+from RadarROI import RadarROIDetector
+from Recording import Recording, ReplaySource, SensorRecorder, actor_snapshot, actors_ahead, ego_state
+from Display import NO_RENDERING, Display, set_no_rendering_mode
+
+# Pygame speed display and camera windows (none with FCW_HEADLESS=1)
 WIDTH, HEIGHT = 640, 480  # Default width and height
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-clock = pygame.time.Clock()
+display = Display(WIDTH, HEIGHT)
+LATENCY_BUDGET = 0.1  # Frames older than this (seconds) are not worth running detection on
+BATCH_SIZE = 4  # Max camera frames per YOLO predict call
+BATCH_MAX_WAIT = 0.01  # Max time (seconds) to wait for the other cameras before running a batch
+CAMERA_WINDOWS = {"front": "Front Camera", "third_person": "Third-Person Camera"}  # Analysed cameras and their windows
+ROI_MODE = True  # Detect the front camera only inside radar-cued crops (with a periodic full-frame pass)
+RECORD_PATH = os.environ.get("FCW_RECORD")  # Record front camera, radar, ego state and actors to this directory
+REPLAY_PATH = os.environ.get("FCW_REPLAY")  # Replay this recording instead of connecting to a simulator
+REPLAY_REALTIME = os.environ.get("FCW_REPLAY_REALTIME") == "1"  # Pace the replay by simulation time instead of full speed
 
 # Load YOLOv8 model
-model = YOLO("./yolov8n.pt")  # Adjust path if necessary
+model = load_model()  # Set FCW_MODEL_PATH to use a different model file; reused if a WorkerPool parent loaded it
 
 # Connect to CARLA server
 client = carla.Client("localhost", 2000)
 client.set_timeout(15.0)
-world = client.get_world()
+world = client.get_world() if REPLAY_PATH is None else None  # Replays need no server
 
 # Function to spawn player vehicle
 def spawn_vehicle():
@@ -30,38 +46,34 @@ def spawn_vehicle():
     return player_vehicle
 
 # Function to spawn other vehicles in random locations
-def spawn_other_vehicles():
-    blueprint_library = world.get_blueprint_library()
-    vehicle_bp = blueprint_library.filter("vehicle.*")[0]  # Random vehicle model
-    spawn_points = world.get_map().get_spawn_points()
-    for spawn_point in spawn_points[1:20]:  # Limit to 5 vehicles for this example
-        vehicle = world.spawn_actor(vehicle_bp, spawn_point)
-        vehicle.set_autopilot(True)  # Set autopilot for random movement
+def spawn_other_vehicles(count=TRAFFIC_COUNT):
+    traffic = TrafficSpawner(client, world)  # Blueprint mix from FCW_TRAFFIC_MIX
+    traffic.spawn(count)  # One batch of spawns with autopilot; blocked spawn points are retried elsewhere
+    print(traffic.summary())
+    return traffic
 
 # Function to check if any vehicle is within a certain distance in front of the player
-def check_proximity(player_vehicle):
-    detection_radius = 15.0  # Detection radius in meters
-    warning_message = ""
-    vehicles = world.get_actors().filter("vehicle.*")
-    player_transform = player_vehicle.get_transform()
-    player_location = player_transform.location
-    player_forward = player_transform.get_forward_vector()
-
-    for vehicle in vehicles:
-        if vehicle.id != player_vehicle.id:
-            other_location = vehicle.get_transform().location
-            distance = player_location.distance(other_location)
-            if distance < detection_radius:
-                direction = other_location - player_location
-                forward_dot = player_forward.x * direction.x + player_forward.y * direction.y + player_forward.z * direction.z
-                if forward_dot > 0:  # Check if the vehicle is in front
-                    warning_message = "WARNING: Vehicle Ahead!"
-                    break
-
-    return warning_message
+def check_proximity(proximity, detection_radius=DETECTION_RADIUS):
+    """
+    Build the proximity warning from the vehicles ahead of the player.
+    :param proximity: ProximityMonitor of the player vehicle
+    :param detection_radius: Detection radius in meters
+    :return: Warning message, empty if no vehicle is ahead
+    """
+    vehicle_ids, distances = proximity.vehicles_ahead(detection_radius)
+    if len(vehicle_ids) == 0:
+        return ""
+    return f"WARNING: Vehicle Ahead! ({len(vehicle_ids)} within {detection_radius:.0f}m, nearest {distances[0]:.1f}m)"
 
 # Function to set up and handle radar data
-def setup_radar(player_vehicle):
+def setup_radar(player_vehicle, radar_buffer, summary_interval=None):
+    """
+    Spawn the radar and publish every sweep as a structured array to the ring buffer.
+    :param player_vehicle: Vehicle to attach the radar to
+    :param radar_buffer: RadarRingBuffer that receives the sweeps
+    :param summary_interval: Seconds between printed summaries, or None to stay quiet
+    :return: The radar actor
+    """
     radar_bp = world.get_blueprint_library().find("sensor.other.radar")
     radar_bp.set_attribute("horizontal_fov", "30")  # Set Field of View
     radar_bp.set_attribute("vertical_fov", "10")
@@ -69,138 +81,204 @@ def setup_radar(player_vehicle):
 
     radar_transform = carla.Transform(carla.Location(x=2.5, z=1.0))  # Position radar sensor
     radar = world.spawn_actor(radar_bp, radar_transform, attach_to=player_vehicle)
+    summary = RadarSummary(summary_interval) if summary_interval is not None else None
 
     # Callback to process radar data
     def radar_callback(data):
-        print("\nRadar detected:")
-        for detection in data:
-            azimuth = np.degrees(detection.azimuth)
-            altitude = np.degrees(detection.altitude)
-            distance = detection.depth
-            velocity = detection.velocity
-            print(f"Object: Distance={distance:.2f}m, Azimuth={azimuth:.2f}°, Altitude={altitude:.2f}°, Velocity={velocity:.2f}m/s")
+        points = radar_to_array(data)  # velocity, azimuth, altitude, depth per detection
+        radar_buffer.publish(points, data.frame, data.timestamp)
+        if summary:
+            summary(points)
 
     radar.listen(lambda data: radar_callback(data))
     return radar
 
 # Main function
 def main():
-    global WIDTH, HEIGHT, screen  # Declare screen as global
-    player_vehicle = spawn_vehicle()
-    spawn_other_vehicles()  # Spawn other vehicles
-    
-    # Set up the front camera
-    camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
-    camera_bp.set_attribute("image_size_x", f"{WIDTH}")
-    camera_bp.set_attribute("image_size_y", f"{HEIGHT}")
-    camera_bp.set_attribute("fov", "110")
-    front_camera = world.spawn_actor(camera_bp, carla.Transform(carla.Location(x=2.5, z=0.7)), attach_to=player_vehicle)
-
-    # Set up the third-person camera
-    third_person_camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
-    third_person_camera_bp.set_attribute("image_size_x", f"{WIDTH}")
-    third_person_camera_bp.set_attribute("image_size_y", f"{HEIGHT}")
-    third_person_camera_bp.set_attribute("fov", "110")
-    third_person_camera = world.spawn_actor(
-        third_person_camera_bp,
-        carla.Transform(carla.Location(x=-6.0, z=2.5), carla.Rotation(pitch=-10)),
-        attach_to=player_vehicle
-    )
-
-    # Set up radar sensor
-    radar = setup_radar(player_vehicle)
-
-    # Queues to hold camera frames for processing
-    front_frame_queue = Queue(maxsize=10)
-    third_person_frame_queue = Queue(maxsize=10)
+    radar_buffer = RadarRingBuffer()
+
+    # Recycled frame buffers, one pool per camera
+    frame_pools = {"front": FramePool("front"), "third_person": FramePool("third_person")}
+
+    # Mailbox holding only the newest frame of each camera; dropped frames go back to their pool
+    # (a lockstep replay hands over every frame, so it has no latency budget)
+    frame_mailbox = FrameMailbox(latency_budget=LATENCY_BUDGET if REPLAY_PATH is None else None,
+                                 on_drop=lambda name, frame: frame_pools[name].release(frame.data))
+
+    if REPLAY_PATH is not None:
+        # Feed the recorded front camera and radar through the same mailbox and radar buffer
+        replay = ReplaySource(Recording(REPLAY_PATH), frame_mailbox, radar_buffer, frame_pools["front"], realtime=REPLAY_REALTIME)
+        player_vehicle = replay.vehicle
+        sensors, recorder, cameras = [], None, ["front"]
+    else:
+        replay = None
+        player_vehicle = spawn_vehicle()
+        traffic = spawn_other_vehicles()  # Spawn other vehicles
+        proximity = ProximityMonitor(world, player_vehicle)  # Vehicles around the player, from one snapshot per tick
+        cameras = CAMERA_WINDOWS
+
+        # Set up the front camera
+        camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
+        camera_bp.set_attribute("image_size_x", f"{WIDTH}")
+        camera_bp.set_attribute("image_size_y", f"{HEIGHT}")
+        camera_bp.set_attribute("fov", "110")
+        front_camera = world.spawn_actor(camera_bp, carla.Transform(carla.Location(x=2.5, z=0.7)), attach_to=player_vehicle)
+
+        # Set up the third-person camera
+        third_person_camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
+        third_person_camera_bp.set_attribute("image_size_x", f"{WIDTH}")
+        third_person_camera_bp.set_attribute("image_size_y", f"{HEIGHT}")
+        third_person_camera_bp.set_attribute("fov", "110")
+        third_person_camera = world.spawn_actor(
+            third_person_camera_bp,
+            carla.Transform(carla.Location(x=-6.0, z=2.5), carla.Rotation(pitch=-10)),
+            attach_to=player_vehicle
+        )
+
+        # Set up radar sensor
+        radar = setup_radar(player_vehicle, radar_buffer, summary_interval=1.0)
+        sensors = [front_camera, third_person_camera, radar]
+
+        # Optionally record every front camera frame with the radar sweep, ego state and other vehicles of its tick
+        recorder = SensorRecorder(RECORD_PATH, WIDTH, HEIGHT) if RECORD_PATH else None
+        other_vehicle_ids = [vehicle.id for vehicle in world.get_actors().filter("vehicle.*") if vehicle.id != player_vehicle.id]
 
     # Function to handle front camera images
     def front_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not front_frame_queue.full():
-            front_frame_queue.put(frame)
+        frame = frame_pools["front"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["front"].record_ingest(time.perf_counter() - capture_time)
+        if recorder:
+            points = radar_buffer.get_frame(image.frame)
+            if points is None:
+                latest_sweep = radar_buffer.latest()
+                points = latest_sweep[0] if latest_sweep is not None else np.zeros(0, dtype=RADAR_DTYPE)
+            recorder.record(image.frame, image.timestamp, frame, points, *ego_state(player_vehicle),
+                            actor_snapshot(world, other_vehicle_ids))
+        frame_mailbox.put("front", frame, image.frame, capture_time)
 
     # Function to handle third-person camera images
     def third_person_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not third_person_frame_queue.full():
-            third_person_frame_queue.put(frame)
-
-    # Function to process frames for front and third-person views
-    def process_frames():
-        while True:
-            # Process front camera
-            if not front_frame_queue.empty():
-                front_frame = front_frame_queue.get()
+        frame = frame_pools["third_person"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["third_person"].record_ingest(time.perf_counter() - capture_time)
+        frame_mailbox.put("third_person", frame, image.frame, capture_time)
 
-                # Object detection using YOLO
-                results = model.predict(front_frame, conf=0.5)
-                detected_objects = results[0].boxes
+    # Batched detection over the newest frame of every camera
+    detector = BatchInference(model, frame_mailbox, cameras, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT,
+                              conf=0.5, on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
-                # Draw bounding boxes on the front camera frame
-                for obj in detected_objects:
-                    x1, y1, x2, y2 = map(int, obj.xyxy[0])
-                    label = obj.cls
-                    confidence = obj.conf[0]
-                    cv2.rectangle(front_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(front_frame, f"{label} {confidence:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+    # Radar-cued detector for the front camera (radar sits 0.3 m above the front camera)
+    roi_detector = RadarROIDetector(model, focal_length=WIDTH / (2 * np.tan(np.radians(110) / 2)), radar_offset=(0.0, 0.0, 0.3))
 
-                cv2.imshow("Front Camera", front_frame)
+    def select_for_detection(name, frame):
+        return not (ROI_MODE and name == "front")
 
-            # Process third-person camera
-            if not third_person_frame_queue.empty():
-                third_person_frame = third_person_frame_queue.get()
-                cv2.imshow("Third-Person Camera", third_person_frame)
-
-            cv2.waitKey(1)
+    # Function to process frames for front and third-person views
+    def process_frames():
+        while True:
+            # Block until a camera delivers a new frame (the timeout keeps the OpenCV windows responsive)
+            batch = detector.next_batch(timeout=0.1, detect=select_for_detection)
+
+            for name, (frame, results) in batch.items():
+                camera_frame = frame.data
+                if results is not None:
+                    detections = results.boxes.data.cpu().numpy()
+                else:
+                    # Use the radar sweep of the same simulator frame if there is one, else the newest sweep
+                    points = radar_buffer.get_frame(frame.frame_id)
+                    if points is None:
+                        latest_sweep = radar_buffer.latest()
+                        points = latest_sweep[0] if latest_sweep is not None else np.zeros(0, dtype=RADAR_DTYPE)
+                    clusters, _ = cluster_radar_points(points)
+                    detections, _ = roi_detector.detect(camera_frame, clusters)
+
+                # Draw bounding boxes on the camera frame (skipped when headless)
+                display.draw_detections(camera_frame, detections, [model.names[int(label)] for label in detections[:, 5]], detections[:, 4])
+
+                display.show(CAMERA_WINDOWS[name], camera_frame)
+                frame_pools[name].release(camera_frame)
+
+            display.wait_key()
 
     # Start the frame processing thread
     frame_processing_thread = threading.Thread(target=process_frames, daemon=True)
     frame_processing_thread.start()
 
-    # Set camera callbacks
-    front_camera.listen(lambda image: front_camera_callback(image))
-    third_person_camera.listen(lambda image: third_person_camera_callback(image))
+    # Set camera callbacks, or start feeding the recording
+    if replay is not None:
+        replay.start()
+    elif NO_RENDERING:
+        set_no_rendering_mode(world)  # Cameras deliver nothing: only the radar and the proximity warning run
+    else:
+        front_camera.listen(lambda image: front_camera_callback(image))
+        third_person_camera.listen(lambda image: third_person_camera_callback(image))
 
     try:
         while True:
             # Handle quitting the game and resizing
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return
-                if event.type == pygame.VIDEORESIZE:
-                    WIDTH, HEIGHT = event.w, event.h
-                    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+            if not display.poll():
+                return
+
+            # Stop once the recording has played out (after the window events, which include resizing)
+            if replay is not None and replay.finished.is_set():
+                return
 
             # Display vehicle speed in Pygame
-            screen.fill((0, 0, 0))  # Clear screen
+            display.clear()
             velocity = player_vehicle.get_velocity()
             speed = (3.6 * (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5)  # Convert to km/h
-            font = pygame.font.Font(None, 36)
-            speed_text = font.render(f"Speed: {speed:.2f} km/h", True, (255, 255, 255))
-            screen.blit(speed_text, (10, 10))  # Display speed on top-left of the window
+            display.text(f"Speed: {speed:.2f} km/h", (10, 10), (255, 255, 255))  # Display speed on top-left of the window
 
-            # Check for proximity and display warning if necessary
-            warning_message = check_proximity(player_vehicle)
+            # Check for proximity and display warning if necessary (from the recorded vehicles during replay)
+            if replay is not None:
+                warning_message = "WARNING: Vehicle Ahead!" if replay.current is not None and len(actors_ahead(replay.current, 15.0)[0]) else ""
+            else:
+                warning_message = check_proximity(proximity)
             if warning_message:
-                warning_text = font.render(warning_message, True, (255, 0, 0))
-                screen.blit(warning_text, (10, 50))  # Display warning below the speed text
+                display.text(warning_message, (10, 50), (255, 0, 0))  # Display warning below the speed text
+
+            # Group the latest radar sweep into objects and display the nearest one
+            latest_sweep = radar_buffer.latest()
+            if latest_sweep is not None:
+                clusters, _ = cluster_radar_points(latest_sweep[0])
+                if len(clusters):
+                    nearest = clusters[np.argmin(clusters["depth"])]
+                    display.text(f"Radar: {len(clusters)} objects, nearest {nearest['depth']:.1f}m "
+                                 f"({nearest['velocity']:.1f}m/s)", (10, 90), (255, 255, 0))
 
-            pygame.display.flip()
-            clock.tick(144)
+            display.flip()
+            display.tick()
 
     finally:
-        # Clean up: destroy sensors and Pygame
-        front_camera.destroy()
-        third_person_camera.destroy()
-        radar.destroy()  # Destroy the radar sensor
-        player_vehicle.destroy()
-        pygame.quit()
-        cv2.destroyAllWindows()
+        # Clean up: destroy sensors and close the windows
+        for sensor in sensors:  # Cameras and radar
+            sensor.destroy()
+        if replay is None:
+            player_vehicle.destroy()
+            traffic.destroy()
+            if NO_RENDERING:
+                set_no_rendering_mode(world, False)
+        display.close()
+        print(display.summary())
+        print(frame_mailbox.summary())
+        if replay is None:
+            print(proximity.summary())
+        for pool in frame_pools.values():
+            print(pool.summary())
+        print(detector.summary())
+        print(roi_detector.summary())
+        if recorder:
+            recorder.close()
+            print(recorder.summary())
+        if replay is not None:
+            print(replay.summary())
 
 # Run the simulation
 if __name__ == "__main__":
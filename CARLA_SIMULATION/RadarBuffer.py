@@ -0,0 +1,117 @@
+'''
+Note: This script provides zero-copy ingestion of CARLA radar measurements and a ring buffer to publish them to consumers.
+'''
+
+import threading
+import time
+import numpy as np
+
+# Same layout as RadarMeasurement.raw_data: four float32 values per detection (angles in radians)
+RADAR_DTYPE = np.dtype([
+    ("velocity", np.float32),  # Radial velocity (m/s), negative when approaching
+    ("azimuth", np.float32),  # Horizontal angle (rad)
+    ("altitude", np.float32),  # Vertical angle (rad)
+    ("depth", np.float32),  # Distance (m)
+])
+
+def radar_to_array(measurement):
+    """
+    View a RadarMeasurement as a structured array without copying or iterating its points.
+    :param measurement: carla.RadarMeasurement
+    :return: NumPy structured array with RADAR_DTYPE (keeps the measurement buffer alive)
+    """
+    return np.frombuffer(measurement.raw_data, dtype=RADAR_DTYPE)
+
+class RadarRingBuffer:
+    """
+    Fixed-size ring of the most recent radar sweeps, written by the sensor thread and read by consumers.
+    """
+
+    def __init__(self, capacity=8):
+        """
+        :param capacity: Number of sweeps kept
+        """
+        self.capacity = capacity
+        self.sweeps = [None] * capacity
+        self.frames = np.full(capacity, -1, dtype=np.int64)
+        self.timestamps = np.zeros(capacity)
+        self.count = 0  # Total sweeps published so far
+        self.lock = threading.Lock()
+
+    def publish(self, points, frame, timestamp):
+        """
+        Store a sweep, overwriting the oldest one when full.
+        :param points: Structured radar array
+        :param frame: Simulator frame id of the sweep
+        :param timestamp: Simulation time of the sweep in seconds
+        """
+        with self.lock:
+            index = self.count % self.capacity
+            self.sweeps[index] = points
+            self.frames[index] = frame
+            self.timestamps[index] = timestamp
+            self.count += 1
+
+    def latest(self):
+        """
+        Get the newest sweep.
+        :return: Tuple of (points, frame, timestamp), or None if nothing was published yet
+        """
+        with self.lock:
+            if self.count == 0:
+                return None
+            index = (self.count - 1) % self.capacity
+            return self.sweeps[index], self.frames[index], self.timestamps[index]
+
+    def get_frame(self, frame):
+        """
+        Get the sweep captured at a given simulator frame.
+        :param frame: Simulator frame id
+        :return: Structured radar array, or None if the frame is not (or no longer) in the buffer
+        """
+        with self.lock:
+            indices = np.flatnonzero(self.frames == frame)
+            return self.sweeps[indices[0]] if len(indices) else None
+
+    def recent(self, count=None):
+        """
+        Get up to count of the newest sweeps, oldest first.
+        :param count: Number of sweeps (defaults to the whole buffer)
+        :return: List of (points, frame, timestamp) tuples
+        """
+        with self.lock:
+            available = min(self.count, self.capacity)
+            count = available if count is None else min(count, available)
+            indices = [(self.count - count + i) % self.capacity for i in range(count)]
+            return [(self.sweeps[i], self.frames[i], self.timestamps[i]) for i in indices]
+
+class RadarSummary:
+    """
+    Rate-limited one-line summary of radar sweeps, replacing per-point printing.
+    """
+
+    def __init__(self, interval=1.0):
+        """
+        :param interval: Minimum time between two printed summaries in seconds
+        """
+        self.interval = interval
+        self.last_print = 0.0
+        self.sweeps = 0
+        self.points = 0
+
+    def __call__(self, points):
+        self.sweeps += 1
+        self.points += len(points)
+        now = time.monotonic()
+        if now - self.last_print < self.interval:
+            return
+        if len(points):
+            nearest = np.argmin(points["depth"])
+            print(f"Radar: {self.sweeps} sweeps, {self.points / self.sweeps:.0f} points/sweep, "
+                  f"nearest={points['depth'][nearest]:.2f}m at {np.degrees(points['azimuth'][nearest]):.2f}°, "
+                  f"closing={max(0.0, -float(points['velocity'].min())):.2f}m/s")
+        else:
+            print(f"Radar: {self.sweeps} sweeps, no detections")
+        self.last_print = now
+        self.sweeps = 0
+        self.points = 0
@@ -0,0 +1,113 @@
+'''
+Note: This script groups raw radar returns into object hypotheses using a Cartesian/Doppler hash grid.
+'''
+
+import numpy as np
+
+# Constants
+CELL_SIZE = 1.0  # Grid cell size in meters
+VELOCITY_CELL = 1.0  # Doppler bin width in m/s; neighbouring bins are merged
+MIN_POINTS = 2  # Clusters with fewer returns are treated as clutter
+
+CLUSTER_DTYPE = np.dtype([
+    ("x", np.float32),  # Centroid forward of the sensor (m)
+    ("y", np.float32),  # Centroid to the right of the sensor (m)
+    ("z", np.float32),  # Centroid above the sensor (m)
+    ("depth", np.float32),  # Distance of the centroid (m)
+    ("azimuth", np.float32),  # Azimuth of the centroid (rad)
+    ("velocity", np.float32),  # Mean radial velocity (m/s)
+    ("extent_x", np.float32),  # Length of the cluster along x (m)
+    ("extent_y", np.float32),  # Width of the cluster along y (m)
+    ("num_points", np.int32),  # Number of radar returns in the cluster
+])
+
+# Offsets of a cell and its 26 neighbours in (x, y, velocity) grid space
+NEIGHBOUR_OFFSETS = np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij")).reshape(3, -1).T
+
+def radar_to_cartesian(points):
+    """
+    Convert radar returns from polar to sensor-frame Cartesian coordinates.
+    :param points: Structured radar array (velocity, azimuth, altitude, depth)
+    :return: (N, 3) array of [x, y, z] in meters
+    """
+    depth = points["depth"].astype(np.float64)
+    azimuth = points["azimuth"].astype(np.float64)
+    altitude = points["altitude"].astype(np.float64)
+    horizontal = depth * np.cos(altitude)
+    return np.stack([horizontal * np.cos(azimuth), horizontal * np.sin(azimuth), depth * np.sin(altitude)], axis=1)
+
+def connected_components(count, edges_a, edges_b):
+    """
+    Label the connected components of a graph by vectorized min-label propagation.
+    :param count: Number of nodes
+    :param edges_a: Array of edge start nodes
+    :param edges_b: Array of edge end nodes
+    :return: (count,) array of component labels, numbered from 0
+    """
+    labels = np.arange(count)
+    while True:
+        updated = labels.copy()
+        np.minimum.at(updated, edges_a, labels[edges_b])
+        np.minimum.at(updated, edges_b, labels[edges_a])
+        updated = updated[updated]  # Pointer jumping shortens long chains
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return np.unique(labels, return_inverse=True)[1]
+
+def cluster_radar_points(points, cell_size=CELL_SIZE, velocity_cell=VELOCITY_CELL, min_points=MIN_POINTS):
+    """
+    Cluster one radar sweep into objects.
+    Returns are binned into a (x, y, velocity) grid; occupied cells that touch each other in all three
+    dimensions are merged, so nearby returns with similar Doppler form one object.
+    :param points: Structured radar array (velocity, azimuth, altitude, depth)
+    :param cell_size: Spatial cell size in meters
+    :param velocity_cell: Doppler bin width in m/s
+    :param min_points: Minimum number of returns for a cluster to be reported
+    :return: Tuple of (clusters, labels); clusters is a CLUSTER_DTYPE array and labels maps each
+             return to its cluster index (-1 for returns in dropped clusters)
+    """
+    if len(points) == 0:
+        return np.zeros(0, dtype=CLUSTER_DTYPE), np.zeros(0, dtype=np.int64)
+    xyz = radar_to_cartesian(points)
+    velocity = points["velocity"].astype(np.float64)
+
+    # Hash every return into a padded integer grid so neighbour keys never wrap around
+    grid = np.floor(np.column_stack([xyz[:, 0] / cell_size, xyz[:, 1] / cell_size, velocity / velocity_cell])).astype(np.int64)
+    grid -= grid.min(axis=0) - 1
+    dims = grid.max(axis=0) + 2
+    strides = np.array([dims[1] * dims[2], dims[2], 1])
+    keys = grid @ strides
+    cell_keys, point_cell = np.unique(keys, return_inverse=True)
+
+    # Find occupied neighbour cells with one sorted lookup for all cells and offsets
+    neighbour_keys = cell_keys[:, None] + NEIGHBOUR_OFFSETS @ strides
+    positions = np.minimum(np.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+    found = cell_keys[positions] == neighbour_keys
+    edges_a = np.repeat(np.arange(len(cell_keys)), found.sum(axis=1))
+    edges_b = positions[found]
+    cell_labels = connected_components(len(cell_keys), edges_a, edges_b)
+    labels = cell_labels[point_cell]
+
+    # Aggregate the returns of every cluster
+    count = labels.max() + 1
+    num_points = np.bincount(labels, minlength=count)
+    centroid = np.stack([np.bincount(labels, xyz[:, i], count) for i in range(3)], axis=1) / num_points[:, None]
+    low = np.full((count, 2), np.inf)
+    high = np.full((count, 2), -np.inf)
+    np.minimum.at(low, labels, xyz[:, :2])
+    np.maximum.at(high, labels, xyz[:, :2])
+
+    clusters = np.zeros(count, dtype=CLUSTER_DTYPE)
+    clusters["x"], clusters["y"], clusters["z"] = centroid.T
+    clusters["depth"] = np.linalg.norm(centroid, axis=1)
+    clusters["azimuth"] = np.arctan2(centroid[:, 1], centroid[:, 0])
+    clusters["velocity"] = np.bincount(labels, velocity, count) / num_points
+    clusters["extent_x"], clusters["extent_y"] = (high - low).T
+    clusters["num_points"] = num_points
+
+    # Drop clutter and renumber the remaining clusters
+    keep = num_points >= min_points
+    remap = np.full(count, -1)
+    remap[keep] = np.arange(keep.sum())
+    return clusters[keep], remap[labels]
@@ -0,0 +1,132 @@
+'''
+Note: This script projects clustered radar objects into the front camera and runs the detector only on padded crops around them.
+'''
+
+import time
+import numpy as np
+
+# Constants
+FULL_FRAME_INTERVAL = 10  # Run a full-frame pass every this many frames as a safety net
+ROI_PADDING = 1.5  # Crop size as a multiple of the expected object size
+MIN_ROI_SIZE = 96  # Smallest crop side in pixels
+OBJECT_WIDTH = 2.0  # Assumed object width (m) when the cluster is narrower
+OBJECT_HEIGHT = 1.6  # Assumed object height (m)
+ROI_IMGSZ = 320  # Detector input size for crops (full frames use the model default)
+
+def project_clusters(clusters, focal_length, width, height, radar_offset):
+    """
+    Project radar clusters into image-space boxes of their expected size.
+    :param clusters: CLUSTER_DTYPE array (radar frame: x forward, y right, z up)
+    :param focal_length: Camera focal length in pixels
+    :param width: Image width in pixels
+    :param height: Image height in pixels
+    :param radar_offset: (3,) position of the radar relative to the camera in meters
+    :return: (N, 4) array of [x1, y1, x2, y2] boxes for clusters in front of the camera
+    """
+    x = clusters["x"] + radar_offset[0]
+    y = clusters["y"] + radar_offset[1]
+    z = clusters["z"] + radar_offset[2]
+    ahead = x > 0.5
+    x, y, z = x[ahead], y[ahead], z[ahead]
+    u = width / 2 + focal_length * y / x
+    v = height / 2 - focal_length * z / x
+    half_w = np.maximum(focal_length * np.maximum(clusters["extent_y"][ahead], OBJECT_WIDTH) / x * ROI_PADDING, MIN_ROI_SIZE) / 2
+    half_h = np.maximum(focal_length * OBJECT_HEIGHT / x * ROI_PADDING, MIN_ROI_SIZE) / 2
+    return np.stack([u - half_w, v - half_h, u + half_w, v + half_h], axis=1)
+
+def clip_and_merge(rois, width, height):
+    """
+    Clip crops to the image and merge overlapping ones so no pixel is processed twice.
+    :param rois: (N, 4) array of [x1, y1, x2, y2] boxes
+    :param width: Image width in pixels
+    :param height: Image height in pixels
+    :return: (M, 4) integer array of non-overlapping crops
+    """
+    rois = np.clip(rois, 0, [width, height, width, height])
+    rois = rois[(rois[:, 2] - rois[:, 0] >= 1) & (rois[:, 3] - rois[:, 1] >= 1)]
+    merged = True
+    while merged and len(rois) > 1:
+        merged = False
+        overlap = ((rois[:, None, 0] < rois[None, :, 2]) & (rois[None, :, 0] < rois[:, None, 2])
+                   & (rois[:, None, 1] < rois[None, :, 3]) & (rois[None, :, 1] < rois[:, None, 3]))
+        np.fill_diagonal(overlap, False)
+        if overlap.any():
+            i, j = np.argwhere(overlap)[0]
+            union = np.concatenate([np.minimum(rois[i, :2], rois[j, :2]), np.maximum(rois[i, 2:], rois[j, 2:])])
+            rois = np.vstack([np.delete(rois, [i, j], axis=0), union])
+            merged = True
+    return np.round(rois).astype(int)
+
+class RadarROIDetector:
+    """
+    Runs the detector on radar-cued crops, with a periodic full-frame pass.
+    """
+
+    def __init__(self, model, focal_length, radar_offset, full_frame_interval=FULL_FRAME_INTERVAL, conf=0.5, roi_imgsz=ROI_IMGSZ):
+        """
+        :param model: YOLO model
+        :param focal_length: Camera focal length in pixels
+        :param radar_offset: (3,) position of the radar relative to the camera in meters
+        :param full_frame_interval: Run a full-frame pass every this many frames
+        :param conf: Detection confidence threshold
+        :param roi_imgsz: Detector input size for crops
+        """
+        self.model = model
+        self.focal_length = focal_length
+        self.radar_offset = np.asarray(radar_offset, dtype=np.float64)
+        self.full_frame_interval = full_frame_interval
+        self.conf = conf
+        self.roi_imgsz = roi_imgsz
+        self.frame_count = 0
+        self.stats = {mode: {"frames": 0, "time": 0.0, "pixels": 0} for mode in ("full", "roi", "skipped")}
+        self.total_pixels = 0
+
+    def detect(self, frame, clusters):
+        """
+        Detect objects in a frame, using the radar clusters to decide where to look.
+        :param frame: BGR image
+        :param clusters: CLUSTER_DTYPE array of the radar sweep closest to the frame
+        :return: Tuple of ((N, 6) array of [x1, y1, x2, y2, conf, cls] in frame coordinates, mode)
+        """
+        height, width = frame.shape[:2]
+        self.total_pixels += width * height
+        full_frame = self.frame_count % self.full_frame_interval == 0
+        self.frame_count += 1
+        started = time.perf_counter()
+
+        if full_frame:
+            mode = "full"
+            detections = self.model.predict(frame, conf=self.conf)[0].boxes.data.cpu().numpy()
+            pixels = width * height
+        else:
+            rois = clip_and_merge(project_clusters(clusters, self.focal_length, width, height, self.radar_offset), width, height)
+            if len(rois) == 0:
+                mode, detections, pixels = "skipped", np.zeros((0, 6)), 0
+            else:
+                mode = "roi"
+                crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rois]
+                results = self.model.predict(crops, conf=self.conf, imgsz=self.roi_imgsz)
+                # Shift crop-local boxes back into frame coordinates
+                detections = [result.boxes.data.cpu().numpy() + np.array([x1, y1, x1, y1, 0, 0])
+                              for result, (x1, y1, _, _) in zip(results, rois)]
+                detections = np.concatenate(detections) if detections else np.zeros((0, 6))
+                pixels = int(((rois[:, 2] - rois[:, 0]) * (rois[:, 3] - rois[:, 1])).sum())
+
+        stats = self.stats[mode]
+        stats["frames"] += 1
+        stats["time"] += time.perf_counter() - started
+        stats["pixels"] += pixels
+        return detections, mode
+
+    def summary(self):
+        """
+        Format per-mode inference cost.
+        :return: One-line report
+        """
+        parts = []
+        for mode, stats in self.stats.items():
+            mean = stats["time"] / stats["frames"] if stats["frames"] else 0.0
+            parts.append(f"{mode}={stats['frames']} ({mean * 1000:.1f}ms)")
+        processed = sum(stats["pixels"] for stats in self.stats.values())
+        share = processed / self.total_pixels if self.total_pixels else 0.0
+        return f"Radar ROI detector: {' '.join(parts)} pixels_processed={share:.0%}"
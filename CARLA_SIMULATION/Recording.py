@@ -0,0 +1,329 @@
+'''
+Note: This script records front camera frames, radar sweeps, ego state and actor snapshots into a chunked, indexed recording,
+and replays it through the same mailbox and radar buffer the live sensors feed.
+
+Layout of a recording directory:
+    meta.json         image size, chunk size and format version
+    index.bin         one TICK_DTYPE row per recorded tick (ego state plus where its payloads live)
+    data_00000.bin    chunks of raw payloads: BGR frame, RADAR_DTYPE sweep and ACTOR_DTYPE snapshot of each tick
+Replay memory-maps the index and the chunks, so a tick is read by position or frame id in O(1) and nothing is decoded up front.
+'''
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from RadarBuffer import RADAR_DTYPE
+
+# Constants
+FORMAT_VERSION = 1
+CHUNK_BYTES = 256 * 1024 * 1024  # A new data chunk is started once the current one reaches this size
+PAYLOAD_ALIGNMENT = 64  # Payload offsets are aligned so the memory-mapped views are aligned too
+
+# One row per tick; ego pose in world coordinates (m, degrees) and ego velocity (m/s)
+TICK_DTYPE = np.dtype([
+    ("frame_id", np.int64), ("timestamp", np.float64),
+    ("x", np.float64), ("y", np.float64), ("z", np.float64),
+    ("pitch", np.float64), ("yaw", np.float64), ("roll", np.float64),
+    ("vx", np.float64), ("vy", np.float64), ("vz", np.float64),
+    ("chunk", np.int32), ("camera_offset", np.int64),
+    ("radar_offset", np.int64), ("radar_count", np.int32),
+    ("actors_offset", np.int64), ("actors_count", np.int32),
+])
+
+# Other vehicles at the tick, in world coordinates
+ACTOR_DTYPE = np.dtype([
+    ("id", np.int32),
+    ("x", np.float32), ("y", np.float32), ("z", np.float32), ("yaw", np.float32),
+    ("vx", np.float32), ("vy", np.float32), ("vz", np.float32),
+])
+
+# A replayed tick; image, radar and actors are read-only views into the recording
+Tick = namedtuple("Tick", ["frame_id", "timestamp", "image", "radar", "ego", "actors"])
+
+# Stand-in for carla.Vector3D where replayed code reads .x/.y/.z
+Vector = namedtuple("Vector", ["x", "y", "z"])
+
+def ego_state(vehicle):
+    """
+    Read the pose and velocity of a vehicle from the client-side state (no server round trip).
+    :param vehicle: carla.Vehicle
+    :return: Tuple of ((x, y, z, pitch, yaw, roll), (vx, vy, vz))
+    """
+    transform = vehicle.get_transform()
+    velocity = vehicle.get_velocity()
+    location, rotation = transform.location, transform.rotation
+    return ((location.x, location.y, location.z, rotation.pitch, rotation.yaw, rotation.roll),
+            (velocity.x, velocity.y, velocity.z))
+
+def actor_snapshot(world, actor_ids):
+    """
+    Capture the state of the given actors from a single world snapshot.
+    :param world: carla.World
+    :param actor_ids: Ids of the actors to capture (e.g. every vehicle except the ego)
+    :return: ACTOR_DTYPE array (actors missing from the snapshot are skipped)
+    """
+    snapshot = world.get_snapshot()
+    actors = np.zeros(len(actor_ids), dtype=ACTOR_DTYPE)
+    count = 0
+    for actor_id in actor_ids:
+        state = snapshot.find(actor_id)
+        if state is None:
+            continue
+        transform, velocity = state.get_transform(), state.get_velocity()
+        actors[count] = (actor_id, transform.location.x, transform.location.y, transform.location.z,
+                         transform.rotation.yaw, velocity.x, velocity.y, velocity.z)
+        count += 1
+    return actors[:count]
+
+def actors_ahead(tick, radius):
+    """
+    Find the recorded actors within a radius in front of the ego vehicle.
+    :param tick: Replayed Tick
+    :param radius: Detection radius in meters
+    :return: Tuple of (ids, distances) arrays
+    """
+    pitch, yaw = np.radians(tick.ego["pitch"]), np.radians(tick.ego["yaw"])
+    forward = np.array([np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)])
+    offsets = np.stack([tick.actors["x"] - tick.ego["x"], tick.actors["y"] - tick.ego["y"], tick.actors["z"] - tick.ego["z"]], axis=1)
+    distances = np.linalg.norm(offsets, axis=1)
+    ahead = (distances < radius) & (offsets @ forward > 0)
+    return tick.actors["id"][ahead], distances[ahead]
+
+class SensorRecorder:
+    """
+    Appends ticks to a recording directory. Payloads go to the current data chunk, then the index row is appended,
+    so the index only ever points at complete payloads.
+    """
+
+    def __init__(self, path, width, height, chunk_bytes=CHUNK_BYTES):
+        """
+        :param path: Recording directory (created if missing)
+        :param width: Camera image width in pixels
+        :param height: Camera image height in pixels
+        :param chunk_bytes: Size at which a new data chunk is started
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.frame_shape = (height, width, 3)
+        self.chunk_bytes = chunk_bytes
+        self.lock = threading.Lock()
+        with open(os.path.join(path, "meta.json"), "w") as meta:
+            json.dump({"version": FORMAT_VERSION, "width": width, "height": height, "chunk_bytes": chunk_bytes}, meta)
+        self.index = open(os.path.join(path, "index.bin"), "wb")
+        self.chunk = -1
+        self.data = None
+        self.ticks = 0
+        self.bytes_written = 0
+
+    def _write(self, payload):
+        """
+        Write an array's bytes at the next aligned offset of the current chunk.
+        :return: Offset of the payload
+        """
+        padding = -self.data.tell() % PAYLOAD_ALIGNMENT
+        self.data.write(b"\0" * padding)
+        offset = self.data.tell()
+        self.data.write(np.ascontiguousarray(payload).reshape(-1).view(np.uint8))
+        return offset
+
+    def record(self, frame_id, timestamp, image, radar, ego_transform, ego_velocity, actors):
+        """
+        Append one tick.
+        :param frame_id: Simulator frame id
+        :param timestamp: Simulation time in seconds
+        :param image: BGR camera frame of the recording's size
+        :param radar: RADAR_DTYPE sweep (may be empty)
+        :param ego_transform: (x, y, z, pitch, yaw, roll) of the ego vehicle
+        :param ego_velocity: (vx, vy, vz) of the ego vehicle
+        :param actors: ACTOR_DTYPE snapshot of the other vehicles
+        """
+        if image.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {image.shape} does not match the recording ({self.frame_shape})")
+        with self.lock:
+            if self.data is None or self.data.tell() >= self.chunk_bytes:
+                if self.data is not None:
+                    self.data.close()
+                self.chunk += 1
+                self.data = open(os.path.join(self.path, f"data_{self.chunk:05d}.bin"), "wb")
+            start = self.data.tell()
+            camera_offset = self._write(image)
+            radar_offset = self._write(np.asarray(radar, dtype=RADAR_DTYPE))
+            actors_offset = self._write(np.asarray(actors, dtype=ACTOR_DTYPE))
+            self.bytes_written += self.data.tell() - start
+            self.data.flush()
+            row = np.array([(frame_id, timestamp, *ego_transform, *ego_velocity, self.chunk, camera_offset,
+                             radar_offset, len(radar), actors_offset, len(actors))], dtype=TICK_DTYPE)
+            self.index.write(row.tobytes())
+            self.ticks += 1
+
+    def close(self):
+        with self.lock:
+            if self.data is not None:
+                self.data.close()
+            self.index.close()
+
+    def summary(self):
+        """
+        Format recording statistics.
+        :return: One-line report
+        """
+        per_tick = self.bytes_written / self.ticks if self.ticks else 0
+        return (f"Recorder: {self.ticks} ticks to {self.path} in {self.chunk + 1} chunks "
+                f"({self.bytes_written / (1024 * 1024):.0f}MB, {per_tick / 1024:.0f}KB/tick)")
+
+class Recording:
+    """
+    Read-only, memory-mapped view of a recording directory.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Recording directory written by SensorRecorder
+        """
+        with open(os.path.join(path, "meta.json")) as meta:
+            self.meta = json.load(meta)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {self.meta['version']}")
+        self.path = path
+        self.frame_shape = (self.meta["height"], self.meta["width"], 3)
+        index_path = os.path.join(path, "index.bin")
+        # A crash can leave a partial row at the end of the index; only whole rows are mapped
+        rows = os.path.getsize(index_path) // TICK_DTYPE.itemsize
+        self.index = np.memmap(index_path, dtype=TICK_DTYPE, mode="r", shape=(rows,)) if rows else np.zeros(0, dtype=TICK_DTYPE)
+        self.chunks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk(self, chunk):
+        if chunk not in self.chunks:
+            chunk_path = os.path.join(self.path, f"data_{chunk:05d}.bin")
+            # The recorder can stop right after starting a new chunk; an empty file cannot be mapped
+            if not os.path.getsize(chunk_path):
+                return np.zeros(0, dtype=np.uint8)
+            self.chunks[chunk] = np.memmap(chunk_path, dtype=np.uint8, mode="r")
+        return self.chunks[chunk]
+
+    def __getitem__(self, position):
+        """
+        Read a tick by position without touching any other tick.
+        :param position: Tick position (negative counts from the end)
+        :return: Tick
+        """
+        row = self.index[position]
+        data = self._chunk(int(row["chunk"]))
+        camera_offset = int(row["camera_offset"])
+        image = data[camera_offset:camera_offset + int(np.prod(self.frame_shape))].reshape(self.frame_shape)
+        radar_offset = int(row["radar_offset"])
+        radar = data[radar_offset:radar_offset + int(row["radar_count"]) * RADAR_DTYPE.itemsize].view(RADAR_DTYPE)
+        actors_offset = int(row["actors_offset"])
+        actors = data[actors_offset:actors_offset + int(row["actors_count"]) * ACTOR_DTYPE.itemsize].view(ACTOR_DTYPE)
+        return Tick(int(row["frame_id"]), float(row["timestamp"]), image, radar, row, actors)
+
+    def find(self, frame_id):
+        """
+        Locate the tick of a simulator frame id (ids are recorded in increasing order).
+        :param frame_id: Simulator frame id
+        :return: Tick position, or None if the frame was not recorded
+        """
+        frame_ids = self.index["frame_id"]
+        if len(frame_ids) == 0:
+            return None
+        # Synchronous recordings have one tick per frame id: the position follows from the first id in O(1)
+        position = int(frame_id) - int(frame_ids[0])
+        if 0 <= position < len(frame_ids) and frame_ids[position] == frame_id:
+            return position
+        # Gaps in the ids (asynchronous recording or skipped ticks): binary search
+        position = int(np.searchsorted(frame_ids, frame_id))
+        return position if position < len(frame_ids) and frame_ids[position] == frame_id else None
+
+    @property
+    def duration(self):
+        return float(self.index["timestamp"][-1] - self.index["timestamp"][0]) if len(self.index) else 0.0
+
+class ReplayVehicle:
+    """
+    Stands in for the ego carla.Vehicle during replay, answering from the tick being replayed.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.id = -1
+
+    def get_velocity(self):
+        tick = self.source.current
+        return Vector(0.0, 0.0, 0.0) if tick is None else Vector(float(tick.ego["vx"]), float(tick.ego["vy"]), float(tick.ego["vz"]))
+
+class ReplaySource:
+    """
+    Feeds a recording into a FrameMailbox (as the "front" camera) and a RadarRingBuffer from a background thread.
+    """
+
+    def __init__(self, recording, mailbox, radar_buffer=None, frame_pool=None, realtime=False, lockstep=True, start=0, stop=None):
+        """
+        :param recording: Recording to replay
+        :param mailbox: FrameMailbox the front camera frames are published to
+        :param radar_buffer: RadarRingBuffer the sweeps are published to (None skips radar)
+        :param frame_pool: FramePool supplying writable frame buffers (None allocates copies)
+        :param realtime: Pace ticks by their recorded simulation time instead of replaying at full speed
+        :param lockstep: Wait for the consumer to take each frame, so no frame is dropped
+        :param start: First tick position
+        :param stop: Tick position to stop before (defaults to the end)
+        """
+        self.recording = recording
+        self.mailbox = mailbox
+        self.radar_buffer = radar_buffer
+        self.frame_pool = frame_pool
+        self.realtime = realtime
+        self.lockstep = lockstep
+        self.start_position = start
+        self.stop_position = len(recording) if stop is None else stop
+        self.current = None
+        self.vehicle = ReplayVehicle(self)
+        self.finished = threading.Event()
+        self.ticks = 0
+        self.elapsed = 0.0
+        self.simulated = 0.0
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        started = time.perf_counter()
+        first_timestamp = None
+        for position in range(self.start_position, self.stop_position):
+            tick = self.recording[position]
+            if first_timestamp is None:
+                first_timestamp = tick.timestamp
+            if self.realtime:
+                delay = (tick.timestamp - first_timestamp) - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self.current = tick
+            if self.radar_buffer is not None:
+                self.radar_buffer.publish(tick.radar, tick.frame_id, tick.timestamp)
+            # Recorded frames are read-only views; the consumers draw on theirs
+            frame = self.frame_pool.acquire(tick.image.shape) if self.frame_pool else np.empty_like(tick.image)
+            np.copyto(frame, tick.image)
+            self.mailbox.put("front", frame, tick.frame_id)
+            self.ticks += 1
+            self.simulated = tick.timestamp - first_timestamp
+            if self.lockstep:
+                self.mailbox.wait_taken("front")
+        self.elapsed = time.perf_counter() - started
+        self.finished.set()
+
+    def summary(self):
+        """
+        Format replay statistics.
+        :return: One-line report
+        """
+        rate = self.ticks / self.elapsed if self.elapsed else 0.0
+        factor = self.simulated / self.elapsed if self.elapsed else 0.0
+        mode = "real-time" if self.realtime else "full speed"
+        return f"Replay ({mode}): {self.ticks} ticks in {self.elapsed:.2f}s ({rate:.0f} ticks/s, {factor:.1f}x real time)"
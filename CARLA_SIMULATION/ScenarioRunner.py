@@ -0,0 +1,256 @@
+'''
+Note: This script runs a matrix of scenarios (weather x traffic density x seed) in parallel worker processes and tabulates the FCW metrics.
+
+Every worker binds to its own simulator port (one CARLA server per port), or to its own in-process stand-in with FCW_SIMULATOR=standin.
+FCW thresholds are applied to the TTCs each cell records, so they add rows to the table without adding simulation runs.
+
+Usage:
+    python ScenarioRunner.py --ports 2000,2002 --weather fog,rain --density 20,100 --seeds 0,1 --thresholds 2,3
+    FCW_SIMULATOR=standin python ScenarioRunner.py --workers 4 --weather fog,rain,clear_night --density 50,200
+'''
+
+import argparse
+import csv
+import multiprocessing
+import os
+import time
+import numpy as np
+from Simulator import carla
+from ModelCache import load_model
+from WorkerPool import preload
+from Traffic import TrafficSpawner
+from TickOrchestrator import FIXED_DELTA, TickOrchestrator
+from Proximity import DETECTION_RADIUS, ProximityMonitor
+from Corridor import EgoCorridor, WaypointGraph
+from Keyframes import FCW_THRESHOLD_TTC, KeyframeScheduler, focal_length_from_fov, scale_change_ttc
+from Camera import relevant_class_ids  # Shared FCW module (ModelCache puts FCW on the path)
+
+# Constants
+WIDTH, HEIGHT, FOV = 640, 480, 110  # Front camera, as in the scenario scripts
+TM_PORT_OFFSET = 6000  # Traffic manager port = simulator port + this (2000 -> 8000)
+CONFIDENCE = 0.5  # Detection confidence threshold
+TIMEOUT = 30.0  # Client timeout (seconds); loading a map takes a while
+WEATHER_PRESETS = {  # carla.WeatherParameters; fog, rain and clear_night as in the CaseScenarios scripts
+    "clear_noon": dict(cloudiness=10.0, precipitation=0.0, precipitation_deposits=0.0, sun_altitude_angle=70.0,
+                       fog_density=0.0, fog_distance=100.0, wetness=0.0, wind_intensity=5.0),
+    "fog": dict(cloudiness=60.0, precipitation=0.0, precipitation_deposits=0.0, sun_altitude_angle=20.0,
+                fog_density=80.0, fog_distance=10.0, wetness=0.0, wind_intensity=5.0),
+    "rain": dict(cloudiness=90.0, precipitation=80.0, precipitation_deposits=70.0, sun_altitude_angle=30.0,
+                 fog_density=10.0, fog_distance=30.0, wetness=100.0, wind_intensity=15.0),
+    "clear_night": dict(cloudiness=0.0, precipitation=0.0, precipitation_deposits=0.0, sun_altitude_angle=-20.0,
+                        fog_density=0.0, fog_distance=100.0, wetness=0.0, wind_intensity=0.0),
+}
+COLUMNS = ["weather", "density", "seed", "threshold", "vehicles", "ticks", "fps", "real_time_factor",
+           "inference_ms", "inference_p95_ms", "warnings", "warned_s", "collisions", "error"]
+
+worker_port = None  # Simulator port of this worker process
+worker_model_path = None
+
+def init_worker(ports, model_path, threads):
+    """
+    Pool initializer: claim a simulator port and limit the torch threads of this worker.
+    :param ports: multiprocessing.Queue of free ports
+    :param model_path: Model file (None uses the default)
+    :param threads: Torch threads per worker
+    """
+    global worker_port, worker_model_path
+    worker_port = ports.get()
+    worker_model_path = model_path
+    try:
+        import torch
+        torch.set_num_threads(threads)  # Keep workers from oversubscribing the host's cores
+    except ImportError:
+        pass
+
+def run_cell(cell, ticks, thresholds):
+    """
+    Run one scenario in synchronous mode and evaluate the FCW thresholds on its TTCs.
+    :param cell: Tuple of (weather preset, traffic density, seed)
+    :param ticks: Simulation ticks to run
+    :param thresholds: TTC warning thresholds (seconds)
+    :return: One result row per threshold
+    """
+    weather, density, seed = cell
+    model = load_model(worker_model_path)  # Inherited from the parent after fork
+    vehicle_class_ids = relevant_class_ids(model.names, ["car", "truck", "bus", "motorcycle"])
+    client = carla.Client("localhost", worker_port)
+    client.set_timeout(TIMEOUT)
+    world = client.load_world(client.get_world().get_map().name)  # Fresh world per cell
+    traffic_manager = client.get_trafficmanager(worker_port + TM_PORT_OFFSET)
+    traffic_manager.set_random_device_seed(seed)
+    world.set_weather(carla.WeatherParameters(**WEATHER_PRESETS[weather]))
+    orchestrator = TickOrchestrator(world, FIXED_DELTA, traffic_manager)
+    orchestrator.enter()
+
+    # Everything after enter() is undone in the finally block, so a failed spawn leaves no actors or synchronous mode behind
+    player_vehicle = traffic = camera = collision_sensor = None
+    try:
+        blueprint_library = world.get_blueprint_library()
+        player_vehicle = world.spawn_actor(blueprint_library.filter("model3")[0], world.get_map().get_spawn_points()[0])
+        player_vehicle.set_autopilot(True, traffic_manager.get_port())
+        traffic = TrafficSpawner(client, world, seed=seed, tm_port=traffic_manager.get_port())
+        spawned = len(traffic.spawn(density))
+
+        camera_bp = blueprint_library.find("sensor.camera.rgb")
+        camera_bp.set_attribute("image_size_x", f"{WIDTH}")
+        camera_bp.set_attribute("image_size_y", f"{HEIGHT}")
+        camera_bp.set_attribute("fov", f"{FOV}")
+        camera = world.spawn_actor(camera_bp, carla.Transform(carla.Location(x=2.5, z=0.7)), attach_to=player_vehicle)
+        orchestrator.add_sensor("front", camera)
+        collision_sensor = world.spawn_actor(blueprint_library.find("sensor.other.collision"), carla.Transform(), attach_to=player_vehicle)
+        collided = set()  # Every vehicle hit counts once
+        collision_sensor.listen(lambda event: collided.add(event.other_actor.id))
+
+        proximity = ProximityMonitor(world, player_vehicle, corridor=EgoCorridor(WaypointGraph.load(world.get_map())))
+        keyframes = KeyframeScheduler(fixed_interval=1)
+        focal_length = focal_length_from_fov(WIDTH, FOV)
+        ttcs, inference_times = np.full(ticks, np.inf), []
+        started = time.perf_counter()
+        for tick in range(ticks):
+            image = orchestrator.tick()["front"]
+
+            # Lane-corridor TTC from the world snapshot
+            _, _, path_ttcs = proximity.vehicles_in_path(DETECTION_RADIUS)
+            ttcs[tick] = path_ttcs.min() if len(path_ttcs) else np.inf
+
+            # Camera TTC from the growth of the detected boxes (timed in simulation seconds)
+            if image is not None:
+                frame = np.frombuffer(image.raw_data, dtype=np.uint8).reshape(image.height, image.width, 4)
+                inference_started = time.perf_counter()
+                results = model.predict(np.ascontiguousarray(frame[:, :, :3]), conf=CONFIDENCE, verbose=False)[0]
+                inference_times.append(time.perf_counter() - inference_started)
+                detections = results.boxes.data.cpu().numpy()  # x1, y1, x2, y2, conf, cls
+                keyframes.update(detections[:, :4], detections[:, 4], detections[:, 5].astype(int), image.timestamp, inference_times[-1])
+                vehicles = np.isin(keyframes.classes, vehicle_class_ids)
+                ego_speed = np.linalg.norm(proximity.player_velocity)
+                _, camera_ttcs = scale_change_ttc(keyframes.boxes[vehicles], keyframes.velocities[vehicles], ego_speed, focal_length)
+                if len(camera_ttcs):
+                    ttcs[tick] = min(ttcs[tick], camera_ttcs.min())
+            orchestrator.finish()
+        elapsed = time.perf_counter() - started
+    finally:
+        orchestrator.exit()
+        for actor in (collision_sensor, camera, player_vehicle):
+            if actor is not None:
+                actor.destroy()
+        if traffic is not None:
+            traffic.destroy()
+
+    wall = orchestrator.wall_time()
+    inference_times = np.array(inference_times) if inference_times else np.zeros(1)
+    rows = []
+    for threshold in thresholds:
+        warned = ttcs < threshold
+        rows.append({"weather": weather, "density": density, "seed": seed, "threshold": threshold,
+                     "vehicles": spawned, "ticks": ticks,
+                     "fps": ticks / elapsed, "real_time_factor": FIXED_DELTA * ticks / wall,
+                     "inference_ms": inference_times.mean() * 1000, "inference_p95_ms": np.percentile(inference_times, 95) * 1000,
+                     "warnings": int(np.count_nonzero(warned[1:] & ~warned[:-1]) + warned[0]),  # Warning onsets
+                     "warned_s": np.count_nonzero(warned) * FIXED_DELTA, "collisions": len(collided), "error": ""})
+    return rows
+
+def run_cell_safely(arguments):
+    """
+    Pool task: run a cell, turning a failure (a server down, a map that does not load) into an error row.
+    :param arguments: Tuple of (cell, ticks, thresholds)
+    :return: List of result rows
+    """
+    cell, ticks, thresholds = arguments
+    try:
+        return run_cell(cell, ticks, thresholds)
+    except Exception as error:
+        weather, density, seed = cell
+        return [{"weather": weather, "density": density, "seed": seed, "threshold": threshold, "error": f"port {worker_port}: {error}"}
+                for threshold in thresholds]
+
+def aggregate(rows):
+    """
+    Combine the seeds of every (weather, density, threshold) group: rates are averaged, counts summed.
+    :param rows: Result rows of the successful cells
+    :return: List of aggregated rows
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["weather"], row["density"], row["threshold"]), []).append(row)
+    table = []
+    for (weather, density, threshold), group in groups.items():
+        table.append({"weather": weather, "density": density, "seed": f"x{len(group)}", "threshold": threshold,
+                      "vehicles": np.mean([row["vehicles"] for row in group]), "ticks": sum(row["ticks"] for row in group),
+                      **{key: np.mean([row[key] for row in group]) for key in ("fps", "real_time_factor", "inference_ms", "inference_p95_ms")},
+                      **{key: sum(row[key] for row in group) for key in ("warnings", "warned_s", "collisions")}, "error": ""})
+    return table
+
+def format_table(rows):
+    """
+    Format result rows as an aligned text table.
+    :param rows: Result rows
+    :return: Table text
+    """
+    def cell(value):
+        return f"{value:.1f}" if isinstance(value, (float, np.floating)) else str(value)
+
+    columns = COLUMNS[:-1]
+    widths = [max([len(column)] + [len(cell(row.get(column, ""))) for row in rows]) for column in columns]
+    lines = [" ".join(column.rjust(width) for column, width in zip(columns, widths))]
+    for row in rows:
+        lines.append(" ".join(cell(row.get(column, "")).rjust(width) for column, width in zip(columns, widths)))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a weather x density x seed scenario matrix in parallel.")
+    parser.add_argument("--weather", default="fog,rain,clear_night", help=f"Weather presets ({', '.join(WEATHER_PRESETS)})")
+    parser.add_argument("--density", default="20", help="Background vehicle counts")
+    parser.add_argument("--seeds", default="0", help="Seeds for spawn points, blueprints and the traffic manager")
+    parser.add_argument("--thresholds", default=f"{FCW_THRESHOLD_TTC:g}", help="FCW TTC thresholds (seconds)")
+    parser.add_argument("--ticks", type=int, default=400, help="Simulation ticks per cell")
+    parser.add_argument("--ports", default="2000", help="Simulator ports, one CARLA server and worker per port")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (stand-in only; defaults to the CPU count)")
+    parser.add_argument("--model", default=None, help="Model file (defaults to FCW_MODEL_PATH or ./yolov8n.pt)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads per worker")
+    parser.add_argument("--output", default="scenario_results.csv", help="CSV file for the per-cell rows")
+    args = parser.parse_args()
+
+    weathers = args.weather.split(",")
+    unknown = set(weathers) - set(WEATHER_PRESETS)
+    if unknown:
+        parser.error(f"unknown weather presets: {', '.join(sorted(unknown))}")
+    cells = [(weather, int(density), int(seed)) for weather in weathers
+             for density in args.density.split(",") for seed in args.seeds.split(",")]
+    thresholds = [float(threshold) for threshold in args.thresholds.split(",")]
+    if os.environ.get("FCW_SIMULATOR") == "standin":
+        workers = min(args.workers or os.cpu_count(), len(cells))
+        ports = [2000 + 2 * index for index in range(workers)]  # Separate stand-in worlds, as with separate servers
+    else:
+        ports = [int(port) for port in args.ports.split(",")]
+
+    # Fork shares the parent's loaded model copy-on-write; without fork every worker loads its own
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    if fork:
+        preload(args.model)
+    free_ports = context.Queue()
+    for port in ports:
+        free_ports.put(port)
+
+    print(f"Running {len(cells)} cells x {len(thresholds)} thresholds on {len(ports)} workers")
+    started = time.perf_counter()
+    rows = []
+    with context.Pool(len(ports), initializer=init_worker, initargs=(free_ports, args.model, args.threads)) as pool:
+        for cell_rows in pool.imap_unordered(run_cell_safely, [(cell, args.ticks, thresholds) for cell in cells]):
+            rows += cell_rows
+            first = cell_rows[0]
+            status = first["error"] or f"{first['fps']:.1f} fps"
+            print(f"  {first['weather']} density={first['density']} seed={first['seed']}: {status}")
+    elapsed = time.perf_counter() - started
+
+    rows.sort(key=lambda row: (row["weather"], row["density"], row["seed"], row["threshold"]))
+    with open(args.output, "w", newline="") as file:
+        writer = csv.DictWriter(file, COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    succeeded = [row for row in rows if not row["error"]]
+    print(format_table(aggregate(succeeded)))
+    print(f"{len(cells)} cells in {elapsed:.1f}s ({len(rows) - len(succeeded)} failed rows); per-cell rows in {args.output}")
+
+if __name__ == "__main__":
+    main()
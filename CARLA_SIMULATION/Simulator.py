@@ -0,0 +1,10 @@
+'''
+Note: This script picks the simulator the CARLA scripts talk to: the carla package, or the in-process stand-in with FCW_SIMULATOR=standin.
+'''
+
+import os
+
+if os.environ.get("FCW_SIMULATOR", "carla") == "standin":
+    import CarlaStandIn as carla  # Headless benchmarking and testing without a CARLA server
+else:
+    import carla
@@ -0,0 +1,164 @@
+'''
+Note: This script drives the simulator in synchronous mode: one world.tick() per step, every sensor output of that frame gathered before perception runs.
+'''
+
+import queue
+import time
+import numpy as np
+
+# Constants
+FIXED_DELTA = 0.05  # Simulated seconds per tick (20 Hz)
+SENSOR_TIMEOUT = 2.0  # Max wall time (seconds) to wait for a sensor's output of the current frame
+DENSITY_INTERVAL = 1.0  # Wall seconds between recounts of the vehicles in the world
+
+class TickOrchestrator:
+    """
+    Owns the world clock. Sensors deliver into per-sensor queues, tick() advances the world by a fixed delta
+    and returns the outputs stamped with the new frame id; finish() closes the step and records its wall time.
+    """
+
+    def __init__(self, world, fixed_delta=FIXED_DELTA, traffic_manager=None, sensor_timeout=SENSOR_TIMEOUT):
+        """
+        :param world: carla.World
+        :param fixed_delta: Simulated seconds per tick
+        :param traffic_manager: Optional carla.TrafficManager, switched to synchronous mode with the world
+        :param sensor_timeout: Max wall time in seconds to wait for each sensor per tick
+        """
+        self.world = world
+        self.fixed_delta = fixed_delta
+        self.traffic_manager = traffic_manager
+        self.sensor_timeout = sensor_timeout
+        self.queues = {}
+        self.original_settings = None
+        self.frame = None
+        self.sim_time = 0.0
+        self.vehicles = 0
+        self.last_count = -np.inf
+        self.records = []  # frame, sim_time, vehicles, tick, gather, process (wall seconds)
+        self.missed = 0
+        self.step_started = None
+        self.step_times = None
+
+    def enter(self):
+        """
+        Switch the world (and traffic manager) to synchronous mode with the fixed delta.
+        """
+        self.original_settings = self.world.get_settings()
+        settings = self.world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = self.fixed_delta
+        self.world.apply_settings(settings)
+        if self.traffic_manager is not None:
+            self.traffic_manager.set_synchronous_mode(True)
+
+    def exit(self):
+        """
+        Stop the sensors and restore the settings the world had before enter().
+        """
+        for sensor, _ in self.queues.values():
+            sensor.stop()
+        if self.traffic_manager is not None:
+            self.traffic_manager.set_synchronous_mode(False)
+        if self.original_settings is not None:
+            self.world.apply_settings(self.original_settings)
+
+    def add_sensor(self, name, sensor):
+        """
+        Start listening to a sensor; its outputs are gathered by tick().
+        :param name: Sensor name used in the tick outputs
+        :param sensor: carla.Sensor
+        """
+        outputs = queue.Queue()
+        sensor.listen(outputs.put)
+        self.queues[name] = (sensor, outputs)
+
+    def tick(self):
+        """
+        Advance the world by one fixed delta and gather every sensor's output of the new frame.
+        Outputs of earlier frames still queued are discarded.
+        :return: Dict of sensor name -> data of this frame (None if the sensor timed out)
+        """
+        self.step_started = time.perf_counter()
+        self.frame = self.world.tick()
+        ticked = time.perf_counter()
+        self.sim_time += self.fixed_delta
+        if ticked - self.last_count >= DENSITY_INTERVAL:
+            self.vehicles = len(self.world.get_actors().filter("vehicle.*"))
+            self.last_count = ticked
+
+        outputs = {}
+        for name, (_, sensor_queue) in self.queues.items():
+            deadline = ticked + self.sensor_timeout
+            outputs[name] = None
+            while True:
+                try:
+                    data = sensor_queue.get(timeout=max(deadline - time.perf_counter(), 0.0))
+                except queue.Empty:
+                    self.missed += 1
+                    break
+                if data.frame >= self.frame:
+                    outputs[name] = data
+                    break
+        self.step_times = (ticked - self.step_started, time.perf_counter() - ticked)
+        return outputs
+
+    def finish(self):
+        """
+        Close the current step once perception and warning have run, recording its wall times.
+        """
+        if self.step_started is None:
+            return
+        tick_time, gather_time = self.step_times
+        process_time = time.perf_counter() - self.step_started - tick_time - gather_time
+        self.records.append((self.frame, self.sim_time, self.vehicles, tick_time, gather_time, process_time))
+        self.step_started = None
+
+    def wall_time(self):
+        """
+        Total wall time of the recorded steps: ticking, gathering the sensors and processing.
+        :return: Seconds
+        """
+        return sum(tick_time + gather_time + process_time for _, _, _, tick_time, gather_time, process_time in self.records)
+
+    def real_time_factors(self):
+        """
+        Real-time factor per traffic density: simulated time over the wall time it took to simulate and process it.
+        :return: Dict of vehicle count -> (ticks, mean real-time factor, 5th percentile real-time factor)
+        """
+        if not self.records:
+            return {}
+        records = np.array(self.records)
+        factors = {}
+        for vehicles in np.unique(records[:, 2]).astype(int):
+            rows = records[records[:, 2] == vehicles]
+            wall = rows[:, 3:].sum(axis=1)
+            per_tick = self.fixed_delta / np.maximum(wall, 1e-9)
+            factors[vehicles] = (len(rows), self.fixed_delta * len(rows) / wall.sum(), np.percentile(per_tick, 5))
+        return factors
+
+    def save(self, path):
+        """
+        Write the per-tick records as CSV.
+        :param path: Output file
+        """
+        with open(path, "w") as file:
+            file.write("frame,sim_time,vehicles,tick_ms,gather_ms,process_ms,wall_ms,real_time_factor\n")
+            for frame, sim_time, vehicles, tick_time, gather_time, process_time in self.records:
+                wall = tick_time + gather_time + process_time
+                file.write(f"{frame},{sim_time:.3f},{vehicles},{tick_time * 1000:.3f},{gather_time * 1000:.3f},"
+                           f"{process_time * 1000:.3f},{wall * 1000:.3f},{self.fixed_delta / max(wall, 1e-9):.3f}\n")
+
+    def summary(self):
+        """
+        Format the step timings and real-time factors.
+        :return: One line, plus one line per traffic density
+        """
+        if not self.records:
+            return "Synchronous ticks: none"
+        records = np.array(self.records)
+        lines = [f"Synchronous ticks: ticks={len(records)} delta={self.fixed_delta * 1000:.0f}ms sim_time={self.sim_time:.1f}s "
+                 f"tick={records[:, 3].mean() * 1000:.1f}ms gather={records[:, 4].mean() * 1000:.1f}ms "
+                 f"process={records[:, 5].mean() * 1000:.1f}ms missed={self.missed}"]
+        for vehicles, (ticks, mean, low) in self.real_time_factors().items():
+            lines.append(f"  vehicles={vehicles}: ticks={ticks} real_time_factor={mean:.2f}x (p5 {low:.2f}x)")
+        return "\n".join(lines)
@@ -0,0 +1,105 @@
+'''
+Note: This script records an opt-in timeline of the perception threads (FCW_TRACE=trace.json) and saves it in
+Chrome Trace Event format, which Perfetto (ui.perfetto.dev) and chrome://tracing open directly.
+'''
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Constants
+TRACE = os.environ.get("FCW_TRACE")  # Output file; tracing is off when unset
+TRACE_CAPACITY = 200000  # Events kept in memory (the oldest are dropped first)
+
+class Tracer:
+    """
+    Bounded in-memory buffer of timed events, one track per thread, tagged with the simulator frame id.
+    Every event is a complete ("X") event: its begin time and duration, so dropping old events never leaves an unmatched end.
+    """
+
+    def __init__(self, path=TRACE, capacity=TRACE_CAPACITY):
+        """
+        :param path: Output file for save() (None disables tracing)
+        :param capacity: Max events kept in memory
+        """
+        self.path = path
+        self.enabled = path is not None
+        self.events = deque(maxlen=capacity)
+        self.threads = {}  # Thread ident -> thread name
+        self.recorded = 0
+        self.origin = time.perf_counter()
+
+    def complete(self, name, started, ended=None, frame_id=None):
+        """
+        Record an event on the calling thread's track.
+        :param name: Event name
+        :param started: Begin time from time.perf_counter()
+        :param ended: End time from time.perf_counter() (defaults to now)
+        :param frame_id: Optional simulator frame id shown in the event's arguments
+        """
+        if not self.enabled:
+            return
+        ended = time.perf_counter() if ended is None else ended
+        thread = threading.get_ident()
+        if thread not in self.threads:
+            self.threads[thread] = threading.current_thread().name
+        self.events.append((name, started, ended, thread, frame_id))  # deque.append is thread-safe
+        self.recorded += 1
+
+    def span(self, name, frame_id=None):
+        """
+        Time a with-block as one event.
+        :param name: Event name
+        :param frame_id: Optional simulator frame id
+        :return: Context manager (a no-op when tracing is off)
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, frame_id)
+
+    @contextmanager
+    def _span(self, name, frame_id):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, started, frame_id=frame_id)
+
+    def to_chrome_trace(self):
+        """
+        Convert the buffered events to the Chrome Trace Event format.
+        :return: Dict with traceEvents (timestamps in microseconds since the tracer was created)
+        """
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+                  for thread, name in list(self.threads.items())]
+        for name, started, ended, thread, frame_id in list(self.events):
+            event = {"name": name, "ph": "X", "pid": pid, "tid": thread,
+                     "ts": (started - self.origin) * 1e6, "dur": (ended - started) * 1e6}
+            if frame_id is not None:
+                event["args"] = {"frame": frame_id}
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path=None):
+        """
+        Write the trace file.
+        :param path: Output file (defaults to the path given at construction)
+        """
+        path = path or self.path
+        if self.enabled and path:
+            with open(path, "w") as file:
+                json.dump(self.to_chrome_trace(), file)
+
+    def summary(self):
+        """
+        Format how many events were recorded and kept.
+        :return: One-line report
+        """
+        if not self.enabled:
+            return "Trace: off"
+        return (f"Trace: events={self.recorded} kept={len(self.events)} dropped={self.recorded - len(self.events)} "
+                f"threads={len(self.threads)} file={self.path}")
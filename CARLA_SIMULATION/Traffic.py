@@ -0,0 +1,127 @@
+'''
+Note: This script spawns background traffic in batches: every spawn and autopilot enable goes through one client.apply_batch_sync call.
+'''
+
+import os
+import random
+import time
+from collections import Counter
+from Simulator import carla
+
+# Constants
+TRAFFIC_COUNT = int(os.environ.get("FCW_TRAFFIC", "19"))  # Background vehicles to spawn
+TRAFFIC_MIX = os.environ.get("FCW_TRAFFIC_MIX", "vehicle.*:1")  # Blueprint patterns and weights, e.g. "vehicle.tesla.*:3,vehicle.carlamotors.*:1"
+MAX_ROUNDS = 3  # Batches sent before giving up on the spawn points that keep failing
+TM_PORT = 8000  # Traffic manager port the autopilots register with
+
+def parse_mix(text):
+    """
+    Parse a blueprint mix such as "vehicle.tesla.*:3,vehicle.carlamotors.*:1".
+    :param text: Comma-separated pattern:weight pairs (a missing weight counts as 1)
+    :return: Dict of blueprint pattern -> weight
+    """
+    mix = {}
+    for entry in filter(None, (part.strip() for part in text.split(","))):
+        pattern, _, weight = entry.partition(":")
+        mix[pattern] = float(weight) if weight else 1.0
+    return mix
+
+class TrafficSpawner:
+    """
+    Spawns autopilot vehicles with SpawnActor(...).then(SetAutopilot(FutureActor)) batches and keeps their ids.
+    Failed commands are counted per error and their spawn points retried with fresh ones instead of aborting.
+    """
+
+    def __init__(self, client, world, blueprint_mix=None, seed=None, tm_port=TM_PORT):
+        """
+        :param client: carla.Client
+        :param world: carla.World of the client
+        :param blueprint_mix: Dict of blueprint pattern -> weight (defaults to FCW_TRAFFIC_MIX)
+        :param seed: Seed for the spawn point order and blueprint choice
+        :param tm_port: Traffic manager port
+        """
+        self.client = client
+        self.world = world
+        self.tm_port = tm_port
+        self.random = random.Random(seed)
+        library = world.get_blueprint_library()
+        self.mix = []  # (weight, blueprints) per pattern
+        for pattern, weight in (blueprint_mix or parse_mix(TRAFFIC_MIX)).items():
+            blueprints = list(library.filter(pattern))
+            if not blueprints:
+                raise ValueError(f"No blueprint matches {pattern!r}")
+            self.mix.append((weight, blueprints))
+        self.actor_ids = []
+        self.requested = 0
+        self.commands = 0
+        self.batches = 0
+        self.errors = Counter()
+        self.spawn_time = 0.0
+
+    def choose_blueprint(self):
+        """
+        Pick a pattern by weight, then a blueprint among its matches.
+        :return: carla.ActorBlueprint
+        """
+        weights = [weight for weight, _ in self.mix]
+        blueprint = self.random.choice(self.random.choices(self.mix, weights)[0][1])
+        if blueprint.has_attribute("role_name"):
+            blueprint.set_attribute("role_name", "autopilot")
+        return blueprint
+
+    def spawn(self, count=TRAFFIC_COUNT, reserved=(0,)):
+        """
+        Spawn up to count vehicles on shuffled spawn points.
+        :param count: Target number of vehicles
+        :param reserved: Spawn point indices to leave free (the player's)
+        :return: Ids of the vehicles spawned by this call
+        """
+        started = time.perf_counter()
+        spawn_points = [point for index, point in enumerate(self.world.get_map().get_spawn_points()) if index not in reserved]
+        self.random.shuffle(spawn_points)
+        if count > len(spawn_points):
+            self.errors[f"Only {len(spawn_points)} spawn points for {count} vehicles"] += 1
+        self.requested += count
+        spawned, cleanup = [], []
+        for _ in range(MAX_ROUNDS):
+            wanted = count - len(spawned)
+            if wanted <= 0 or not spawn_points:
+                break
+            batch, spawn_points = spawn_points[:wanted], spawn_points[wanted:]
+            commands = [carla.command.SpawnActor(self.choose_blueprint(), point)
+                        .then(carla.command.SetAutopilot(carla.command.FutureActor, True, self.tm_port))
+                        for point in batch]
+            for response in self.client.apply_batch_sync(commands, False):
+                if not response.error:
+                    spawned.append(response.actor_id)
+                    continue
+                self.errors[response.error] += 1
+                if response.actor_id:  # Spawned, but the autopilot could not be enabled
+                    cleanup.append(carla.command.DestroyActor(response.actor_id))
+            self.commands += len(commands)
+            self.batches += 1
+        if cleanup:
+            self.client.apply_batch_sync(cleanup, False)
+        self.actor_ids += spawned
+        self.spawn_time += time.perf_counter() - started
+        return spawned
+
+    def destroy(self):
+        """
+        Destroy every spawned vehicle in one batch.
+        """
+        if self.actor_ids:
+            self.client.apply_batch_sync([carla.command.DestroyActor(actor_id) for actor_id in self.actor_ids], False)
+        self.actor_ids = []
+
+    def summary(self):
+        """
+        Format spawn counts, throughput and failures.
+        :return: One line, plus one line per distinct error
+        """
+        rate = len(self.actor_ids) / self.spawn_time if self.spawn_time else 0.0
+        lines = [f"Traffic: spawned={len(self.actor_ids)}/{self.requested} commands={self.commands} batches={self.batches} "
+                 f"time={self.spawn_time * 1000:.0f}ms throughput={rate:.0f} vehicles/s"]
+        for error, occurrences in self.errors.most_common():
+            lines.append(f"  {occurrences}x {error}")
+        return "\n".join(lines)
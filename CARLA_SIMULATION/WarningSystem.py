@@ -1,19 +1,37 @@
-import carla
-import pygame
+from Simulator import carla
 import numpy as np
 import cv2
-from ultralytics import YOLO
+import os
 import threading
-from queue import Queue
+import time
+from FrameMailbox import FrameMailbox
+from ModelCache import load_model
+from FramePool import FramePool
+from Traffic import TRAFFIC_COUNT, TrafficSpawner
+from Proximity import DETECTION_RADIUS, ProximityMonitor
+from Corridor import EgoCorridor, WaypointGraph
+from BatchInference import BatchInference
+from TickOrchestrator import FIXED_DELTA, TickOrchestrator
+from Keyframes import KeyframeScheduler, FCW_THRESHOLD_TTC, focal_length_from_fov, scale_change_ttc
+from Camera import relevant_class_ids  # Shared FCW module (ModelCache puts FCW on the path)
+from Display import NO_RENDERING, Display, set_no_rendering_mode
+from Latency import LATENCY_PORT, LatencyRecorder
+from Trace import Tracer
 
-# Initialize pygame for speed display
-pygame.init()
+# Pygame speed display and camera windows (none with FCW_HEADLESS=1)
 WIDTH, HEIGHT = 640, 480  # Default width and height
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-clock = pygame.time.Clock()
+display = Display(WIDTH, HEIGHT)
+LATENCY_BUDGET = 0.1  # Frames older than this (seconds) are not worth running detection on
+BATCH_SIZE = 4  # Max camera frames per YOLO predict call
+BATCH_MAX_WAIT = 0.01  # Max time (seconds) to wait for the other cameras before running a batch
+CAMERA_WINDOWS = {"front": "Front Camera", "third_person": "Third-Person Camera"}  # Analysed cameras and their windows
+KEYFRAME_INTERVAL = None  # None adapts the front camera detector interval to inference latency; 1 detects every frame
+SYNCHRONOUS = os.environ.get("FCW_SYNCHRONOUS") == "1"  # Step the world with world.tick() and process every frame in lockstep
+TICK_LOG = os.environ.get("FCW_TICK_LOG")  # CSV file for the per-tick sim time vs wall time in synchronous mode
 
 # Load YOLOv8 model
-model = YOLO("./yolov8n.pt")  # Adjust path if necessary
+model = load_model()  # Set FCW_MODEL_PATH to use a different model file; reused if a WorkerPool parent loaded it
+vehicle_class_ids = relevant_class_ids(model.names, ["car", "truck", "bus", "motorcycle"])
 
 # Connect to CARLA server
 client = carla.Client("localhost", 2000)
@@ -30,41 +48,38 @@ def spawn_vehicle():
     return player_vehicle
 
 # Function to spawn other vehicles in random locations
-def spawn_other_vehicles():
-    blueprint_library = world.get_blueprint_library()
-    vehicle_bp = blueprint_library.filter("vehicle.*")[0]  # Random vehicle model
-    spawn_points = world.get_map().get_spawn_points()
-    for spawn_point in spawn_points[1:20]:  # Limit to 5 vehicles for this example
-        vehicle = world.spawn_actor(vehicle_bp, spawn_point)
-        vehicle.set_autopilot(True)  # Set autopilot for random movement
+def spawn_other_vehicles(count=TRAFFIC_COUNT):
+    traffic = TrafficSpawner(client, world)  # Blueprint mix from FCW_TRAFFIC_MIX
+    traffic.spawn(count)  # One batch of spawns with autopilot; blocked spawn points are retried elsewhere
+    print(traffic.summary())
+    return traffic
 
 # Function to check if any vehicle is within a certain distance in front of the player
-def check_proximity(player_vehicle):
-    detection_radius = 15.0  # Detection radius in meters
-    warning_message = ""
-    vehicles = world.get_actors().filter("vehicle.*")
-    player_transform = player_vehicle.get_transform()
-    player_location = player_transform.location
-    player_forward = player_transform.get_forward_vector()
-
-    for vehicle in vehicles:
-        if vehicle.id != player_vehicle.id:
-            other_location = vehicle.get_transform().location
-            distance = player_location.distance(other_location)
-            if distance < detection_radius:
-                direction = other_location - player_location
-                forward_dot = player_forward.x * direction.x + player_forward.y * direction.y + player_forward.z * direction.z
-                if forward_dot > 0:  # Check if the vehicle is in front
-                    warning_message = "WARNING: Vehicle Ahead!"
-                    break
-
-    return warning_message
+def check_proximity(proximity, detection_radius=DETECTION_RADIUS):
+    """
+    Build the proximity warning from the vehicles ahead of the player.
+    Only vehicles inside the player's lane corridor are reported when the monitor has one.
+    :param proximity: ProximityMonitor of the player vehicle
+    :param detection_radius: Detection radius in meters
+    :return: Warning message, empty if no vehicle is ahead
+    """
+    if proximity.corridor is None:
+        vehicle_ids, distances = proximity.vehicles_ahead(detection_radius)
+        if len(vehicle_ids) == 0:
+            return ""
+        return f"WARNING: Vehicle Ahead! ({len(vehicle_ids)} within {detection_radius:.0f}m, nearest {distances[0]:.1f}m)"
+    vehicle_ids, distances, ttcs = proximity.vehicles_in_path(detection_radius)
+    if len(vehicle_ids) == 0:
+        return ""
+    ttc = f", TTC {ttcs.min():.1f}s" if np.isfinite(ttcs.min()) else ""
+    return f"WARNING: Vehicle Ahead! ({len(vehicle_ids)} in path within {detection_radius:.0f}m, nearest {distances[0]:.1f}m{ttc})"
 
 # Main function
 def main():
-    global WIDTH, HEIGHT, screen  # Declare screen as global
     player_vehicle = spawn_vehicle()
-    spawn_other_vehicles()  # Spawn other vehicles
+    traffic = spawn_other_vehicles()  # Spawn other vehicles
+    corridor = EgoCorridor(WaypointGraph.load(world.get_map()))  # Lane path ahead, from the waypoint graph cached on disk
+    proximity = ProximityMonitor(world, player_vehicle, corridor=corridor)  # Vehicles around the player, from one snapshot per tick
     
     # Set up the front camera
     camera_bp = world.get_blueprint_library().find("sensor.camera.rgb")
@@ -84,98 +99,203 @@ def main():
         attach_to=player_vehicle
     )
 
-    # Queues to hold camera frames for processing
-    front_frame_queue = Queue(maxsize=10)
-    third_person_frame_queue = Queue(maxsize=10)
+    # Per-stage latency histograms from image arrival to warning (exported with FCW_LATENCY_EXPORT / FCW_LATENCY_PORT)
+    # Clocks start when the callback is entered: the time an image spends in the simulator and its client before that
+    # is not observable here (image timestamps are simulation time). end_to_end closes when the HUD showing the FCW
+    # decision of the frame has been flipped.
+    # The stages also go to the thread timeline with FCW_TRACE=trace.json (open it in Perfetto)
+    tracer = Tracer()
+    latency = LatencyRecorder(tracer=tracer)
+    if LATENCY_PORT:
+        latency.serve(int(LATENCY_PORT))
+
+    # Recycled frame buffers, one pool per camera
+    frame_pools = {"front": FramePool("front"), "third_person": FramePool("third_person")}
+
+    # Mailbox holding only the newest frame of each camera; dropped frames go back to their pool
+    frame_mailbox = FrameMailbox(latency_budget=LATENCY_BUDGET,
+                                 on_drop=lambda name, frame: frame_pools[name].release(frame.data))
 
     # Function to handle front camera images
     def front_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not front_frame_queue.full():
-            front_frame_queue.put(frame)
+        converting = latency.since("capture", capture_time, image.frame)
+        frame = frame_pools["front"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["front"].record_ingest(latency.since("convert", converting, image.frame) - capture_time)
+        frame_mailbox.put("front", frame, image.frame, capture_time)
 
     # Function to handle third-person camera images
     def third_person_camera_callback(image):
+        capture_time = time.perf_counter()
         array = np.frombuffer(image.raw_data, dtype=np.uint8)
         array = np.reshape(array, (image.height, image.width, 4))
-        frame = cv2.cvtColor(array[:, :, :3], cv2.COLOR_BGRA2BGR)
-        if not third_person_frame_queue.full():
-            third_person_frame_queue.put(frame)
+        converting = latency.since("capture", capture_time, image.frame)
+        frame = frame_pools["third_person"].acquire((image.height, image.width, 3))
+        cv2.cvtColor(array, cv2.COLOR_BGRA2BGR, dst=frame)  # Convert straight into the pooled buffer
+        frame_pools["third_person"].record_ingest(latency.since("convert", converting, image.frame) - capture_time)
+        frame_mailbox.put("third_person", frame, image.frame, capture_time)
 
-    # Function to process frames for front and third-person views
-    def process_frames():
-        while True:
-            # Process front camera
-            if not front_frame_queue.empty():
-                front_frame = front_frame_queue.get()
+    # Batched detection over the newest frame of every camera
+    detector = BatchInference(model, frame_mailbox, CAMERA_WINDOWS, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT,
+                              conf=0.5, on_drop=lambda name, frame: frame_pools[name].release(frame.data), latency=latency)
+
+    # Front camera detections run on keyframes only; boxes are propagated in between
+    keyframes = KeyframeScheduler(fixed_interval=KEYFRAME_INTERVAL)
+    front_focal_length = focal_length_from_fov(WIDTH, 110)
+    fcw_state = {"ttc": float("inf"), "frame_id": None, "captured": None}  # Latest FCW decision, shared with the Pygame loop
 
-                # Object detection using YOLO
-                results = model.predict(front_frame, conf=0.5)
-                detected_objects = results[0].boxes
+    def select_for_detection(name, frame):
+        return name != "front" or keyframes.is_keyframe(frame.timestamp, frame.frame_id)
 
-                # Draw bounding boxes on the front camera frame
-                for obj in detected_objects:
-                    x1, y1, x2, y2 = map(int, obj.xyxy[0])
-                    label = obj.cls
-                    confidence = obj.conf[0]
-                    cv2.rectangle(front_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(front_frame, f"{label} {confidence:.2f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+    # Function to run FCW on a batch of frames and display them
+    def process_batch(batch):
+        for name, (frame, results) in batch.items():
+            camera_frame = frame.data
+            started = time.perf_counter()
+            if results is not None:
+                detections = results.boxes.data.cpu().numpy()  # x1, y1, x2, y2, conf, cls
+                boxes, confidences, classes = detections[:, :4], detections[:, 4], detections[:, 5].astype(int)
+            elif name != "front":
+                boxes, confidences, classes = np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)  # Shown without boxes
 
-                cv2.imshow("Front Camera", front_frame)
+            if name == "front":
+                if results is not None:
+                    keyframes.update(boxes, confidences, classes, frame.timestamp, detector.last_inference_time)
+                else:
+                    boxes, confidences, classes = keyframes.propagate(frame.timestamp)
+                started = latency.since("postprocess", started, frame.frame_id)
 
-            # Process third-person camera
-            if not third_person_frame_queue.empty():
-                third_person_frame = third_person_frame_queue.get()
-                cv2.imshow("Third-Person Camera", third_person_frame)
+                # Evaluate FCW on every frame, detected or propagated
+                vehicles = np.isin(classes, vehicle_class_ids)
+                velocity = player_vehicle.get_velocity()
+                ego_speed = (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5
+                _, ttcs = scale_change_ttc(boxes[vehicles], keyframes.velocities[vehicles], ego_speed, front_focal_length)
+                fcw_state.update(ttc=ttcs.min() if len(ttcs) else float("inf"), frame_id=frame.frame_id, captured=frame.timestamp)
+                keyframes.record_warning_latency(frame.timestamp)
+                started = latency.since("fusion", started, frame.frame_id)
+            else:
+                started = latency.since("postprocess", started, frame.frame_id)
 
-            cv2.waitKey(1)
+            # Draw bounding boxes on the camera frame (skipped when headless)
+            display.draw_detections(camera_frame, boxes, [model.names[label] for label in classes], confidences)
 
-    # Start the frame processing thread
-    frame_processing_thread = threading.Thread(target=process_frames, daemon=True)
-    frame_processing_thread.start()
+            display.show(CAMERA_WINDOWS[name], camera_frame)
+            latency.since("render", started, frame.frame_id)
+            frame_pools[name].release(camera_frame)
 
-    # Set camera callbacks
-    front_camera.listen(lambda image: front_camera_callback(image))
-    third_person_camera.listen(lambda image: third_person_camera_callback(image))
+        with tracer.span("cv2.waitKey"):
+            display.wait_key()
 
+    # Function to process frames for front and third-person views
+    def process_frames():
+        while True:
+            # Block until a camera delivers a new frame (the timeout keeps the OpenCV windows responsive)
+            with tracer.span("next_batch"):
+                batch = detector.next_batch(timeout=0.1, detect=select_for_detection)
+            process_batch(batch)
+
+    # Without rendering the cameras deliver nothing: only the snapshot-based proximity warning runs
+    if NO_RENDERING:
+        set_no_rendering_mode(world)
+
+    camera_callbacks = {"front": front_camera_callback, "third_person": third_person_camera_callback}
+    if SYNCHRONOUS:
+        # The main loop ticks the world and runs perception on the frames of that tick
+        orchestrator = TickOrchestrator(world, FIXED_DELTA, traffic_manager=client.get_trafficmanager())
+        orchestrator.enter()
+        if not NO_RENDERING:
+            orchestrator.add_sensor("front", front_camera)
+            orchestrator.add_sensor("third_person", third_person_camera)
+    else:
+        orchestrator = None
+
+        if not NO_RENDERING:
+            # Start the frame processing thread
+            frame_processing_thread = threading.Thread(target=process_frames, name="process_frames", daemon=True)
+            frame_processing_thread.start()
+
+            # Set camera callbacks
+            front_camera.listen(lambda image: front_camera_callback(image))
+            third_person_camera.listen(lambda image: third_person_camera_callback(image))
+
+    shown_frame_id = None  # Frame whose FCW decision the HUD last showed
     try:
         while True:
             # Handle quitting the game and resizing
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return
-                if event.type == pygame.VIDEORESIZE:
-                    WIDTH, HEIGHT = event.w, event.h
-                    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-                    
+            if not display.poll():
+                return
 
+            # Advance the world one step and run perception on every camera frame of that step
+            if orchestrator is not None:
+                with tracer.span("world.tick"):
+                    outputs = orchestrator.tick()
+                for name, image in outputs.items():
+                    if image is not None:
+                        camera_callbacks[name](image)
+                process_batch(detector.next_batch(timeout=0, detect=select_for_detection))
 
             # Display vehicle speed in Pygame
-            screen.fill((0, 0, 0))  # Clear screen
+            drawing = time.perf_counter()
+            display.clear()
             velocity = player_vehicle.get_velocity()
             speed = (3.6 * (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5)  # Convert to km/h
-            font = pygame.font.Font(None, 36)
-            speed_text = font.render(f"Speed: {speed:.2f} km/h", True, (255, 255, 255))
-            screen.blit(speed_text, (10, 10))  # Display speed on top-left of the window
+            display.text(f"Speed: {speed:.2f} km/h", (10, 10), (255, 255, 255))  # Display speed on top-left of the window
+
+            # Decide the warnings: proximity from the latest snapshot, FCW from the latest front camera frame
+            deciding = time.perf_counter()
+            fcw = dict(fcw_state)  # One consistent copy; the processing thread keeps updating fcw_state
+            warning_message = check_proximity(proximity)
+            latency.since("warning", deciding, fcw["frame_id"])
 
             # Check for proximity and display warning if necessary
-            warning_message = check_proximity(player_vehicle)
             if warning_message:
-                warning_text = font.render(warning_message, True, (255, 0, 0))
-                screen.blit(warning_text, (10, 50))  # Display warning below the speed text
+                display.text(warning_message, (10, 50), (255, 0, 0))  # Display warning below the speed text
+
+            # Display the camera-based forward collision warning
+            if fcw["ttc"] < FCW_THRESHOLD_TTC:
+                display.text(f"FCW: TTC {fcw['ttc']:.1f}s", (10, 90), (255, 128, 0))
 
-            pygame.display.flip()
-            clock.tick(144)
+            display.flip()
+            tracer.complete("hud", drawing)
+            if fcw["frame_id"] is not None and fcw["frame_id"] != shown_frame_id:
+                # First HUD showing (or clearing) the FCW warning of this frame: image arrival to warning on screen
+                latency.record("end_to_end", time.perf_counter() - fcw["captured"], frame_id=fcw["frame_id"])
+                shown_frame_id = fcw["frame_id"]
+            latency.maybe_export()
+            if orchestrator is not None:
+                orchestrator.finish()  # The simulation waits for us instead of the frame rate cap
+            with tracer.span("frame cap"):
+                display.tick(limit=orchestrator is None)
 
     finally:
-        # Clean up: destroy sensors and Pygame
+        # Clean up: leave synchronous mode, destroy sensors and close the windows
+        if orchestrator is not None:
+            orchestrator.exit()
+        if NO_RENDERING:
+            set_no_rendering_mode(world, False)
         front_camera.destroy()
         third_person_camera.destroy()
         player_vehicle.destroy()
-        pygame.quit()
-        cv2.destroyAllWindows()
+        traffic.destroy()
+        display.close()
+        latency.close()
+        tracer.save()
+        print(display.summary())
+        print(frame_mailbox.summary())
+        print(proximity.summary())
+        for pool in frame_pools.values():
+            print(pool.summary())
+        print(detector.summary())
+        print(keyframes.summary())
+        print(latency.summary())
+        print(tracer.summary())
+        if orchestrator is not None:
+            print(orchestrator.summary())
+            if TICK_LOG:
+                orchestrator.save(TICK_LOG)
 
 # Run the simulation
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+'''
+Note: This script loads the YOLO model and torch runtime once, then forks scenario workers that share the weights copy-on-write.
+
+Usage:
+    python WorkerPool.py --workers 4 --script CaseScenarios/Fog.py
+    python WorkerPool.py --workers 4   # No simulator needed: every worker runs a short inference loop
+'''
+
+import argparse
+import multiprocessing
+import os
+import queue
+import runpy
+import sys
+import threading
+import time
+import numpy as np
+import ModelCache
+from ModelCache import load_model
+
+# Constants
+WARMUP_SHAPE = (480, 640, 3)  # Frame size used to warm up the model before forking
+REPORT_INTERVAL = 10.0  # Seconds between memory reports of a running worker
+SMOKE_TEST_FRAMES = 20  # Inference calls per worker when no script is given
+
+def memory_usage_mb():
+    """
+    Split this process's resident memory into pages shared with other processes and private pages.
+    :return: Tuple of (shared_mb, private_mb), or (None, None) if it cannot be measured
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in smaps if line.endswith("kB\n")}
+        shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+        private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+        return shared / 1024, private / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_full_info()
+        return (info.rss - info.uss) / (1024 * 1024), info.uss / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None, None
+
+def format_mb(value):
+    return f"{value:.0f}MB" if value is not None else "n/a"
+
+def preload(model_path):
+    """
+    Load and warm up the model in the parent so workers inherit an initialised runtime.
+    :param model_path: Model file (None uses the default)
+    :return: Seconds spent loading and warming up
+    """
+    started = time.perf_counter()
+    model = load_model(model_path)
+    model.predict(np.zeros(WARMUP_SHAPE, dtype=np.uint8), verbose=False)
+    return time.perf_counter() - started
+
+def report(reports, index, event, started=None):
+    """
+    Send this worker's memory split (and startup time, if started is given) to the parent.
+    """
+    shared, private = memory_usage_mb()
+    reports.put({"worker": index, "pid": os.getpid(), "event": event,
+                 "startup": None if started is None else time.perf_counter() - started,
+                 "shared_mb": shared, "private_mb": private})
+
+def run_worker(index, script, model_path, threads, reports, forked_at):
+    """
+    Worker entry point: report startup, then run the scenario script (or the inference smoke test).
+    """
+    os.environ["FCW_WORKER_INDEX"] = str(index)
+    try:
+        import torch
+        torch.set_num_threads(threads)  # Keep workers from oversubscribing the host's cores
+    except ImportError:
+        pass
+    model = load_model(model_path)  # Inherited from the parent after fork; loaded again under spawn
+    report(reports, index, "started", forked_at)
+
+    def report_periodically():
+        while True:
+            time.sleep(REPORT_INTERVAL)
+            report(reports, index, "running")
+
+    threading.Thread(target=report_periodically, daemon=True).start()
+    if script:
+        script_dir = os.path.dirname(os.path.abspath(script))
+        sys.path.insert(0, script_dir)
+        sys.argv = [script]
+        runpy.run_path(script, run_name="__main__")
+    else:
+        frame = np.zeros(WARMUP_SHAPE, dtype=np.uint8)
+        for _ in range(SMOKE_TEST_FRAMES):
+            model.predict(frame, verbose=False)
+    report(reports, index, "finished")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many scenario processes that share one loaded model.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes")
+    parser.add_argument("--script", default=None, help="Scenario script each worker runs as __main__")
+    parser.add_argument("--model", default=None, help="Model file (defaults to FCW_MODEL_PATH or ./yolov8n.pt)")
+    parser.add_argument("--threads", type=int, default=1, help="Torch threads per worker")
+    args = parser.parse_args()
+
+    # Scripts run in the workers call load_model() without a path, so --model must become the cache default
+    # (the environment variable carries it to spawned workers, which import ModelCache afresh)
+    if args.model:
+        os.environ["FCW_MODEL_PATH"] = args.model
+        ModelCache.MODEL_PATH = args.model
+
+    # Fork shares the parent's pages copy-on-write; platforms without fork (Windows) fall back to spawn
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if fork else "spawn")
+    if fork:
+        load_time = preload(args.model)
+        shared, private = memory_usage_mb()
+        print(f"Parent loaded and warmed up the model in {load_time:.2f}s (shared={format_mb(shared)} private={format_mb(private)})")
+    else:
+        print("fork is not available on this platform: every worker loads its own model")
+
+    reports = context.Queue()
+    workers = []
+    for index in range(args.workers):
+        worker = context.Process(target=run_worker, args=(index, args.script, args.model, args.threads, reports, time.perf_counter()))
+        worker.start()
+        workers.append(worker)
+
+    print(f"{'worker':>6} {'pid':>7} {'event':>8} {'startup':>9} {'shared':>9} {'private':>9}")
+    try:
+        while any(worker.is_alive() for worker in workers) or not reports.empty():
+            try:
+                entry = reports.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            startup = f"{entry['startup'] * 1000:.0f}ms" if entry["startup"] is not None else "-"
+            print(f"{entry['worker']:>6} {entry['pid']:>7} {entry['event']:>8} {startup:>9} "
+                  f"{format_mb(entry['shared_mb']):>9} {format_mb(entry['private_mb']):>9}")
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+    for worker in workers:
+        worker.join()
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,11 @@ Note: This script is an optimized Camera code that integrates Adaptive Cruise Co
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from Detectors import load_detector
 import time
 
-# Load the YOLOv8 pre-trained model
-model = YOLO("./yolov8n.pt")  # Replace with your model file if different
-
 # Constants
+MODEL_PATH = "./yolov8n.pt"  # Replace with your model file if different
 FOCAL_LENGTH = 700  # Focal length of the camera (to be calibrated)
 SAFE_TIME_GAP = 2  # Safe following time gap in seconds
 MAX_SPEED = 30  # Maximum speed of the car in m/s (example: 108 km/h)
@@ -54,6 +52,9 @@ def adjust_speed(current_speed, target_speed):
     return current_speed
 
 def main():
+    # Load the YOLOv8 pre-trained model (here rather than at import, so other scripts can reuse the ACC logic above)
+    model = load_detector(MODEL_PATH)  # FCW_BACKEND picks the backend
+
     # Initialize video capture (camera feed)
     cap = cv2.VideoCapture(0)  # Replace with your camera source if different
 
@@ -76,7 +77,7 @@ def main():
         # Initialize the closest object's distance
         closest_distance = float('inf')
 
-        for result in results.xyxy[0]:
+        for result in results[0].boxes.data.cpu().numpy():
             x1, y1, x2, y2, conf, cls = result  # Bounding box coordinates, confidence, class ID
             class_name = model.names[int(cls)]
 
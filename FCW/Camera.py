@@ -4,16 +4,61 @@ Note: This Script Integrates the camera and calculates the distance and time-to-
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from Detectors import load_detector
 import time
-
-# Load the YOLOv8 pre-trained model
-model = YOLO("./yolov8n.pt")  # Replace with your model file if different
+from Tracker import IoUTracker
+from KalmanFilter import KalmanFilterBank
 
 # Constants
+MODEL_PATH = "./yolov8n.pt"  # Replace with your model file if different
 FOCAL_LENGTH = 700  # Focal length of the camera (to be calibrated)
 BRAKE_THRESHOLD_TTC = 3  # Time-to-collision threshold (seconds)
 
+RELEVANT_CLASSES = ["car", "truck", "bus", "person"]  # Objects considered for collision warnings
+
+def calculate_distances(bounding_box_widths, known_width=2.0, focal_length=FOCAL_LENGTH):
+    """
+    Estimate distances for a whole batch of bounding box widths in one call.
+    :param bounding_box_widths: Array of bounding box widths in pixels
+    :param known_width: Real-world width of the objects in meters
+    :param focal_length: Focal length of the camera
+    :return: NumPy array of distances in meters
+    """
+    widths = np.asarray(bounding_box_widths, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return (known_width * focal_length) / widths
+
+def calculate_times_to_collision(car_speed, object_speeds, distances):
+    """
+    Calculate Time to Collision (TTC) for a batch of objects.
+    :param car_speed: Speed of the car in m/s
+    :param object_speeds: Array of object speeds in m/s
+    :param distances: Array of distances to the objects in meters
+    :return: Tuple of NumPy arrays (relative_speeds, ttcs); TTC is inf where the object is not closing in
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    relative_speeds = car_speed - np.asarray(object_speeds, dtype=np.float64)
+    relative_speeds = np.broadcast_to(relative_speeds, distances.shape)
+    ttcs = np.full(distances.shape, np.inf)
+    closing = relative_speeds > 0  # No collision possible if object is moving away
+    np.divide(distances, relative_speeds, out=ttcs, where=closing)
+    return relative_speeds, ttcs
+
+def calculate_frame_kinematics(detections, car_speed, object_speeds=0.0, known_width=2.0, focal_length=FOCAL_LENGTH):
+    """
+    Calculate distance, relative speed and TTC for every detection of a frame at once.
+    :param detections: (N, 6) array of [x1, y1, x2, y2, conf, cls] rows
+    :param car_speed: Speed of the car in m/s
+    :param object_speeds: Scalar or (N,) array of object speeds in m/s
+    :param known_width: Real-world width of the objects in meters
+    :param focal_length: Focal length of the camera
+    :return: Tuple of NumPy arrays (distances, relative_speeds, ttcs)
+    """
+    detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+    distances = calculate_distances(detections[:, 2] - detections[:, 0], known_width, focal_length)
+    relative_speeds, ttcs = calculate_times_to_collision(car_speed, object_speeds, distances)
+    return distances, relative_speeds, ttcs
+
 def calculate_distance(bounding_box_width, known_width=2.0, focal_length=FOCAL_LENGTH):
     """
     Estimate distance of object from the car using the bounding box width.
@@ -37,7 +82,41 @@ def calculate_time_to_collision(car_speed, object_speed, distance):
         return float('inf')  # No collision possible if object is moving away
     return distance / relative_speed
 
+def calculate_ttc_uncertainty(distances, relative_speeds, covariances):
+    """
+    Propagate the filtered range/range-rate covariance into a TTC standard deviation (first-order).
+    :param distances: Array of filtered distances in meters
+    :param relative_speeds: Array of closing speeds in m/s (the negated range-rate)
+    :param covariances: (N, 2, 2) array of [range, range-rate] covariances
+    :return: NumPy array of TTC standard deviations in seconds; inf where the object is not closing in
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    relative_speeds = np.asarray(relative_speeds, dtype=np.float64)
+    std = np.full(distances.shape, np.inf)
+    closing = relative_speeds > 0
+    d, v = distances[closing], relative_speeds[closing]
+    # TTC = d / v with v = -range_rate, so dTTC/dd = 1/v and dTTC/drange_rate = d/v²
+    grad_range, grad_rate = 1 / v, d / v ** 2
+    variance = (grad_range ** 2 * covariances[closing, 0, 0]
+                + grad_rate ** 2 * covariances[closing, 1, 1]
+                + 2 * grad_range * grad_rate * covariances[closing, 0, 1])
+    std[closing] = np.sqrt(np.maximum(variance, 0))
+    return std
+
+def relevant_class_ids(names, relevant_classes=RELEVANT_CLASSES):
+    """
+    Look up the class IDs of the relevant object classes.
+    :param names: Class names of the model (dict of id -> name, or list)
+    :param relevant_classes: Class names to keep
+    :return: NumPy array of class IDs
+    """
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    return np.array([class_id for class_id, name in items if name in relevant_classes])
+
 def main():
+    # Load the YOLOv8 pre-trained model (here rather than at import, so other scripts can reuse the math above)
+    model = load_detector(MODEL_PATH)  # FCW_BACKEND picks the backend
+
     # Initialize video capture (camera feed)
     cap = cv2.VideoCapture(0)  # Replace with your camera source if different
 
@@ -45,9 +124,11 @@ def main():
         print("Error: Unable to access the camera.")
         return
 
-    # Variables to track object speed
-    object_positions = {}  # Store previous positions for each object
+    # Tracker to follow objects across frames, and Kalman filters to smooth their range and range-rate
+    tracker = IoUTracker()
+    filters = KalmanFilterBank(tracker.max_tracks)
     car_speed = float(input("Enter car's current speed in m/s: "))  # Replace with real-time sensor data
+    class_ids = relevant_class_ids(model.names)
 
     while cap.isOpened():
         ret, frame = cap.read()
@@ -58,41 +139,39 @@ def main():
         # Run YOLOv8 detection
         results = model(frame)
 
-        for result in results.xyxy[0]:
-            x1, y1, x2, y2, conf, cls = result  # Bounding box coordinates, confidence, class ID
+        # Keep only relevant objects (e.g., vehicles, pedestrians)
+        detections = results[0].boxes.data.cpu().numpy()
+        detections = detections[np.isin(detections[:, 5].astype(int), class_ids)]
+        current_time = time.time()
+
+        # Associate detections with tracks, dropping any that do not fit under the tracker's memory cap
+        track_ids, slots, _, _ = tracker.update(detections[:, :4], current_time)
+        detections, slots = detections[track_ids >= 0], slots[track_ids >= 0]
+        new_tracks = tracker.hits[slots] == 1
+
+        # Filter the measured distances into range, range-rate and covariance for all tracks at once
+        measured_distances = calculate_distances(detections[:, 2] - detections[:, 0])
+        distances, range_rates, covariances = filters.step(slots, measured_distances, current_time, new_tracks)
+
+        # Calculate Time to Collision (TTC); object speed is the ego speed plus the range-rate
+        relative_speeds, ttcs = calculate_times_to_collision(car_speed, car_speed + range_rates, distances)
+        ttc_stds = calculate_ttc_uncertainty(distances, relative_speeds, covariances)
+
+        for (x1, y1, x2, y2, conf, cls), distance, ttc, ttc_std in zip(detections, distances, ttcs, ttc_stds):
             class_name = model.names[int(cls)]
 
-            # Only consider relevant objects (e.g., vehicles, pedestrians)
-            if class_name in ["car", "truck", "bus", "person"]:
-                bounding_box_width = x2 - x1
-                object_id = f"{int(x1)}_{int(y1)}"  # Unique ID for the object (based on bounding box location)
-                current_time = time.time()
-
-                # Calculate distance
-                distance = calculate_distance(bounding_box_width)
-
-                # Estimate object speed
-                if object_id in object_positions:
-                    previous_x, previous_time = object_positions[object_id]
-                    object_speed = (bounding_box_width - previous_x) / (current_time - previous_time)
-                else:
-                    object_speed = 0  # Assume 0 speed for the first frame
-
-                object_positions[object_id] = (bounding_box_width, current_time)
-
-                # Calculate Time to Collision (TTC)
-                ttc = calculate_time_to_collision(car_speed, object_speed, distance)
-
-                # Display detection info
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                cv2.putText(frame, f"{class_name} {distance:.2f}m TTC: {ttc:.2f}s",
-                            (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-                # Apply brakes if TTC is below threshold
-                if ttc < BRAKE_THRESHOLD_TTC:
-                    print(f"Warning: Collision with {class_name} detected! Applying brakes.")
-                    # Trigger car braking system (replace this with actual API call)
-                    car_speed = max(0, car_speed - 5)  # Example of reducing speed
+            # Display detection info
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.putText(frame, f"{class_name} {distance:.2f}m TTC: {ttc:.2f}s (+/-{ttc_std:.2f})",
+                        (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+            if ttc < BRAKE_THRESHOLD_TTC:
+                print(f"Warning: Collision with {class_name} detected! Applying brakes.")
+
+        # Apply brakes if any TTC is below threshold
+        if np.any(ttcs < BRAKE_THRESHOLD_TTC):
+            # Trigger car braking system (replace this with actual API call)
+            car_speed = max(0, car_speed - 5)  # Example of reducing speed
 
         # Display the frame
         cv2.imshow("Autonomous Car Detection", frame)
@@ -0,0 +1,136 @@
+'''
+Note: This script exports yolov8n.pt to ONNX, quantizes it to INT8 on scenario frames and compares every CPU backend against the PyTorch model.
+
+Usage:
+    python DetectorBenchmark.py --frames ./frames --calibration ./calibration_frames
+Frames are image files (e.g. front-camera frames saved from the CARLA scenarios). Accuracy is reported as
+mAP@0.5 against the yolov8n.pt detections at the scripts' confidence threshold, so no labels are needed.
+'''
+
+import argparse
+import glob
+import json
+import os
+import time
+import cv2
+import numpy as np
+from Detectors import export_onnx, load_detector, quantize_int8
+from Tracker import iou_matrix
+
+# Constants
+REFERENCE_CONF = 0.5  # Confidence the scripts use; reference detections above it act as ground truth
+EVAL_CONF = 0.25  # Lower threshold for the evaluated backends so the precision-recall curve is complete
+MATCH_IOU = 0.5  # IoU for a detection to match a reference box
+WARMUP_RUNS = 3  # Untimed runs per backend before measuring
+CALIBRATION_FRAMES = 100  # Frames used for INT8 calibration
+
+def load_frames(directory, limit=None):
+    """
+    Read the image files of a directory in name order.
+    :param directory: Directory of .jpg/.png frames
+    :param limit: Maximum number of frames
+    :return: List of BGR images
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.jpg")) + glob.glob(os.path.join(directory, "*.png")))
+    return [cv2.imread(path) for path in paths[:limit]]
+
+def average_precision(detections, references, iou_threshold=MATCH_IOU):
+    """
+    Mean average precision of detections against reference boxes (all-point interpolation).
+    :param detections: List (per image) of (N, 6) [x1, y1, x2, y2, conf, cls] arrays
+    :param references: List (per image) of (M, 6) reference arrays
+    :param iou_threshold: IoU for a detection to match a reference box
+    :return: mAP over the classes present in the references (nan if there are none)
+    """
+    classes = np.unique(np.concatenate([reference[:, 5] for reference in references])) if references else []
+    aps = []
+    for cls in classes:
+        scores, matches, reference_count = [], [], 0
+        for detection, reference in zip(detections, references):
+            detection = detection[detection[:, 5] == cls]
+            detection = detection[np.argsort(-detection[:, 4], kind="stable")]
+            reference = reference[reference[:, 5] == cls]
+            reference_count += len(reference)
+            ious = iou_matrix(detection[:, :4], reference[:, :4])
+            used = np.zeros(len(reference), dtype=bool)
+            for i in range(len(detection)):
+                candidates = np.flatnonzero(~used & (ious[i] >= iou_threshold))
+                if len(candidates):
+                    used[candidates[np.argmax(ious[i, candidates])]] = True
+                matches.append(len(candidates) > 0)
+            scores.extend(detection[:, 4])
+        order = np.argsort(-np.asarray(scores), kind="stable")
+        true_positives = np.cumsum(np.asarray(matches, dtype=bool)[order])
+        recall = np.concatenate([[0.0], true_positives / reference_count, [1.0]])
+        precision = np.concatenate([[0.0], true_positives / np.arange(1, len(order) + 1), [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        aps.append(np.sum(np.diff(recall) * precision[1:]))
+    return float(np.mean(aps)) if len(aps) else float("nan")
+
+def benchmark(model, frames, batch_size):
+    """
+    Time a detector on single frames and on batches.
+    :param model: Detector with the YOLO predict interface
+    :param frames: List of BGR images
+    :param batch_size: Frames per call for the throughput run
+    :return: Tuple of (stats dict, list of per-frame (N, 6) detections at EVAL_CONF)
+    """
+    for _ in range(WARMUP_RUNS):
+        model.predict(frames[0], conf=EVAL_CONF, verbose=False)
+    latencies, detections = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        result = model.predict(frame, conf=EVAL_CONF, verbose=False)[0]
+        latencies.append(time.perf_counter() - started)
+        detections.append(np.asarray(result.boxes.data.cpu().numpy(), dtype=np.float64).reshape(-1, 6))
+    started = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        model.predict(frames[i:i + batch_size], conf=EVAL_CONF, verbose=False)
+    throughput = len(frames) / (time.perf_counter() - started)
+    latencies = np.asarray(latencies) * 1000
+    return {"p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+            "throughput_fps": throughput}, detections
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector backends on recorded frames.")
+    parser.add_argument("--model", default="./yolov8n.pt", help="PyTorch model to export and compare against")
+    parser.add_argument("--frames", required=True, help="Directory of evaluation frames")
+    parser.add_argument("--calibration", default=None, help="Directory of INT8 calibration frames (skip INT8 if not given)")
+    parser.add_argument("--backends", nargs="+", default=["onnxruntime", "openvino"], help="CPU backends to compare")
+    parser.add_argument("--batch", type=int, default=4, help="Batch size for the throughput run")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of evaluation frames")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.limit)
+    if not frames:
+        raise SystemExit(f"No .jpg/.png frames found in {args.frames}")
+    onnx_path = export_onnx(args.model)
+    variants = [("ultralytics", "ultralytics", args.model)]
+    variants += [(backend, backend, onnx_path) for backend in args.backends]
+    if args.calibration:
+        int8_path = quantize_int8(onnx_path, load_frames(args.calibration, CALIBRATION_FRAMES))
+        variants += [(f"{backend}-int8", backend, int8_path) for backend in args.backends]
+
+    results = {}
+    references = None
+    for name, backend, path in variants:
+        stats, detections = benchmark(load_detector(path, backend), frames, args.batch)
+        if references is None:  # The PyTorch model runs first and defines the reference boxes
+            references = [detection[detection[:, 4] >= REFERENCE_CONF] for detection in detections]
+        stats["map50"] = average_precision(detections, references)
+        results[name] = stats
+
+    baseline = results["ultralytics"]
+    print(f"{'backend':>18} {'p50':>8} {'p95':>8} {'fps':>7} {'speedup':>8} {'mAP50':>7} {'delta':>7}")
+    for name, stats in results.items():
+        speedup = baseline["p50_ms"] / stats["p50_ms"]
+        delta = stats["map50"] - baseline["map50"]
+        print(f"{name:>18} {stats['p50_ms']:>6.1f}ms {stats['p95_ms']:>6.1f}ms {stats['throughput_fps']:>7.1f} "
+              f"{speedup:>7.2f}x {stats['map50']:>7.3f} {delta:>+7.3f}")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"frames": len(frames), "batch": args.batch, "results": results}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
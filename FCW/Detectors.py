@@ -0,0 +1,301 @@
+'''
+Note: This script defines the pluggable detector backends shared by the FCW and CARLA scripts.
+
+Every backend exposes the subset of the ultralytics YOLO API the scripts use: model.names and
+model.predict(frames, conf=...) returning a list of results whose .boxes has .data/.xyxy/.conf/.cls.
+Backends:
+    ultralytics  - the PyTorch yolov8n.pt path
+    onnxruntime  - an exported ONNX model (FP32 or INT8-quantized) on ONNX Runtime's CPU provider
+    openvino     - the same ONNX model compiled by OpenVINO for CPU
+'''
+
+import ast
+import os
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+from Tracker import iou_matrix
+
+# Constants
+BACKENDS = ["ultralytics", "onnxruntime", "openvino"]
+IMAGE_SIZE = 640  # Network input size of the exported model
+IOU_THRESHOLD = 0.45  # NMS IoU threshold
+MAX_CANDIDATES = 1000  # Boxes kept (by confidence) before NMS
+MAX_DETECTIONS = 300  # Boxes kept after NMS
+CLASS_OFFSET = 7680  # Per-class coordinate offset so one NMS pass never suppresses across classes
+
+class HostArray(np.ndarray):
+    """
+    NumPy array that also answers .cpu() and .numpy(), so scripts written for torch tensors keep working.
+    """
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+class Boxes:
+    """
+    Detections of one image as an (N, 6) [x1, y1, x2, y2, conf, cls] array, mirroring ultralytics' Boxes.
+    """
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6).view(HostArray)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return (Boxes(row) for row in self.data)
+
+class Results:
+    """
+    Detection results of one image, mirroring ultralytics' Results.
+    """
+
+    def __init__(self, data, names):
+        self.boxes = Boxes(data)
+        self.names = names
+
+def nms(boxes, scores, iou_threshold=IOU_THRESHOLD):
+    """
+    Greedy non-maximum suppression over a precomputed IoU matrix.
+    :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+    :param scores: (N,) array of scores
+    :param iou_threshold: Boxes overlapping a better box by more than this are removed
+    :return: Indices of the kept boxes, best first
+    """
+    order = np.argsort(-scores, kind="stable")
+    overlaps = iou_matrix(boxes[order], boxes[order]) > iou_threshold
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[i + 1:] &= ~overlaps[i, i + 1:]
+    return order[keep]
+
+def letterbox(image, size=IMAGE_SIZE):
+    """
+    Resize an image into a square canvas keeping its aspect ratio.
+    :param image: BGR image
+    :param size: Canvas side in pixels
+    :return: Tuple of (canvas, scale, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    return canvas, scale, (pad_x, pad_y)
+
+def preprocess(images, size=IMAGE_SIZE):
+    """
+    Turn BGR images into a normalised NCHW RGB float batch.
+    :param images: List of BGR images
+    :param size: Network input size
+    :return: Tuple of (batch, list of (scale, pad) per image)
+    """
+    canvases, transforms = [], []
+    for image in images:
+        canvas, scale, pad = letterbox(image, size)
+        canvases.append(canvas)
+        transforms.append((scale, pad))
+    batch = np.stack(canvases)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0, transforms
+
+def postprocess(output, transforms, image_shapes, conf=0.25, iou_threshold=IOU_THRESHOLD):
+    """
+    Decode raw YOLOv8 output into per-image detections.
+    :param output: (B, 4 + classes, anchors) network output
+    :param transforms: List of (scale, pad) from preprocess
+    :param image_shapes: List of original image shapes
+    :param conf: Confidence threshold
+    :param iou_threshold: NMS IoU threshold
+    :return: List of (N, 6) [x1, y1, x2, y2, conf, cls] arrays in original image coordinates
+    """
+    detections = []
+    for prediction, (scale, (pad_x, pad_y)), shape in zip(output, transforms, image_shapes):
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+        candidates = np.flatnonzero(confidences >= conf)
+        candidates = candidates[np.argsort(-confidences[candidates])[:MAX_CANDIDATES]]
+        cx, cy, w, h = prediction[candidates, :4].T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = nms(boxes + classes[candidates, None] * CLASS_OFFSET, confidences[candidates], iou_threshold)[:MAX_DETECTIONS]
+        boxes = (boxes[keep] - [pad_x, pad_y, pad_x, pad_y]) / scale
+        boxes = np.clip(boxes, 0, [shape[1], shape[0], shape[1], shape[0]])
+        detections.append(np.column_stack([boxes, confidences[candidates][keep], classes[candidates][keep]]))
+    return detections
+
+def parse_names(metadata):
+    """
+    Parse the class names ultralytics stores in an exported ONNX model's metadata.
+    :param metadata: Dict of metadata key -> value
+    :return: Dict of class id -> name (empty if the model has none)
+    """
+    return ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+def read_onnx_names(path):
+    """
+    Read the class names from an ONNX model file with the onnx package, for backends without an ONNX Runtime session.
+    :param path: ONNX model file
+    :return: Dict of class id -> name (empty if the metadata cannot be read)
+    """
+    try:
+        import onnx
+    except ImportError:
+        return {}
+    return parse_names({prop.key: prop.value for prop in onnx.load(path, load_external_data=False).metadata_props})
+
+class ONNXDetector(ABC):
+    """
+    Base class for backends that run an exported YOLOv8 ONNX graph; subclasses implement infer()
+    and fill in the class names from their model when none are given.
+    """
+
+    def __init__(self, path, names=None):
+        self.path = path
+        self.names = names or {}
+        self.batch_size = None  # None means the graph accepts any batch size
+        self.image_size = None  # None means the graph accepts any input size
+
+    @abstractmethod
+    def infer(self, batch):
+        """
+        Run the graph on a preprocessed batch.
+        :param batch: (B, 3, H, W) float32 array from preprocess()
+        :return: Raw (B, 4 + classes, anchors) network output
+        """
+
+    def predict(self, source, conf=0.25, iou=IOU_THRESHOLD, imgsz=IMAGE_SIZE, verbose=False, **kwargs):
+        """
+        Detect objects in one image or a list of images.
+        :param source: BGR image or list of BGR images
+        :param conf: Confidence threshold
+        :param iou: NMS IoU threshold
+        :param imgsz: Network input size (ignored by graphs exported with a fixed size)
+        :return: List of Results, one per image
+        """
+        images = source if isinstance(source, list) else [source]
+        batch, transforms = preprocess(images, self.image_size or imgsz)
+        if self.batch_size is None:
+            output = self.infer(batch)
+        else:  # Fixed-batch graphs run one image at a time
+            output = np.concatenate([self.infer(batch[i:i + 1]) for i in range(len(batch))])
+        detections = postprocess(output, transforms, [image.shape for image in images], conf, iou)
+        return [Results(data, self.names) for data in detections]
+
+    __call__ = predict
+
+class ONNXRuntimeDetector(ONNXDetector):
+    """
+    ONNX Runtime CPU backend (works for both the FP32 and the INT8-quantized model).
+    """
+
+    def __init__(self, path, names=None, threads=None):
+        import onnxruntime
+        super().__init__(path, names)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.names = self.names or parse_names(self.session.get_modelmeta().custom_metadata_map)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.image_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else None
+
+    def infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVINODetector(ONNXDetector):
+    """
+    OpenVINO CPU backend compiled from the exported ONNX model.
+    """
+
+    def __init__(self, path, names=None):
+        import openvino
+        super().__init__(path, names)
+        core = openvino.Core()
+        model = core.read_model(path)
+        self.names = self.names or read_onnx_names(path)
+        shape = model.input(0).get_partial_shape()
+        self.batch_size = None if shape[0].is_dynamic else shape[0].get_length()
+        self.image_size = None if shape[2].is_dynamic else shape[2].get_length()
+        self.compiled = core.compile_model(model, "CPU")
+        self.output = self.compiled.output(0)
+
+    def infer(self, batch):
+        return self.compiled(batch)[self.output]
+
+def export_onnx(model_path, dynamic=True):
+    """
+    Export a .pt model to ONNX next to it (skipped if the export already exists).
+    :param model_path: .pt model file
+    :param dynamic: Export with a dynamic batch dimension
+    :return: Path of the ONNX model
+    """
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+        onnx_path = YOLO(model_path).export(format="onnx", imgsz=IMAGE_SIZE, dynamic=dynamic, simplify=True)
+    return onnx_path
+
+def quantize_int8(onnx_path, calibration_frames, output_path=None):
+    """
+    Statically quantize an ONNX model to INT8, calibrating activations on real frames.
+    :param onnx_path: FP32 ONNX model file
+    :param calibration_frames: Iterable of BGR frames (e.g. captured from our scenarios)
+    :param output_path: Quantized model file (defaults to <model>.int8.onnx)
+    :return: Path of the quantized model
+    """
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    import onnxruntime
+    input_name = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    output_path = output_path or os.path.splitext(onnx_path)[0] + ".int8.onnx"
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {input_name: preprocess([frame])[0]}
+
+    quantize_static(onnx_path, output_path, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return output_path
+
+def load_detector(model_path="./yolov8n.pt", backend=None):
+    """
+    Load a detector for the requested backend.
+    :param model_path: .pt model (exported to ONNX on demand) or .onnx model
+    :param backend: One of BACKENDS (defaults to the FCW_BACKEND environment variable, then ultralytics)
+    :return: Detector with the YOLO predict interface
+    """
+    backend = backend or os.environ.get("FCW_BACKEND", "ultralytics")
+    if backend == "ultralytics":
+        from ultralytics import YOLO
+        return YOLO(model_path)
+    onnx_path = model_path if model_path.endswith(".onnx") else export_onnx(model_path)
+    if backend == "onnxruntime":
+        return ONNXRuntimeDetector(onnx_path)
+    if backend == "openvino":
+        return OpenVINODetector(onnx_path)
+    raise ValueError(f"Unknown detector backend: {backend} (expected one of {BACKENDS})")
@@ -0,0 +1,89 @@
+'''
+Note: This script implements a bank of constant-velocity Kalman filters that smooths range and range-rate for every track at once.
+'''
+
+import numpy as np
+
+# Constants
+PROCESS_NOISE = 4.0  # Variance of the unmodelled acceleration ((m/s²)²)
+MEASUREMENT_NOISE = 1.0  # Variance of a single range measurement (m²)
+INITIAL_RANGE_RATE_VARIANCE = 100.0  # Variance of the unknown range-rate of a new track ((m/s)²)
+
+class KalmanFilterBank:
+    """
+    Constant-velocity Kalman filters for many tracks, stored in contiguous arrays.
+    Row i of the state holds [range (m), range-rate (m/s)] of slot i, so slots line up with IoUTracker slots.
+    """
+
+    def __init__(self, capacity, process_noise=PROCESS_NOISE, measurement_noise=MEASUREMENT_NOISE):
+        """
+        :param capacity: Number of filter slots
+        :param process_noise: Variance of the unmodelled acceleration
+        :param measurement_noise: Variance of a range measurement
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.states = np.zeros((capacity, 2))
+        self.covariances = np.zeros((capacity, 2, 2))
+        self.timestamps = np.zeros(capacity)
+
+    def initialize(self, slots, ranges, timestamp):
+        """
+        Start filters for new tracks from their first range measurement.
+        :param slots: Array of slot indices
+        :param ranges: Array of measured ranges in meters
+        :param timestamp: Time of the measurement in seconds
+        """
+        self.states[slots, 0] = ranges
+        self.states[slots, 1] = 0.0
+        self.covariances[slots] = np.diag([self.measurement_noise, INITIAL_RANGE_RATE_VARIANCE])
+        self.timestamps[slots] = timestamp
+
+    def predict(self, slots, timestamp):
+        """
+        Propagate the selected filters to the given time.
+        :param slots: Array of slot indices
+        :param timestamp: Time to predict to in seconds
+        """
+        dt = timestamp - self.timestamps[slots]
+        ones, zeros = np.ones_like(dt), np.zeros_like(dt)
+        transition = np.stack([np.stack([ones, dt], -1), np.stack([zeros, ones], -1)], -2)
+        noise = self.process_noise * np.stack([
+            np.stack([dt ** 4 / 4, dt ** 3 / 2], -1),
+            np.stack([dt ** 3 / 2, dt ** 2], -1),
+        ], -2)
+        self.states[slots] = np.einsum("nij,nj->ni", transition, self.states[slots])
+        self.covariances[slots] = transition @ self.covariances[slots] @ transition.transpose(0, 2, 1) + noise
+        self.timestamps[slots] = timestamp
+
+    def update(self, slots, ranges):
+        """
+        Correct the selected filters with new range measurements.
+        :param slots: Array of slot indices
+        :param ranges: Array of measured ranges in meters
+        """
+        states = self.states[slots]
+        covariances = self.covariances[slots]
+        # With H = [1, 0] the innovation covariance is scalar, so no matrix inverse is needed
+        innovation = ranges - states[:, 0]
+        innovation_variance = covariances[:, 0, 0] + self.measurement_noise
+        gain = covariances[:, :, 0] / innovation_variance[:, None]
+        self.states[slots] = states + gain * innovation[:, None]
+        self.covariances[slots] = covariances - gain[:, :, None] * covariances[:, None, 0, :]
+
+    def step(self, slots, ranges, timestamp, new_tracks):
+        """
+        Run one predict/update cycle for the tracks seen in a frame.
+        :param slots: Array of slot indices, one per detection
+        :param ranges: Array of measured ranges in meters
+        :param timestamp: Capture time of the frame in seconds
+        :param new_tracks: Boolean mask of detections that started a new track this frame
+        :return: Tuple of (ranges, range_rates, covariances) filtered for each detection
+        """
+        slots = np.asarray(slots)
+        ranges = np.asarray(ranges, dtype=np.float64)
+        self.initialize(slots[new_tracks], ranges[new_tracks], timestamp)
+        existing = ~new_tracks
+        self.predict(slots[existing], timestamp)
+        self.update(slots[existing], ranges[existing])
+        return self.states[slots, 0], self.states[slots, 1], self.covariances[slots]
@@ -0,0 +1,308 @@
+'''
+Note: This script times the FCW math, the camera-radar fusion and the proximity queries on synthetic inputs of growing size.
+No camera, model or simulator is needed: boxes, radar sweeps and world snapshots are generated from a fixed seed.
+
+Every run is appended to a JSON history. A benchmark slower than the median of its recent runs on the same machine,
+Python and NumPy by more than the threshold is timed again; if it is still slower the run fails (exit status 1) and
+that benchmark's time is recorded flagged, so it never becomes part of a later baseline. An intended slowdown is
+accepted with --accept, which restarts the baselines from that run.
+
+Usage:
+    python Microbenchmarks.py --sizes 1,10,100,1000 --history benchmark_history.json --threshold 0.5
+    python Microbenchmarks.py --filter fuse --no-record
+    python Microbenchmarks.py --accept
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from types import SimpleNamespace
+import numpy as np
+
+import ACC
+import Camera
+import Radar
+from Detectors import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CARLA_SIMULATION"))  # Proximity and corridor modules
+from Proximity import ProximityMonitor
+from Corridor import EgoCorridor, WaypointGraph
+
+# Constants
+SIZES = [1, 10, 100, 1000]  # Boxes, radar points, speed steps or actors per call
+REPEATS = 7  # Timed repeats per benchmark and size (the fastest one is kept)
+MIN_REPEAT_TIME = 0.05  # Seconds each timed repeat runs for at least (calls are looped to reach it)
+HISTORY = "benchmark_history.json"
+THRESHOLD = 0.5  # Allowed slowdown against the baseline (0.5 = 50% slower); microsecond calls jitter by 40% between runs
+RECHECKS = 2  # Extra measurements of a benchmark over the threshold before it counts as a regression
+BASELINE_RUNS = 5  # Recent runs whose median is the baseline
+MIN_BASELINE_RUNS = 3  # Runs needed before a benchmark is gated (one unusually fast run must not become the baseline)
+SEED = 0
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+CLASS_NAMES = {0: "person", 2: "car", 5: "bus", 7: "truck"}
+
+def synthetic_boxes(rng, count):
+    """
+    Random detections inside the camera frame.
+    :param rng: numpy Generator
+    :param count: Number of boxes
+    :return: (count, 6) array of [x1, y1, x2, y2, conf, cls]
+    """
+    x1 = rng.uniform(0, FRAME_WIDTH - 80, count)
+    y1 = rng.uniform(FRAME_HEIGHT / 3, FRAME_HEIGHT - 60, count)
+    widths, heights = rng.uniform(20, 80, count), rng.uniform(15, 60, count)
+    classes = rng.choice(list(CLASS_NAMES), count)
+    return np.stack([x1, y1, x1 + widths, y1 + heights, rng.uniform(0.5, 1.0, count), classes], axis=1).astype(np.float32)
+
+def synthetic_radar(rng, count):
+    """
+    Random radar returns in front of the sensor.
+    :param rng: numpy Generator
+    :param count: Number of returns
+    :return: Structured array with Radar.RADAR_DTYPE
+    """
+    return Radar.make_radar_array(rng.uniform(5, 80, count), rng.uniform(-15, 5, count), rng.uniform(-20, 20, count))
+
+class SyntheticWorld:
+    """
+    Just enough of carla.World for ProximityMonitor: vehicles spread over a straight three-lane road,
+    every get_snapshot() a new frame so each query pays the full per-tick update.
+    """
+
+    def __init__(self, rng, count):
+        """
+        :param rng: numpy Generator
+        :param count: Number of vehicles besides the player
+        """
+        self.frame = 0
+        self.actors = [SimpleNamespace(id=vehicle_id) for vehicle_id in range(1, count + 2)]  # Id 1 is the player
+        positions = np.stack([rng.uniform(-30, 120, count + 1), rng.choice([-3.5, 0.0, 3.5], count + 1), np.zeros(count + 1)], axis=1)
+        positions[0] = 0.0
+        speeds = rng.uniform(0, 15, count + 1)
+        self.states = {}
+        for actor, position, speed in zip(self.actors, positions, speeds):
+            transform = SimpleNamespace(location=SimpleNamespace(x=position[0], y=position[1], z=position[2]),
+                                        rotation=SimpleNamespace(pitch=0.0, yaw=0.0, roll=0.0))
+            velocity = SimpleNamespace(x=speed, y=0.0, z=0.0)
+            self.states[actor.id] = SimpleNamespace(get_transform=lambda transform=transform: transform,
+                                                    get_velocity=lambda velocity=velocity: velocity)
+
+    def get_snapshot(self):
+        self.frame += 1
+        return SimpleNamespace(frame=self.frame, find=self.states.get)
+
+    def get_actors(self):
+        return SimpleNamespace(filter=lambda pattern: self.actors)
+
+def straight_road_graph(length=200.0, spacing=2.0, lanes=(-3.5, 0.0, 3.5)):
+    """
+    Waypoint graph of a straight road along +x.
+    :param length: Road length (m)
+    :param spacing: Waypoint spacing (m)
+    :param lanes: Lateral lane center offsets (m)
+    :return: WaypointGraph
+    """
+    xs = np.arange(-50.0, length, spacing)
+    positions = np.array([(x, lane, 0.0) for lane in lanes for x in xs])
+    successors = np.full((len(positions), 3), -1, dtype=np.int64)
+    for lane in range(len(lanes)):
+        start = lane * len(xs)
+        successors[start:start + len(xs) - 1, 0] = np.arange(start + 1, start + len(xs))
+    return WaypointGraph(positions, np.zeros(len(positions)), np.full(len(positions), 3.5), successors)
+
+# Every benchmark builds its inputs for a size and returns the call to time
+def bench_calculate_distance(rng, size):
+    widths = rng.uniform(10, 300, size).tolist()
+    return lambda: [Camera.calculate_distance(width) for width in widths]
+
+def bench_calculate_distances(rng, size):
+    widths = rng.uniform(10, 300, size)
+    return lambda: Camera.calculate_distances(widths)
+
+def bench_calculate_time_to_collision(rng, size):
+    cases = list(zip(rng.uniform(0, 30, size), rng.uniform(0, 30, size), rng.uniform(1, 100, size)))
+    return lambda: [Camera.calculate_time_to_collision(car, other, distance) for car, other, distance in cases]
+
+def bench_calculate_times_to_collision(rng, size):
+    object_speeds, distances = rng.uniform(0, 30, size), rng.uniform(1, 100, size)
+    return lambda: Camera.calculate_times_to_collision(20.0, object_speeds, distances)
+
+def bench_acc_control(rng, size):
+    distances = rng.uniform(1, 100, size).tolist()
+
+    def control():
+        speed = 20.0
+        for distance in distances:
+            speed = ACC.adjust_speed(speed, ACC.calculate_safe_speed(distance, speed))
+        return speed
+    return control
+
+def bench_fuse_detections(mode):
+    def setup(rng, size):
+        boxes, radar = synthetic_boxes(rng, size)[:, :4], synthetic_radar(rng, size)
+        intrinsics = Radar.camera_intrinsics(FRAME_WIDTH, FRAME_HEIGHT)
+        return lambda: Radar.fuse_detections(boxes, radar, intrinsics, mode)
+    return setup
+
+def bench_fuse_camera_radar(rng, size):
+    frame = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    results, radar = [Results(synthetic_boxes(rng, size), CLASS_NAMES)], synthetic_radar(rng, size)
+    return lambda: Radar.fuse_camera_radar(frame, radar, results)
+
+def bench_proximity(in_path):
+    def setup(rng, size):
+        world = SyntheticWorld(rng, size)
+        corridor = EgoCorridor(straight_road_graph()) if in_path else None
+        proximity = ProximityMonitor(world, world.actors[0], corridor=corridor)
+        return (lambda: proximity.vehicles_in_path()) if in_path else (lambda: proximity.vehicles_ahead())
+    return setup
+
+# Benchmark name -> (setup, what the size counts)
+BENCHMARKS = {
+    "calculate_distance": (bench_calculate_distance, "calls"),
+    "calculate_distances": (bench_calculate_distances, "boxes"),
+    "calculate_time_to_collision": (bench_calculate_time_to_collision, "calls"),
+    "calculate_times_to_collision": (bench_calculate_times_to_collision, "objects"),
+    "calculate_safe_speed+adjust_speed": (bench_acc_control, "steps"),
+    "fuse_detections[greedy]": (bench_fuse_detections("greedy"), "boxes+points"),
+    "fuse_camera_radar": (bench_fuse_camera_radar, "boxes+points"),
+    "check_proximity[vehicles_ahead]": (bench_proximity(False), "actors"),
+    "check_proximity[vehicles_in_path]": (bench_proximity(True), "actors"),
+}
+if Radar.linear_sum_assignment is not None:
+    BENCHMARKS["fuse_detections[hungarian]"] = (bench_fuse_detections("hungarian"), "boxes+points")
+
+def measure(call, repeats=REPEATS, min_time=MIN_REPEAT_TIME):
+    """
+    Time a call: loop it long enough for the clock, repeat, keep the fastest repeat.
+    :param call: Zero-argument callable
+    :param repeats: Timed repeats
+    :param min_time: Minimum seconds per repeat
+    :return: Seconds per call
+    """
+    timer = timeit.Timer(call)
+    number, elapsed = 1, 0.0
+    while elapsed < min_time:  # Like Timer.autorange(), but to a configurable duration
+        elapsed = timer.timeit(number)
+        if elapsed < min_time:
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeats, number)) / number
+
+def run(sizes, names, repeats=REPEATS, seed=SEED):
+    """
+    Run the selected benchmarks over every size.
+    :param sizes: Input sizes
+    :param names: Benchmark names
+    :param repeats: Timed repeats per benchmark and size
+    :param seed: Seed of the synthetic inputs
+    :return: Dict of "name/size" -> seconds per call
+    """
+    results = {}
+    for name in names:
+        setup, _ = BENCHMARKS[name]
+        for size in sizes:
+            results[f"{name}/{size}"] = measure(setup(np.random.default_rng(seed), size), repeats)
+    return results
+
+def load_history(path):
+    """
+    :param path: History file
+    :return: List of earlier runs, oldest first (empty if the file does not exist)
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)["runs"]
+
+def environment():
+    """
+    :return: The fields a run must share with earlier runs for their times to be comparable
+    """
+    return {"machine": platform.machine(), "processor": platform.processor(), "python": platform.python_version(),
+            "numpy": np.__version__}
+
+def baselines(history, runs=BASELINE_RUNS, min_runs=MIN_BASELINE_RUNS):
+    """
+    Median time of every benchmark over its most recent runs in this environment, leaving out the times flagged as
+    regressions and anything older than the last accepted run.
+    :param history: Earlier runs, oldest first
+    :param runs: Recent runs per benchmark to take the median of
+    :param min_runs: Runs a benchmark needs before it has a baseline
+    :return: Dict of "name/size" -> seconds per call
+    """
+    current = environment()
+    times = {}
+    for entry in history:
+        if any(entry.get(field) != value for field, value in current.items()):
+            continue
+        for key, seconds in entry["results"].items():
+            if entry.get("accepted"):
+                times[key] = [seconds]  # Accepted as the new baseline: earlier times no longer count
+            elif key not in entry.get("regressed", []):
+                times.setdefault(key, []).append(seconds)
+    return {key: float(np.median(values[-runs:])) for key, values in times.items() if len(values) >= min_runs}
+
+def format_time(seconds):
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the FCW math, fusion and proximity queries on synthetic inputs.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated input sizes")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed repeats per benchmark and size")
+    parser.add_argument("--history", default=HISTORY, help="JSON history the run is compared against and appended to")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown against the baseline (0.5 = 50%%)")
+    parser.add_argument("--no-record", action="store_true", help="Compare against the history without appending this run")
+    parser.add_argument("--accept", action="store_true", help="Record this run as the new baseline, regressions included")
+    args = parser.parse_args()
+    if args.accept and args.no_record:
+        parser.error("--accept records the run and cannot be combined with --no-record")
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if not names:
+        raise SystemExit(f"No benchmark matches {args.filter!r}")
+    history = load_history(args.history)
+    baseline = baselines(history)
+    results = run(sizes, names, args.repeats)
+
+    # A benchmark over the threshold is timed again and keeps its fastest time, so a noisy moment does not fail the run
+    for key in list(results):
+        name, size = key.rsplit("/", 1)
+        for _ in range(RECHECKS):
+            if key not in baseline or results[key] <= baseline[key] * (1 + args.threshold):
+                break
+            results[key] = min(results[key], run([int(size)], [name], args.repeats)[key])
+
+    regressions = []
+    print(f"{'benchmark':>36} {'size':>6} {'unit':>13} {'time':>10} {'per item':>10} {'baseline':>10} {'change':>8}")
+    for name in names:
+        for size in sizes:
+            key = f"{name}/{size}"
+            seconds, previous = results[key], baseline.get(key)
+            change = seconds / previous - 1 if previous else None
+            if change is not None and change > args.threshold:
+                regressions.append(key)
+            print(f"{name:>36} {size:>6} {BENCHMARKS[name][1]:>13} {format_time(seconds):>10} {format_time(seconds / size):>10} "
+                  f"{format_time(previous) if previous else '-':>10} {f'{change:+.0%}' if change is not None else '-':>8}"
+                  f"{'  REGRESSION' if key in regressions else ''}")
+
+    if not args.no_record:
+        history.append({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **environment(), "accepted": args.accept,
+                        "regressed": [] if args.accept else regressions, "results": results})
+        with open(args.history, "w") as file:
+            json.dump({"runs": history}, file, indent=1)
+    if regressions and args.accept:
+        print(f"Accepted {len(regressions)} slower benchmark(s) as the new baseline: {', '.join(regressions)}")
+    elif regressions:
+        raise SystemExit(f"{len(regressions)} benchmark(s) slower than {args.threshold:.0%} over baseline: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
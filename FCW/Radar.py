@@ -4,65 +4,182 @@ Note: This script demonstrates how to fuse camera and radar data for enhanced ob
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-
-# Load YOLOv8 model
-model = YOLO("./yolov8n.pt")  # Replace with your model file if different
+from Detectors import load_detector
+from Tracker import greedy_match
+from Camera import relevant_class_ids
+
+# Constants
+MODEL_PATH = "./yolov8n.pt"  # Replace with your model file if different
+FOCAL_LENGTH = 700  # Focal length of the camera in pixels (to be calibrated)
+GATE_PIXELS = 50  # Max horizontal offset between a radar return and a box center for a match
+RANGE_WEIGHT = 0.5  # Weight of radar range in the matching cost (prefers the nearest return)
+MAX_RADAR_RANGE = 100.0  # Range used to normalise the range term of the cost (meters)
+VEHICLE_CLASSES = ["car", "truck", "bus"]
+
+# Radar detections use the same field layout as CARLA's RadarMeasurement.raw_data (angles in radians)
+RADAR_DTYPE = np.dtype([
+    ("velocity", np.float32),  # Radial velocity (m/s), negative when approaching
+    ("azimuth", np.float32),  # Horizontal angle (rad), positive to the right
+    ("altitude", np.float32),  # Vertical angle (rad), positive upwards
+    ("depth", np.float32),  # Distance (m)
+])
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # Hungarian mode is unavailable without SciPy
+    linear_sum_assignment = None
+
+def make_radar_array(distances, velocities, azimuths_deg, altitudes_deg=0.0):
+    """
+    Build a structured radar array from per-field values.
+    :param distances: Distances in meters
+    :param velocities: Radial velocities in m/s
+    :param azimuths_deg: Azimuth angles in degrees
+    :param altitudes_deg: Altitude angles in degrees
+    :return: NumPy structured array with RADAR_DTYPE
+    """
+    distances = np.atleast_1d(distances)
+    radar = np.zeros(len(distances), dtype=RADAR_DTYPE)
+    radar["depth"] = distances
+    radar["velocity"] = velocities
+    radar["azimuth"] = np.radians(azimuths_deg)
+    radar["altitude"] = np.radians(altitudes_deg)
+    return radar
 
 # Simulated Radar Data (Example)
-# Each entry is [distance (m), velocity (m/s), angle (degrees)]
-radar_data = [
-    {"distance": 20, "velocity": -5, "angle": 0},  # Object 1
-    {"distance": 30, "velocity": -10, "angle": -5},  # Object 2
-]
+radar_data = make_radar_array(
+    distances=[20, 30],  # Object 1, Object 2
+    velocities=[-5, -10],
+    azimuths_deg=[0, -5],
+)
+
+def camera_intrinsics(width, height, focal_length=FOCAL_LENGTH, fov=None):
+    """
+    Build the pinhole intrinsic matrix of the camera.
+    :param width: Image width in pixels
+    :param height: Image height in pixels
+    :param focal_length: Focal length in pixels (ignored if fov is given)
+    :param fov: Horizontal field of view in degrees
+    :return: 3x3 intrinsic matrix
+    """
+    if fov is not None:
+        focal_length = width / (2 * np.tan(np.radians(fov) / 2))
+    return np.array([
+        [focal_length, 0, width / 2],
+        [0, focal_length, height / 2],
+        [0, 0, 1],
+    ])
+
+def project_radar_to_image(radar, intrinsics):
+    """
+    Project radar azimuth/altitude into image coordinates (radar assumed co-located with the camera).
+    :param radar: Structured radar array with RADAR_DTYPE
+    :param intrinsics: 3x3 camera intrinsic matrix
+    :return: Tuple of (u, v) pixel coordinate arrays
+    """
+    u = intrinsics[0, 2] + intrinsics[0, 0] * np.tan(radar["azimuth"])
+    v = intrinsics[1, 2] - intrinsics[1, 1] * np.tan(radar["altitude"])
+    return u, v
 
-def fuse_camera_radar(camera_frame, radar_data, yolo_results):
+def fusion_cost_matrix(boxes, radar, intrinsics, gate_pixels=GATE_PIXELS):
+    """
+    Build the gated box-to-radar cost matrix for all pairs at once.
+    :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+    :param radar: Structured radar array with RADAR_DTYPE
+    :param intrinsics: 3x3 camera intrinsic matrix
+    :param gate_pixels: Max horizontal offset for a valid pair
+    :return: (N, M) cost matrix, inf for pairs outside the gate
+    """
+    u, _ = project_radar_to_image(radar, intrinsics)
+    bbox_center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    offset = np.abs(bbox_center_x[:, None] - u[None, :])
+    cost = offset / gate_pixels + RANGE_WEIGHT * radar["depth"][None, :] / MAX_RADAR_RANGE
+    cost[offset >= gate_pixels] = np.inf
+    return cost
+
+def assign(cost, mode="greedy"):
+    """
+    Solve the gated assignment between boxes (rows) and radar returns (columns).
+    :param cost: (N, M) cost matrix with inf for invalid pairs
+    :param mode: "greedy" (best pairs first) or "hungarian" (globally optimal)
+    :return: (N,) array with the matched radar index of each box, or -1
+    """
+    matches = np.full(cost.shape[0], -1)
+    valid = np.isfinite(cost)
+    # Only rows and columns with at least one valid pair take part in the assignment
+    rows, cols = np.flatnonzero(valid.any(axis=1)), np.flatnonzero(valid.any(axis=0))
+    if len(rows) == 0:
+        return matches
+    sub = cost[np.ix_(rows, cols)]
+    if mode == "greedy":
+        sub_rows, sub_cols = greedy_match(sub, np.finfo(float).max, higher_is_better=False)
+    elif mode == "hungarian":
+        if linear_sum_assignment is None:
+            raise ImportError("Hungarian fusion mode requires SciPy (pip install scipy)")
+        sub_rows, sub_cols = linear_sum_assignment(np.where(np.isfinite(sub), sub, 1e9))
+        keep = np.isfinite(sub[sub_rows, sub_cols])
+        sub_rows, sub_cols = sub_rows[keep], sub_cols[keep]
+    else:
+        raise ValueError(f"Unknown assignment mode: {mode}")
+    matches[rows[sub_rows]] = cols[sub_cols]
+    return matches
+
+def fuse_detections(boxes, radar, intrinsics, mode="greedy", gate_pixels=GATE_PIXELS):
+    """
+    Match YOLO boxes to radar returns.
+    :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+    :param radar: Structured radar array with RADAR_DTYPE
+    :param intrinsics: 3x3 camera intrinsic matrix
+    :param mode: "greedy" or "hungarian"
+    :param gate_pixels: Max horizontal offset for a valid pair
+    :return: (N,) array with the matched radar index of each box, or -1
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(boxes) == 0 or len(radar) == 0:
+        return np.full(len(boxes), -1)
+    return assign(fusion_cost_matrix(boxes, radar, intrinsics, gate_pixels), mode)
+
+def fuse_camera_radar(camera_frame, radar_data, yolo_results, mode="greedy"):
     """
     Fuse camera (YOLO) and radar data for enhanced object detection.
     :param camera_frame: The current camera frame (image)
-    :param radar_data: List of radar detections
+    :param radar_data: Structured radar array with RADAR_DTYPE
     :param yolo_results: YOLOv8 detections
+    :param mode: Assignment mode, "greedy" or "hungarian"
     :return: Frame with fused data visualized
     """
-    # Loop through YOLO detections
-    for result in yolo_results.xyxy[0]:
-        x1, y1, x2, y2, conf, cls = result  # Bounding box coordinates, confidence, class ID
-        class_name = model.names[int(cls)]
-
-        # Only consider relevant objects (e.g., vehicles)
-        if class_name in ["car", "truck", "bus"]:
-            bbox_center_x = (x1 + x2) / 2
-            bbox_center_y = (y1 + y2) / 2
-
-            # Match radar data to YOLO bounding boxes
-            closest_radar_object = None
-            min_distance = float('inf')
-            for radar_obj in radar_data:
-                radar_angle_px = radar_obj["angle"]  # Assume angle mapping to horizontal position
-                radar_distance = radar_obj["distance"]
-
-                # Simple matching logic: nearest radar object to bounding box center
-                if abs(bbox_center_x - radar_angle_px) < 50:  # Threshold for matching
-                    if radar_distance < min_distance:
-                        min_distance = radar_distance
-                        closest_radar_object = radar_obj
-
-            # Display matched radar information on frame
-            if closest_radar_object:
-                cv2.rectangle(camera_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                cv2.putText(
-                    camera_frame,
-                    f"{class_name} {min_distance:.2f}m {closest_radar_object['velocity']:.2f}m/s",
-                    (int(x1), int(y1) - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (255, 0, 0),
-                    2,
-                )
+    # Only consider relevant objects (e.g., vehicles)
+    names = yolo_results[0].names
+    detections = yolo_results[0].boxes.data.cpu().numpy()
+    detections = detections[np.isin(detections[:, 5].astype(int), relevant_class_ids(names, VEHICLE_CLASSES))]
+
+    # Match radar data to YOLO bounding boxes
+    intrinsics = camera_intrinsics(camera_frame.shape[1], camera_frame.shape[0])
+    matches = fuse_detections(detections[:, :4], radar_data, intrinsics, mode)
+
+    # Display matched radar information on frame
+    for (x1, y1, x2, y2, conf, cls), match in zip(detections, matches):
+        if match < 0:
+            continue
+        class_name = names[int(cls)]
+        radar_obj = radar_data[match]
+        cv2.rectangle(camera_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        cv2.putText(
+            camera_frame,
+            f"{class_name} {radar_obj['depth']:.2f}m {radar_obj['velocity']:.2f}m/s",
+            (int(x1), int(y1) - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (255, 0, 0),
+            2,
+        )
 
     return camera_frame
 
 def main():
+    # Load YOLOv8 model (here rather than at import, so other scripts can reuse the fusion above)
+    model = load_detector(MODEL_PATH)  # FCW_BACKEND picks the backend
+
     # Initialize camera feed
     cap = cv2.VideoCapture(0)
 
@@ -0,0 +1,180 @@
+'''
+Note: This script implements a bounded-memory IoU multi-object tracker used to give detections stable IDs across frames.
+'''
+
+import numpy as np
+
+# Constants
+IOU_THRESHOLD = 0.3  # Minimum IoU for a detection to continue a track
+CENTROID_GATE = 0.5  # Max centroid distance (as a fraction of the box diagonal) for the fallback match
+MAX_MISSED_FRAMES = 5  # Tracks unseen for more frames than this are evicted
+MAX_TRACKS = 256  # Fixed memory cap on concurrently stored tracks
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Compute the IoU between every pair of boxes in two sets.
+    :param boxes_a: (M, 4) array of [x1, y1, x2, y2] boxes
+    :param boxes_b: (N, 4) array of [x1, y1, x2, y2] boxes
+    :return: (M, N) array of IoU values
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(union > 0, intersection / union, 0.0)
+
+def centroid_distance_matrix(boxes_a, boxes_b):
+    """
+    Compute the centroid distance between every pair of boxes, normalised by the diagonal of boxes_a.
+    :param boxes_a: (M, 4) array of [x1, y1, x2, y2] boxes
+    :param boxes_b: (N, 4) array of [x1, y1, x2, y2] boxes
+    :return: (M, N) array of normalised centroid distances
+    """
+    centers_a = (boxes_a[:, :2] + boxes_a[:, 2:]) / 2
+    centers_b = (boxes_b[:, :2] + boxes_b[:, 2:]) / 2
+    diagonal = np.hypot(boxes_a[:, 2] - boxes_a[:, 0], boxes_a[:, 3] - boxes_a[:, 1])
+    distance = np.linalg.norm(centers_a[:, None, :] - centers_b[None, :, :], axis=2)
+    return distance / np.maximum(diagonal, 1.0)[:, None]
+
+def greedy_match(score, threshold, higher_is_better=True):
+    """
+    Greedily pair rows and columns of a score matrix, best pairs first.
+    :param score: (M, N) score matrix
+    :param threshold: Pairs worse than this are never matched
+    :param higher_is_better: True for similarity scores (IoU), False for costs (distance)
+    :return: Tuple of (row_indices, col_indices) arrays of matched pairs
+    """
+    valid = score >= threshold if higher_is_better else score <= threshold
+    rows, cols = np.nonzero(valid)
+    order = np.argsort(-score[rows, cols] if higher_is_better else score[rows, cols], kind="stable")
+    used_rows = np.zeros(score.shape[0], dtype=bool)
+    used_cols = np.zeros(score.shape[1], dtype=bool)
+    matched_rows, matched_cols = [], []
+    # Only candidate pairs above the gate are visited, usually about one per detection
+    for row, col in zip(rows[order], cols[order]):
+        if not used_rows[row] and not used_cols[col]:
+            used_rows[row] = used_cols[col] = True
+            matched_rows.append(row)
+            matched_cols.append(col)
+    return np.array(matched_rows, dtype=int), np.array(matched_cols, dtype=int)
+
+class IoUTracker:
+    """
+    Multi-object tracker with all track state held in fixed-size NumPy arrays.
+    Detections are associated to tracks by IoU, with a centroid-distance fallback for fast-moving boxes.
+    """
+
+    def __init__(self, max_tracks=MAX_TRACKS, max_missed_frames=MAX_MISSED_FRAMES,
+                 iou_threshold=IOU_THRESHOLD, centroid_gate=CENTROID_GATE):
+        """
+        :param max_tracks: Maximum number of tracks kept in memory
+        :param max_missed_frames: Frames a track may go unmatched before it is evicted
+        :param iou_threshold: Minimum IoU for a match
+        :param centroid_gate: Maximum normalised centroid distance for a fallback match
+        """
+        self.max_tracks = max_tracks
+        self.max_missed_frames = max_missed_frames
+        self.iou_threshold = iou_threshold
+        self.centroid_gate = centroid_gate
+        self.boxes = np.zeros((max_tracks, 4))
+        self.timestamps = np.zeros(max_tracks)
+        self.track_ids = np.full(max_tracks, -1, dtype=np.int64)
+        self.missed = np.zeros(max_tracks, dtype=np.int64)
+        self.hits = np.zeros(max_tracks, dtype=np.int64)
+        self.active = np.zeros(max_tracks, dtype=bool)
+        self.next_id = 0
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def reset(self):
+        """
+        Drop all tracks.
+        """
+        self.active[:] = False
+        self.track_ids[:] = -1
+
+    def _allocate(self, count, protected):
+        """
+        Find free slots for new tracks, evicting the stalest unprotected tracks if the cap is reached.
+        :param count: Number of slots wanted
+        :param protected: Boolean mask of slots that must not be evicted
+        :return: Array of up to count slot indices
+        """
+        free = np.flatnonzero(~self.active)
+        if len(free) < count:
+            candidates = np.flatnonzero(self.active & ~protected)
+            stalest = candidates[np.argsort(-self.missed[candidates], kind="stable")]
+            free = np.concatenate([free, stalest[:count - len(free)]])
+        return free[:count]
+
+    def update(self, boxes, timestamp):
+        """
+        Associate the detections of a new frame with the existing tracks.
+        :param boxes: (N, 4) array of [x1, y1, x2, y2] boxes
+        :param timestamp: Capture time of the frame in seconds
+        :return: Tuple of (track_ids, slots, previous_boxes, previous_timestamps); the previous
+                 values are NaN for detections that start a new track, and track_ids and slots
+                 are -1 for detections dropped because the memory cap is full
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        count = len(boxes)
+        track_ids = np.full(count, -1, dtype=np.int64)
+        detection_slots = np.full(count, -1, dtype=np.int64)
+        previous_boxes = np.full((count, 4), np.nan)
+        previous_timestamps = np.full(count, np.nan)
+
+        # Associate by IoU first, then by centroid distance for whatever is left
+        slots = np.flatnonzero(self.active)
+        det_for_slot = np.full(len(slots), -1)
+        if len(slots) and count:
+            track_boxes = self.boxes[slots]
+            rows, cols = greedy_match(iou_matrix(track_boxes, boxes), self.iou_threshold)
+            det_for_slot[rows] = cols
+            free_rows = np.flatnonzero(det_for_slot < 0)
+            free_cols = np.setdiff1d(np.arange(count), cols)
+            if len(free_rows) and len(free_cols):
+                distance = centroid_distance_matrix(track_boxes[free_rows], boxes[free_cols])
+                rows, cols = greedy_match(distance, self.centroid_gate, higher_is_better=False)
+                det_for_slot[free_rows[rows]] = free_cols[cols]
+
+        matched = det_for_slot >= 0
+        matched_slots = slots[matched]
+        matched_dets = det_for_slot[matched]
+        track_ids[matched_dets] = self.track_ids[matched_slots]
+        detection_slots[matched_dets] = matched_slots
+        previous_boxes[matched_dets] = self.boxes[matched_slots]
+        previous_timestamps[matched_dets] = self.timestamps[matched_slots]
+        self.boxes[matched_slots] = boxes[matched_dets]
+        self.timestamps[matched_slots] = timestamp
+        self.missed[matched_slots] = 0
+        self.hits[matched_slots] += 1
+
+        # Age unmatched tracks and evict the stale ones
+        unmatched_slots = slots[~matched]
+        self.missed[unmatched_slots] += 1
+        self.active[unmatched_slots[self.missed[unmatched_slots] > self.max_missed_frames]] = False
+
+        # Start new tracks for unmatched detections
+        new_dets = np.setdiff1d(np.arange(count), matched_dets)
+        protected = np.zeros(self.max_tracks, dtype=bool)
+        protected[matched_slots] = True
+        new_slots = self._allocate(len(new_dets), protected)
+        new_dets = new_dets[:len(new_slots)]
+        new_ids = np.arange(self.next_id, self.next_id + len(new_slots))
+        self.next_id += len(new_slots)
+        self.boxes[new_slots] = boxes[new_dets]
+        self.timestamps[new_slots] = timestamp
+        self.track_ids[new_slots] = new_ids
+        self.missed[new_slots] = 0
+        self.hits[new_slots] = 1
+        self.active[new_slots] = True
+        track_ids[new_dets] = new_ids
+        detection_slots[new_dets] = new_slots
+
+        return track_ids, detection_slots, previous_boxes, previous_timestamps